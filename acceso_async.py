@@ -0,0 +1,179 @@
+# acceso_async.py - Capa de acceso asíncrona para las vistas async de Flask
+# SQLite y el resto del código bloqueante corren en un pool de hilos acotado; las
+# descargas de la BVC usan descargador_bvc (misma sesión, reintentos, Retry-After y
+# detección de páginas de error) en un pool aparte de `descargas_simultaneas` hilos.
+# Con asgiref las vistas comparten el loop y una BVC lenta no frena a las demás;
+# sin asgiref (WSGI puro) cada vista sigue ocupando su hilo de worker mientras espera.
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from descargador_bvc import descargador_bvc
+from extractor import (
+    buscar_datos_locales, buscar_datos_manuales, fecha_conocida_sin_datos,
+    guardar_datos_descargados, obtener_historico_rapido
+)
+from sqlite_manager import sqlite_manager
+
+# Flask ejecuta las vistas async con asgiref (pip install "Flask[async]")
+try:
+    import asgiref  # noqa: F401
+    ASGIREF_DISPONIBLE = True
+except ImportError:
+    ASGIREF_DISPONIBLE = False
+
+class AccesoAsync:
+    """
+    Fachada async sobre sqlite_manager y extractor para las vistas `async def`.
+
+    - El trabajo bloqueante (SQLite, .dat, cálculos) va a un ThreadPoolExecutor
+      acotado, copiando el contexto (la vista sigue viendo request/app).
+    - Las descargas de la BVC van a su propio pool de `descargas_simultaneas` hilos
+      con descargador_bvc.descargar: una sola descarga por fecha a la vez (las
+      solicitudes concurrentes la comparten). Una BVC lenta ocupa hilos de ese
+      pool, no los del pool general.
+    """
+
+    def __init__(self, max_hilos=None, descargas_simultaneas=4):
+        self.max_hilos = max_hilos or min(16, (os.cpu_count() or 1) + 4)
+        self._hilos = ThreadPoolExecutor(max_workers=self.max_hilos,
+                                         thread_name_prefix="AccesoAsync")
+        self._hilos_red = ThreadPoolExecutor(max_workers=descargas_simultaneas,
+                                             thread_name_prefix="AccesoAsyncRed")
+        self.descargas_simultaneas = descargas_simultaneas
+        self._descargas = {}  # fecha -> Future de la descarga en curso
+        self._lock = threading.Lock()
+        # Estadísticas
+        self.tareas = 0
+        self.descargas = 0
+        self.descargas_compartidas = 0
+        self.descargas_fallidas = 0
+
+    def _contar(self, campo, cantidad=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + cantidad)
+
+    # ---------- Trabajo bloqueante en el pool de hilos ----------
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) en el pool de hilos y espera su resultado."""
+        contexto = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        self._contar('tareas')
+        return await loop.run_in_executor(
+            self._hilos, functools.partial(contexto.run, funcion, *args, **kwargs)
+        )
+
+    def vista_en_hilo(self, vista):
+        """Decorador: convierte una vista Flask bloqueante en async que corre en el pool."""
+        @functools.wraps(vista)
+        async def envoltura(*args, **kwargs):
+            return await self.ejecutar(vista, *args, **kwargs)
+        return envoltura
+
+    # ---------- Descargas de la BVC en su pool de hilos ----------
+    def _descargar(self, fecha_vvc):
+        """
+        Corre en el pool de descargas. Retorna (acciones, indice, respondio) de
+        descargador_bvc.descargar; respondio es False si no hubo respuesta definitiva.
+        """
+        acciones, indice, respondio = descargador_bvc.descargar(fecha_vvc)
+        self._contar('descargas' if respondio else 'descargas_fallidas')
+        if acciones:
+            print(f"🌐 Descargando datos automáticos para {fecha_vvc}...")
+        return acciones, indice, respondio
+
+    def _fin_descarga(self, fecha_vvc, futuro):
+        with self._lock:
+            if self._descargas.get(fecha_vvc) is futuro:
+                del self._descargas[fecha_vvc]
+
+    async def _descargar_compartida(self, fecha_vvc):
+        """(acciones, indice, respondio) de la descarga de la fecha, compartida entre solicitudes."""
+        with self._lock:
+            futuro = self._descargas.get(fecha_vvc)
+            nueva = futuro is None
+            if nueva:
+                futuro = self._hilos_red.submit(self._descargar, fecha_vvc)
+                self._descargas[fecha_vvc] = futuro
+            else:
+                self.descargas_compartidas += 1
+        if nueva:
+            # Fuera del lock: si ya terminó, el callback corre aquí mismo y lo toma
+            futuro.add_done_callback(functools.partial(self._fin_descarga, fecha_vvc))
+        # shield: si esta solicitud se cancela, la descarga sigue para las demás
+        return await asyncio.shield(asyncio.wrap_future(futuro))
+
+    async def descargar_bvc(self, fecha_vvc):
+        """Descarga y parsea el .dat de la BVC para una fecha (sin guardar)."""
+        acciones, indice, _ = await self._descargar_compartida(fecha_vvc)
+        return acciones, indice
+
+    async def descargar_y_guardar(self, fecha_vvc):
+        """Versión async de extractor.descargar_y_guardar (mismo orden de fuentes)."""
+        if await self.ejecutar(fecha_conocida_sin_datos, fecha_vvc):
+            return [], None
+
+        acciones, indice = await self.ejecutar(buscar_datos_locales, fecha_vvc)
+        if acciones:
+            return acciones, indice
+
+        acciones, indice, respondio = await self._descargar_compartida(fecha_vvc)
+        if acciones:
+            await self.ejecutar(guardar_datos_descargados, fecha_vvc, acciones, indice)
+            return acciones, indice
+
+        acciones, indice = await self.ejecutar(buscar_datos_manuales, fecha_vvc)
+        if not acciones and respondio:
+            sqlite_manager.registrar_fecha_sin_datos(fecha_vvc, motivo='bvc_sin_dat')
+        return acciones, indice
+
+    # ---------- Lecturas de SQLite ----------
+    async def obtener_historico_rapido(self, simbolo, fecha_desde, fecha_hasta):
+        return await self.ejecutar(obtener_historico_rapido, simbolo, fecha_desde, fecha_hasta)
+
+    async def obtener_acciones_por_fecha(self, fecha):
+        return await self.ejecutar(sqlite_manager.obtener_acciones_por_fecha, fecha)
+
+    async def obtener_indice_por_fecha(self, fecha):
+        return await self.ejecutar(sqlite_manager.obtener_indice_por_fecha, fecha)
+
+    async def estadisticas_sqlite(self):
+        return await self.ejecutar(sqlite_manager.estadisticas)
+
+    def estadisticas(self):
+        """Estadísticas de la capa async."""
+        with self._lock:
+            return {
+                'max_hilos': self.max_hilos,
+                'tareas': self.tareas,
+                'descargas': self.descargas,
+                'descargas_en_curso': len(self._descargas),
+                'descargas_compartidas': self.descargas_compartidas,
+                'descargas_fallidas': self.descargas_fallidas,
+                'descargas_simultaneas': self.descargas_simultaneas,
+                'asgiref': ASGIREF_DISPONIBLE
+            }
+
+def habilitar_vistas_async(app):
+    """
+    Sin asgiref, Flask rechaza las vistas async. En ese caso cada vista async se
+    ejecuta con asyncio.run en el hilo del worker (un loop por solicitud).
+    """
+    if ASGIREF_DISPONIBLE:
+        return
+
+    def async_a_sync(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            return asyncio.run(funcion(*args, **kwargs))
+        return envoltura
+
+    app.async_to_sync = async_a_sync
+    print("⚠️  asgiref no instalado: vistas async con asyncio.run (instalar Flask[async])")
+
+# Instancia global
+acceso_async = AccesoAsync()
@@ -0,0 +1,343 @@
+# almacen_columnar.py - Almacén en memoria de precios por símbolo (columnas NumPy)
+# Responde históricos (simbolo, desde, hasta) con searchsorted, sin ir a SQLite
+
+import threading
+import time
+from collections.abc import Sequence
+
+from cotizacion import CotizacionHistorica, formatear_fecha
+
+try:
+    import numpy as np
+    NUMPY_DISPONIBLE = True
+except ImportError:
+    NUMPY_DISPONIBLE = False
+    print("⚠️  numpy no disponible: los históricos se consultarán directamente en SQLite")
+
+# Columnas numéricas de cada serie: nombre en el almacén -> columna en SQLite
+COLUMNAS_NUMERICAS = {
+    'precio': 'hoy',
+    'anterior': 'anterior',
+    'variacion': 'variacion',
+    'cambio_bs': 'diferencia_bs',
+    'cantidad': 'cantidad',
+    'monto': 'monto',
+}
+
+# Una fila por (simbolo, fecha), ya con el dato manual por encima del automático
+CONSULTA_SERIES = '''
+    SELECT simbolo, fecha, nombre, hoy, anterior, variacion, diferencia_bs,
+           cantidad, monto, fuente
+    FROM cotizaciones_efectivas {filtro}
+    ORDER BY simbolo, fecha_num
+'''
+MAX_FECHAS_CONSULTA = 500  # Fechas por consulta al refrescar (límite de parámetros de SQLite)
+
+# Posición de cada columna numérica en las filas de CONSULTA_SERIES (sin simbolo)
+_POSICIONES = {'precio': 2, 'anterior': 3, 'variacion': 4, 'cambio_bs': 5, 'cantidad': 6, 'monto': 7}
+
+def _insertar_lista(base, posiciones, valores):
+    """Como np.insert para listas: posiciones ascendentes sobre `base`."""
+    resultado = []
+    anterior = 0
+    for posicion, valor in zip(posiciones, valores):
+        resultado.extend(base[anterior:posicion])
+        resultado.append(valor)
+        anterior = posicion
+    resultado.extend(base[anterior:])
+    return resultado
+
+def _valores(columna):
+    """Columna float64 -> lista Python con None donde SQLite tenía NULL (NaN)."""
+    return [None if v != v else v for v in columna.tolist()]
+
+def _enteros(columna):
+    return [None if v != v else int(v) for v in columna.tolist()]
+
+def _valor(v):
+    v = float(v)
+    return None if v != v else v
+
+def _entero(v):
+    v = float(v)
+    return None if v != v else int(v)
+
+# Bytes aproximados de una fila (6 float64, la fecha int32 y 3 referencias) para CacheLRU
+BYTES_POR_FILA = 6 * 8 + 4 + 3 * 8
+
+class _Serie:
+    """
+    Columnas de un símbolo ordenadas por fecha (una fila por fecha). Los NULL de SQLite
+    se guardan como NaN (también en cantidad, que por eso es float64) y vuelven a ser
+    None en historico(), igual que en la consulta SQL.
+    """
+    __slots__ = ('fechas', 'fechas_texto', 'nombres', 'fuentes',
+                 'precio', 'anterior', 'variacion', 'cambio_bs', 'cantidad', 'monto')
+
+    def __init__(self, filas):
+        # filas: (fecha, nombre, hoy, anterior, variacion, diferencia_bs, cantidad, monto, fuente)
+        # ordenadas por fecha, una por fecha
+        self.fechas_texto = [f[0] for f in filas]
+        self.fechas = np.array([int(f) for f in self.fechas_texto], dtype=np.int32)
+        self.nombres = [f[1] for f in filas]
+        self.fuentes = [f[8] for f in filas]
+        for nombre, posicion in _POSICIONES.items():
+            # None -> NaN al convertir a float64
+            setattr(self, nombre, np.array([f[posicion] for f in filas], dtype=np.float64))
+
+    def fusionar(self, quitar, filas):
+        """
+        Serie nueva sin las fechas `quitar` (array int ordenado) y con `filas` (mismo
+        formato que __init__, ordenadas por fecha) insertadas en su lugar con
+        searchsorted. Retorna self si no cambia nada y None si queda vacía.
+        """
+        conservar = ~np.isin(self.fechas, quitar)
+        if not filas and conservar.all():
+            return self
+        indices = np.flatnonzero(conservar).tolist()
+        fechas = self.fechas[conservar]
+        fechas_nuevas = np.array([int(f[0]) for f in filas], dtype=np.int32)
+        posiciones = np.searchsorted(fechas, fechas_nuevas)
+        if len(fechas) + len(filas) == 0:
+            return None
+
+        serie = _Serie.__new__(_Serie)
+        serie.fechas = np.insert(fechas, posiciones, fechas_nuevas)
+        lista_posiciones = posiciones.tolist()
+        for nombre, posicion in (('fechas_texto', 0), ('nombres', 1), ('fuentes', 8)):
+            base = getattr(self, nombre)
+            setattr(serie, nombre, _insertar_lista([base[i] for i in indices], lista_posiciones,
+                                                   [f[posicion] for f in filas]))
+        for nombre, posicion in _POSICIONES.items():
+            setattr(serie, nombre, np.insert(getattr(self, nombre)[conservar], posiciones,
+                                             np.array([f[posicion] for f in filas], dtype=np.float64)))
+        return serie
+
+    def rango(self, desde, hasta):
+        """Índices [inicio, fin) de las fechas dentro de [desde, hasta] (YYYYMMDD)."""
+        desde = int(str(desde).replace('-', ''))
+        hasta = int(str(hasta).replace('-', ''))
+        inicio = int(np.searchsorted(self.fechas, desde, side='left'))
+        fin = int(np.searchsorted(self.fechas, hasta, side='right'))
+        return inicio, fin
+
+class HistoricoColumnar(Sequence):
+    """
+    Histórico de un símbolo sobre las columnas de su serie, fecha más reciente primero.
+    Se lee como la lista de CotizacionHistorica de obtener_historico_simbolo (len,
+    índices, slices, iteración), pero cada fila se construye al pedirla y los slices
+    (páginas, [::-1], [::paso]) son vistas sin copia. columna() y registros() sirven
+    estadísticas y JSON directamente desde los arrays.
+    """
+
+    def __init__(self, serie, simbolo, indices):
+        self._serie = serie      # Las series no se modifican: actualizar() crea otras
+        self.simbolo = simbolo
+        self._indices = indices  # range de posiciones en la serie, en orden de lectura
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return HistoricoColumnar(self._serie, self.simbolo, self._indices[posicion])
+        i = self._indices[posicion]
+        serie = self._serie
+        return CotizacionHistorica(serie.fechas_texto[i], self.simbolo, serie.nombres[i],
+                                   _valor(serie.anterior[i]), _valor(serie.precio[i]),
+                                   _valor(serie.cambio_bs[i]), _valor(serie.variacion[i]),
+                                   _entero(serie.cantidad[i]), _valor(serie.monto[i]),
+                                   serie.fuentes[i])
+
+    def __iter__(self):
+        simbolo = self.simbolo
+        for fecha, nombre, anterior, precio, cambio_bs, variacion, cantidad, monto, fuente in zip(
+                *self._listas('fechas_texto', 'nombres', 'anterior', 'precio', 'cambio_bs',
+                              'variacion', 'cantidad', 'monto', 'fuentes')):
+            yield CotizacionHistorica(fecha, simbolo, nombre, anterior, precio, cambio_bs,
+                                      variacion, cantidad, monto, fuente)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + len(self) * BYTES_POR_FILA
+
+    def __repr__(self):
+        return f"HistoricoColumnar({self.simbolo!r}, {len(self)} filas)"
+
+    def _tramo(self):
+        """slice equivalente a self._indices (sirve para arrays y listas)."""
+        indices = self._indices
+        if not indices:
+            return slice(0, 0)
+        return slice(indices.start, indices.stop if indices.stop >= 0 else None, indices.step)
+
+    def _listas(self, *nombres):
+        """Columnas del tramo como listas Python (NaN -> None, cantidad entera)."""
+        tramo = self._tramo()
+        listas = []
+        for nombre in nombres:
+            columna = getattr(self._serie, nombre)[tramo]
+            if nombre == 'cantidad':
+                columna = _enteros(columna)
+            elif nombre in COLUMNAS_NUMERICAS:
+                columna = _valores(columna)
+            listas.append(columna)
+        return listas
+
+    def columna(self, nombre):
+        """Vista NumPy de 'fecha' o de una columna numérica, en orden de lectura (NULL = NaN)."""
+        return getattr(self._serie, 'fechas' if nombre == 'fecha' else nombre)[self._tramo()]
+
+    def registros(self):
+        """Filas como diccionarios con las claves de CotizacionHistorica, armadas por columnas (JSON)."""
+        simbolo = self.simbolo
+        fechas, nombres, precios, variaciones, cambios, cantidades, montos, anteriores, fuentes = \
+            self._listas('fechas_texto', 'nombres', 'precio', 'variacion', 'cambio_bs',
+                         'cantidad', 'monto', 'anterior', 'fuentes')
+        return [
+            {'fecha': fecha, 'simbolo': simbolo, 'nombre': nombre, 'precio': precio,
+             'variacion': variacion, 'cambio_bs': cambio_bs, 'cantidad': cantidad,
+             'monto': monto, 'anterior': anterior, 'fuente': fuente,
+             'fecha_formateada': formatear_fecha(fecha)}
+            for fecha, nombre, precio, variacion, cambio_bs, cantidad, monto, anterior, fuente in zip(
+                fechas, nombres, precios, variaciones, cambios, cantidades, montos, anteriores, fuentes)
+        ]
+
+class AlmacenPrecios:
+    """
+    Series de precios por símbolo en memoria, cargadas una vez desde
+    cotizaciones_efectivas. Cada consulta de histórico es un searchsorted y un slice;
+    las escrituras releen solo las fechas afectadas y las fusionan en cada serie
+    (actualizar), sin volver a leer el histórico completo.
+    """
+
+    def __init__(self):
+        self._series = {}  # {simbolo: _Serie}; se reemplazan enteras, los lectores no bloquean
+        self._lock = threading.Lock()  # Serializa cargas y refrescos
+        self.cargado = False
+
+        # Estadísticas
+        self.consultas = 0
+        self.refrescos = 0
+        self.tiempo_carga = 0.0
+
+    def cargar(self, conn):
+        """Carga todas las series desde SQLite."""
+        inicio = time.time()
+        with self._lock:
+            series = self._leer_series(conn, '', ())
+            self._series = series
+            self.cargado = True
+        self.tiempo_carga = time.time() - inicio
+        print(f"✅ Almacén columnar: {len(series)} símbolos, "
+              f"{sum(len(s.fechas) for s in series.values())} registros en {self.tiempo_carga:.2f}s")
+
+    def actualizar(self, conn, cambios):
+        """
+        Refresca solo las filas (fecha, simbolo) afectadas por una escritura: lee de
+        SQLite las fechas cambiadas y las fusiona en las series con searchsorted.
+        cambios: {fecha o None: {simbolos} o None}. Con fecha None se recarga todo.
+        """
+        if not self.cargado or not cambios:
+            return
+        if None in cambios:
+            self.cargar(conn)
+            return
+
+        with self._lock:
+            fechas = sorted({int(fecha) for fecha in cambios})
+            leidas = {}
+            for inicio in range(0, len(fechas), MAX_FECHAS_CONSULTA):
+                tramo = fechas[inicio:inicio + MAX_FECHAS_CONSULTA]
+                filtro = f"WHERE fecha_num IN ({', '.join('?' * len(tramo))})"
+                for simbolo, filas in self._leer_filas(conn, filtro, tuple(tramo)).items():
+                    leidas.setdefault(simbolo, []).extend(filas)
+
+            # Fechas a reemplazar por símbolo (None: todos los símbolos de esa fecha)
+            afectadas = {}
+            fechas_todos = set()
+            for fecha, simbolos in cambios.items():
+                if simbolos is None:
+                    fechas_todos.add(int(fecha))
+                else:
+                    for simbolo in simbolos:
+                        afectadas.setdefault(simbolo, set()).add(int(fecha))
+            if fechas_todos:
+                for simbolo in set(self._series) | set(leidas):
+                    afectadas.setdefault(simbolo, set()).update(fechas_todos)
+
+            series = dict(self._series)
+            for simbolo, quitar in afectadas.items():
+                filas = sorted((f for f in leidas.get(simbolo, ()) if int(f[0]) in quitar),
+                               key=lambda f: int(f[0]))
+                serie = series.get(simbolo)
+                if serie is None:
+                    if filas:
+                        series[simbolo] = _Serie(filas)
+                    continue
+                fusion = serie.fusionar(np.array(sorted(quitar), dtype=np.int32), filas)
+                if fusion is None:
+                    del series[simbolo]
+                else:
+                    series[simbolo] = fusion
+            self._series = series
+            self.refrescos += 1
+
+    def _leer_filas(self, conn, filtro, parametros):
+        """{simbolo: [filas ordenadas por fecha]} de cotizaciones_efectivas."""
+        cursor = conn.execute(CONSULTA_SERIES.format(filtro=filtro), parametros)
+        filas = {}
+        simbolo_actual = None
+        actuales = None
+        for simbolo, *fila in cursor:
+            if simbolo != simbolo_actual:
+                simbolo_actual, actuales = simbolo, filas.setdefault(simbolo, [])
+            actuales.append(fila)
+        return filas
+
+    def _leer_series(self, conn, filtro, parametros):
+        return {simbolo: _Serie(filas) for simbolo, filas in self._leer_filas(conn, filtro, parametros).items()}
+
+    def columnas(self, simbolo, desde, hasta):
+        """
+        Vistas NumPy (sin copia) del rango pedido, en orden ascendente de fecha.
+        Retorna None si el símbolo no existe.
+        """
+        serie = self._series.get(simbolo.upper())
+        if serie is None:
+            return None
+        self.consultas += 1
+        inicio, fin = serie.rango(desde, hasta)
+        resultado = {'fecha': serie.fechas[inicio:fin]}
+        for nombre in COLUMNAS_NUMERICAS:
+            resultado[nombre] = getattr(serie, nombre)[inicio:fin]
+        return resultado
+
+    def historico(self, simbolo, desde, hasta):
+        """
+        Histórico en el mismo formato que SQLiteManager.obtener_historico_simbolo
+        (CotizacionHistorica, fecha más reciente primero) como HistoricoColumnar:
+        searchsorted y un range, sin construir las filas.
+        """
+        simbolo = simbolo.upper()
+        serie = self._series.get(simbolo)
+        if serie is None:
+            return []
+        self.consultas += 1
+        inicio, fin = serie.rango(desde, hasta)
+        if inicio >= fin:
+            return []
+        return HistoricoColumnar(serie, simbolo, range(fin - 1, inicio - 1, -1))
+
+    def estadisticas(self):
+        """Estadísticas del almacén."""
+        series = self._series
+        return {
+            'cargado': self.cargado,
+            'simbolos': len(series),
+            'registros': sum(len(s.fechas) for s in series.values()),
+            'bytes': sum(getattr(s, c).nbytes for s in series.values()
+                         for c in ('fechas',) + tuple(COLUMNAS_NUMERICAS)),
+            'consultas': self.consultas,
+            'refrescos': self.refrescos,
+            'tiempo_carga_s': round(self.tiempo_carga, 3)
+        }
@@ -1,9 +1,13 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
-from extractor import descargar_y_guardar, obtener_historico_rapido, precargar_datos_comunes
+from flask.json.provider import DefaultJSONProvider
+from extractor import precargar_datos_comunes
 from datetime import datetime, timedelta
 import os
+import asyncio
 import logging
 import math
+import threading
+from collections.abc import Mapping
 from datos_manuales import (
     agregar_datos_manuales, 
     obtener_datos_manuales,
@@ -13,14 +17,50 @@ from datos_manuales import (
 )
 from sqlite_manager import sqlite_manager
 from query_cache import query_cache
+from auditor_consultas import auditar_app, registro_sentencias
+from acceso_async import acceso_async, habilitar_vistas_async
+from cotizacion import CotizacionDolar
+from almacen_columnar import HistoricoColumnar
+from indice_data_cache import obtener_indice
+from vigilante_data_cache import vigilante_data_cache
+from calendario_bursatil import calendario_bursatil
+from descargador_bvc import descargador_bvc
+from parser_bvc import estadisticas_cache as estadisticas_parser
+
+# Las escrituras en SQLite invalidan solo las consultas cacheadas que afectan
+sqlite_manager.suscribir_invalidacion(query_cache.invalidar_cambios)
+
+# Con AUDITAR_SQL=1 se registran las sentencias del pool para /admin/auditoria-sql
+if os.environ.get('AUDITAR_SQL') == '1':
+    sqlite_manager.pool.trazar(registro_sentencias.anotar)
 
 # Configuración de Flask y Logging
+class ProveedorJSON(DefaultJSONProvider):
+    """JSON de Flask (jsonify y |tojson) que también serializa los registros de cotizacion.py."""
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        if isinstance(o, HistoricoColumnar):
+            return o.registros()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__, static_folder='static')
+app.json = ProveedorJSON(app)
+habilitar_vistas_async(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Variable para controlar si ya se precargó el caché
-_cache_precargado = False
+# Precarga del caché en un hilo de fondo; su estado se informa en /api/status
+_estado_precarga = {
+    'estado': 'pendiente',  # pendiente | en_curso | completada | error
+    'inicio': None,
+    'fin': None,
+    'duracion_s': None,
+    'fechas': 0,
+    'error': None
+}
+_lock_precarga = threading.Lock()
 
 # ========== CONSTANTES PARA LA REEXPRESIÓN MONETARIA ==========
 # Fecha de la reexpresión monetaria (27 de julio de 2025)
@@ -31,36 +71,30 @@ FACTOR_CONVERSION_REEXPRESION = 1000
 # ========== FUNCIONES PARA DÓLAR BCV ==========
 def crear_tabla_dolar_bcv():
     """Crea la tabla para datos del dólar BCV si no existe."""
-    import sqlite3
-    
-    db_path = "database/bolsa_datos.db"
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Crear tabla dolar_bcv si no existe
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS dolar_bcv (
-            fecha TEXT PRIMARY KEY,
-            tasa REAL NOT NULL,
-            variacion REAL,
-            fuente TEXT DEFAULT 'excel',
-            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Crear índice para búsquedas rápidas
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dolar_fecha ON dolar_bcv(fecha)')
-    
-    conn.commit()
-    conn.close()
+    def _escribir(conn):
+        # Crear tabla dolar_bcv si no existe
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS dolar_bcv (
+                fecha TEXT PRIMARY KEY,
+                tasa REAL NOT NULL,
+                variacion REAL,
+                fuente TEXT DEFAULT 'excel',
+                creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Crear índice para búsquedas rápidas
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_dolar_fecha ON dolar_bcv(fecha)')
+
+    # Escritura a través del escritor único de SQLite
+    sqlite_manager.ejecutar_escritura(_escribir)
     logger.info("✅ Tabla dolar_bcv creada/verificada")
 
 def cargar_datos_dolar_bcv_desde_excel():
     """Carga datos del dólar BCV desde el archivo Excel a SQLite."""
     try:
         import pandas as pd
-        import sqlite3
-        
+
         # Ruta del archivo Excel
         excel_path = "dolar_bcv.xlsx"
         
@@ -81,43 +115,44 @@ def cargar_datos_dolar_bcv_desde_excel():
         # Crear tabla si no existe
         crear_tabla_dolar_bcv()
         
-        # Conectar a SQLite
-        db_path = "database/bolsa_datos.db"
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Insertar datos
-        registros_insertados = 0
-        registros_actualizados = 0
-        
-        for _, row in df.iterrows():
-            fecha = str(int(row['Fecha']))  # Convertir a string
-            tasa = float(row['Tasa'])
-            variacion = float(row['Variación'])
-            
-            # Verificar si ya existe
-            cursor.execute('SELECT COUNT(*) FROM dolar_bcv WHERE fecha = ?', (fecha,))
-            existe = cursor.fetchone()[0] > 0
-            
-            if existe:
-                # Actualizar
-                cursor.execute('''
-                    UPDATE dolar_bcv 
-                    SET tasa = ?, variacion = ?
-                    WHERE fecha = ?
-                ''', (tasa, variacion, fecha))
-                registros_actualizados += 1
-            else:
-                # Insertar nuevo
-                cursor.execute('''
-                    INSERT INTO dolar_bcv (fecha, tasa, variacion, fuente)
-                    VALUES (?, ?, ?, ?)
-                ''', (fecha, tasa, variacion, 'excel'))
-                registros_insertados += 1
-        
-        conn.commit()
-        conn.close()
-        
+        filas = [
+            (str(int(row['Fecha'])), float(row['Tasa']), float(row['Variación']))  # Fecha como string
+            for _, row in df.iterrows()
+        ]
+
+        def _escribir(conn):
+            cursor = conn.cursor()
+
+            # Insertar datos
+            registros_insertados = 0
+            registros_actualizados = 0
+
+            for fecha, tasa, variacion in filas:
+                # Verificar si ya existe
+                cursor.execute('SELECT COUNT(*) FROM dolar_bcv WHERE fecha = ?', (fecha,))
+                existe = cursor.fetchone()[0] > 0
+
+                if existe:
+                    # Actualizar
+                    cursor.execute('''
+                        UPDATE dolar_bcv
+                        SET tasa = ?, variacion = ?
+                        WHERE fecha = ?
+                    ''', (tasa, variacion, fecha))
+                    registros_actualizados += 1
+                else:
+                    # Insertar nuevo
+                    cursor.execute('''
+                        INSERT INTO dolar_bcv (fecha, tasa, variacion, fuente)
+                        VALUES (?, ?, ?, ?)
+                    ''', (fecha, tasa, variacion, 'excel'))
+                    registros_insertados += 1
+
+            return registros_insertados, registros_actualizados
+
+        # Todo el Excel se confirma en una sola transacción del escritor único
+        registros_insertados, registros_actualizados = sqlite_manager.ejecutar_escritura(_escribir)
+
         mensaje = f"✅ Datos dólar BCV cargados: {registros_insertados} nuevos, {registros_actualizados} actualizados"
         logger.info(mensaje)
         return True, mensaje
@@ -263,50 +298,20 @@ def calcular_comparacion_dolar_accion(datos_historicos):
     
     for dato in datos_historicos:
         fecha_str = dato['fecha']
-        precio_bs = dato['precio']
         
         # Obtener tasa del dólar para esta fecha
         tasa_dolar = obtener_tasa_dolar_bcv(fecha_str)
         tasa_valor = tasa_dolar['tasa'] if tasa_dolar['tasa'] > 0 else 1
         
-        # Calcular valor en dólares
-        precio_usd = precio_bs / tasa_valor if tasa_valor > 0 else 0
-        
-        # Si hay precio anterior, calcular variación en dólares
-        if 'anterior' in dato and dato['anterior'] > 0:
-            anterior_bs = dato['anterior']
-            
-            # Obtener tasa para el día anterior (simplificado: misma tasa)
-            # Para mayor precisión, buscaríamos la tasa del día anterior real
-            anterior_usd = anterior_bs / tasa_valor if tasa_valor > 0 else 0
-            
-            # Calcular variación en dólares
-            variacion_usd_bs = precio_bs - anterior_bs
-            variacion_usd_usd = precio_usd - anterior_usd
-            variacion_usd_porcentaje = (variacion_usd_usd / anterior_usd * 100) if anterior_usd > 0 else 0
-        else:
-            anterior_usd = 0
-            variacion_usd_bs = 0
-            variacion_usd_usd = 0
-            variacion_usd_porcentaje = 0
-        
-        # Calcular diferencia con variación del dólar BCV
-        variacion_dolar_bcv = tasa_dolar.get('variacion', 0) * 100  # Convertir a porcentaje
-        variacion_accion = dato.get('variacion', 0)
-        
-        diferencia_vs_dolar = variacion_accion - variacion_dolar_bcv
-        
-        resultados.append({
-            **dato,
-            'tasa_dolar': tasa_valor,
-            'precio_usd': precio_usd,
-            'anterior_usd': anterior_usd,
-            'variacion_usd_porcentaje': round(variacion_usd_porcentaje, 2),
-            'variacion_dolar_bcv': round(variacion_dolar_bcv, 2),
-            'diferencia_vs_dolar': round(diferencia_vs_dolar, 2),
-            'dolar_encontrado_exacto': tasa_dolar.get('encontrado_exacto', False),
-            'fecha_dolar': tasa_dolar.get('fecha', fecha_str)
-        })
+        # Precio/anterior en USD y diferencias vs el dólar se calculan al leerlos
+        # (la tasa del día anterior se simplifica: misma tasa)
+        resultados.append(CotizacionDolar(
+            dato,
+            tasa_valor,
+            tasa_dolar.get('variacion', 0) * 100,  # Convertir a porcentaje
+            tasa_dolar.get('encontrado_exacto', False),
+            tasa_dolar.get('fecha', fecha_str)
+        ))
     
     return resultados
 
@@ -367,20 +372,15 @@ def es_fin_de_semana(fecha_dt):
 
 def obtener_ultimo_dia_habil(fecha_dt):
     """Obtiene el último día hábil (no fin de semana)"""
-    fecha_actual = fecha_dt
-    
-    # Retroceder hasta encontrar un día hábil (máximo 10 días)
-    for i in range(10):
-        if not es_fin_de_semana(fecha_actual):
-            return fecha_actual
-        fecha_actual = fecha_actual - timedelta(days=1)
-    
-    return fecha_dt  # Si no encuentra, devolver la fecha original
+    # Sábado retrocede 1 día, domingo 2
+    return fecha_dt - timedelta(days=max(0, fecha_dt.weekday() - 4))
 
-def buscar_datos_habiles(fecha_dt):
+async def buscar_datos_habiles(fecha_dt):
     """
     Busca hacia atrás (máximo 10 días) hasta encontrar un día con 
     datos de mercado. EVITA FINES DE SEMANA INTELIGENTEMENTE.
+    El calendario bursátil resuelve la última sesión en memoria: solo se prueban
+    (data_cache / BVC) los días hábiles posteriores a ella, que aún no están en SQLite.
     """
     # Si la fecha solicitada es fin de semana, empezar desde el viernes
     if es_fin_de_semana(fecha_dt):
@@ -393,18 +393,28 @@ def buscar_datos_habiles(fecha_dt):
     else:
         fecha_inicio = fecha_dt
     
+    # Última sesión conocida dentro de la ventana de 10 días
+    limite_str = (fecha_inicio - timedelta(days=9)).strftime('%Y%m%d')
+    sesion = calendario_bursatil.sesion_en_o_antes(fecha_inicio)
+    if sesion is not None and sesion < limite_str:
+        sesion = None
+    
     # Buscar hasta 10 días hacia atrás
     for i in range(10):
         fecha_actual = fecha_inicio - timedelta(days=i)
         fecha_str = fecha_actual.strftime('%Y%m%d')
         
         # Verificar si es fin de semana (no buscar en sábados/domingos)
-        if es_fin_de_semana(fecha_actual):
+        if es_fin_de_semana(fecha_actual) and fecha_str != sesion:
             continue  # Saltar fines de semana
         
+        # Antes de la última sesión no hay más días con datos en la base
+        if sesion is not None and fecha_str < sesion:
+            break
+        
         logger.info(f"Intentando cargar datos para la fecha hábil: {fecha_str}")
         
-        acciones, indice = descargar_y_guardar(fecha_str)
+        acciones, indice = await acceso_async.descargar_y_guardar(fecha_str)
         
         if acciones:
             logger.info(f"Datos encontrados para el día hábil: {fecha_str} ({len(acciones)} registros)")
@@ -418,9 +428,11 @@ def buscar_datos_habiles(fecha_dt):
     logger.warning("No se encontraron datos en días hábiles, buscando en cualquier día...")
     for i in range(10):
         fecha_str = (fecha_dt - timedelta(days=i)).strftime('%Y%m%d')
+        if sesion is not None and fecha_str <= sesion:
+            break  # La sesión ya se intentó arriba
         logger.info(f"Intentando cualquier día: {fecha_str}")
         
-        acciones, indice = descargar_y_guardar(fecha_str)
+        acciones, indice = await acceso_async.descargar_y_guardar(fecha_str)
         
         if acciones:
             logger.info(f"Datos encontrados para: {fecha_str} ({len(acciones)} registros)")
@@ -510,37 +522,51 @@ def calcular_estadisticas_historicas(datos_historicos):
     if not datos_historicos:
         return {}
     
-    precios = [d['precio'] for d in datos_historicos]
-    variaciones = [d['variacion'] for d in datos_historicos]
-    
     # Estadísticas básicas
     precio_inicial = datos_historicos[0]['precio'] if datos_historicos else 0
     precio_final = datos_historicos[-1]['precio'] if datos_historicos else 0
     cambio_bs = precio_final - precio_inicial
     rendimiento_porcentaje = (cambio_bs / precio_inicial * 100) if precio_inicial > 0 else 0
-    
-    # Estadísticas adicionales
-    precio_maximo = max(precios) if precios else 0
-    precio_minimo = min(precios) if precios else 0
-    precio_promedio = sum(precios) / len(precios) if precios else 0
-    
-    # Calcular volatilidad (desviación estándar de los rendimientos)
-    if len(variaciones) > 1:
-        mean = sum(variaciones) / len(variaciones)
-        variance = sum((x - mean) ** 2 for x in variaciones) / len(variaciones)
-        volatilidad = math.sqrt(variance)
-    else:
-        volatilidad = 0
-    
-    # Contar días en alza, baja y estables
-    dias_alza = sum(1 for v in variaciones if v > 0)
-    dias_baja = sum(1 for v in variaciones if v < 0)
-    dias_estables = sum(1 for v in variaciones if v == 0)
     total_dias = len(datos_historicos)
     
-    # Encontrar mayor ganancia y pérdida diaria
-    max_ganancia_diaria = max(variaciones) if variaciones else 0
-    max_perdida_diaria = min(variaciones) if variaciones else 0
+    if isinstance(datos_historicos, HistoricoColumnar):
+        # Histórico del almacén columnar: se calcula sobre sus arrays, sin construir filas
+        precios = datos_historicos.columna('precio')
+        variaciones = datos_historicos.columna('variacion')
+        precio_maximo = float(precios.max())
+        precio_minimo = float(precios.min())
+        precio_promedio = float(precios.mean())
+        volatilidad = float(variaciones.std()) if len(variaciones) > 1 else 0
+        dias_alza = int((variaciones > 0).sum())
+        dias_baja = int((variaciones < 0).sum())
+        dias_estables = int((variaciones == 0).sum())
+        max_ganancia_diaria = float(variaciones.max())
+        max_perdida_diaria = float(variaciones.min())
+    else:
+        precios = [d['precio'] for d in datos_historicos]
+        variaciones = [d['variacion'] for d in datos_historicos]
+        
+        # Estadísticas adicionales
+        precio_maximo = max(precios) if precios else 0
+        precio_minimo = min(precios) if precios else 0
+        precio_promedio = sum(precios) / len(precios) if precios else 0
+        
+        # Calcular volatilidad (desviación estándar de los rendimientos)
+        if len(variaciones) > 1:
+            mean = sum(variaciones) / len(variaciones)
+            variance = sum((x - mean) ** 2 for x in variaciones) / len(variaciones)
+            volatilidad = math.sqrt(variance)
+        else:
+            volatilidad = 0
+        
+        # Contar días en alza, baja y estables
+        dias_alza = sum(1 for v in variaciones if v > 0)
+        dias_baja = sum(1 for v in variaciones if v < 0)
+        dias_estables = sum(1 for v in variaciones if v == 0)
+        
+        # Encontrar mayor ganancia y pérdida diaria
+        max_ganancia_diaria = max(variaciones) if variaciones else 0
+        max_perdida_diaria = min(variaciones) if variaciones else 0
     
     return {
         'precio_inicial': precio_inicial,
@@ -561,18 +587,26 @@ def calcular_estadisticas_historicas(datos_historicos):
         'ultima_fecha': datos_historicos[-1]['fecha_formateada'] if datos_historicos else ''
     }
 
+def orden_cronologico(datos_historicos):
+    """
+    Histórico del más antiguo al más reciente. El del almacén columnar (más reciente
+    primero) se invierte como vista, sin construir las filas.
+    """
+    if isinstance(datos_historicos, HistoricoColumnar):
+        return datos_historicos[::-1]
+    return sorted(datos_historicos, key=lambda x: x['fecha'])
+
 def obtener_nombre_accion(simbolo):
     """Obtiene el nombre real de una acción desde SQLite"""
     if not simbolo:
         return simbolo.upper()
     
     try:
-        import sqlite3
         db_path = "database/bolsa_datos.db"
         if not os.path.exists(db_path):
             return simbolo.upper()
         
-        conn = sqlite3.connect(db_path)
+        conn = sqlite_manager.conexion_lectura()
         cursor = conn.cursor()
         
         # Buscar en acciones automáticas primero
@@ -662,45 +696,26 @@ def ajustar_valor_por_reexpresion(fecha_str, valor):
 # ========== FUNCIÓN CORREGIDA PARA OBTENER DATOS DEL ÍNDICE ==========
 def obtener_datos_indice_historico(fecha_desde, fecha_hasta):
     """Obtiene los datos del índice IBC desde SQLite en un rango de fechas."""
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         logger.warning(f"Base de datos no encontrada: {db_path}")
         return [], {}
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
         # PRIMERO: Verificar que las fechas estén en el formato correcto
         logger.info(f"Buscando índices del {fecha_desde} al {fecha_hasta}")
         
-        # Verificar si la tabla indices_manuales existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='indices_manuales'")
-        tabla_manuales_existe = cursor.fetchone() is not None
-        
-        # CONSULTA MEJORADA: Combinar datos de ambas tablas
-        if tabla_manuales_existe:
-            query = '''
-                SELECT fecha, valor, variacion, 'automatico' as fuente 
-                FROM indices 
-                WHERE fecha BETWEEN ? AND ?
-                UNION ALL
-                SELECT fecha, valor, variacion, 'manual' as fuente 
-                FROM indices_manuales 
-                WHERE fecha BETWEEN ? AND ?
-                ORDER BY fecha
-            '''
-            cursor.execute(query, (fecha_desde, fecha_hasta, fecha_desde, fecha_hasta))
-        else:
-            query = '''
-                SELECT fecha, valor, variacion, 'automatico' as fuente 
-                FROM indices 
-                WHERE fecha BETWEEN ? AND ?
-                ORDER BY fecha
-            '''
-            cursor.execute(query, (fecha_desde, fecha_hasta))
+        # Una fila por fecha, con el índice manual por encima del automático
+        cursor.execute('''
+            SELECT fecha, valor, variacion,
+                   CASE WHEN manual THEN 'manual' ELSE 'automatico' END as fuente
+            FROM indices_efectivos 
+            WHERE fecha BETWEEN ? AND ?
+            ORDER BY fecha
+        ''', (fecha_desde, fecha_hasta))
         
         todos_datos = cursor.fetchall()
         
@@ -740,21 +755,8 @@ def obtener_datos_indice_historico(fecha_desde, fecha_hasta):
                     logger.warning(f"Error procesando registro {fecha}: {e}")
                     continue
         
-        # Eliminar duplicados por fecha (mantener manual sobre automático)
-        fechas_vistas = {}
-        for dato in resultados:
-            fecha = dato['fecha']
-            if fecha not in fechas_vistas:
-                fechas_vistas[fecha] = dato
-            else:
-                # Si ya existe, priorizar manual sobre automático
-                if dato['fuente'] == 'manual' and fechas_vistas[fecha]['fuente'] == 'automatico':
-                    fechas_vistas[fecha] = dato
-        
-        resultados_unicos = list(fechas_vistas.values())
-        
-        # Ordenar por fecha (ascendente)
-        resultados_unicos.sort(key=lambda x: x['fecha'])
+        # indices_efectivos ya trae una fila por fecha, en orden ascendente
+        resultados_unicos = resultados
         
         logger.info(f"Total de registros únicos del índice: {len(resultados_unicos)}")
         logger.info(f"Valores ajustados: {valores_ajustados}, No ajustados: {valores_no_ajustados}")
@@ -836,7 +838,7 @@ def obtener_datos_indice_historico(fecha_desde, fecha_hasta):
 
 # ========== RUTAS PRINCIPALES CON MANEJO DE FINES DE SEMANA ==========
 @app.route('/')
-def index():
+async def index():
     """
     Dashboard principal - EVITA AUTOMÁTICAMENTE FINES DE SEMANA
     """
@@ -866,7 +868,7 @@ def index():
         target_date = datetime.now()
 
     # 2. Buscar datos (con manejo inteligente de fines de semana)
-    resultado = buscar_datos_habiles(target_date)
+    resultado = await buscar_datos_habiles(target_date)
     fecha_real, acciones, indice, es_fin_semana_encontrado = resultado
     
     # 3. Calcular todos los tops
@@ -922,7 +924,7 @@ def index():
 
 
 @app.route('/consulta')
-def consulta():
+async def consulta():
     """
     Página de consulta histórica con filtros por fecha.
     USANDO SQLITE PARA MÁXIMA VELOCIDAD
@@ -936,12 +938,13 @@ def consulta():
     fecha_hasta = request.args.get('fecha_hasta', '')
     pagina = int(request.args.get('pagina', 1))
     
-    # Si no hay fechas, usar valores por defecto (último mes)
+    # Si no hay fechas, usar valores por defecto (último mes de sesiones)
     hoy = datetime.now()
+    periodos = calendario_bursatil.periodos_rapidos(hoy)
     if not fecha_desde:
-        fecha_desde = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
+        fecha_desde = periodos['fecha_30d']
     if not fecha_hasta:
-        fecha_hasta = hoy.strftime('%Y-%m-%d')
+        fecha_hasta = periodos['fecha_hoy']
     
     # CORREGIDO: NO limitar automáticamente a 365 días
     # Solo validar que las fechas tengan formato correcto
@@ -967,21 +970,21 @@ def consulta():
     except Exception as e:
         logger.error(f"Error procesando fechas: {e}")
         # Usar valores por defecto si hay error
-        fecha_desde = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
-        fecha_hasta = hoy.strftime('%Y-%m-%d')
+        fecha_desde = periodos['fecha_30d']
+        fecha_hasta = periodos['fecha_hoy']
     
-    # Calcular fechas para los botones de período rápido
-    fecha_7d = (hoy - timedelta(days=7)).strftime('%Y-%m-%d')
-    fecha_30d = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
-    fecha_90d = (hoy - timedelta(days=90)).strftime('%Y-%m-%d')
-    fecha_365d = (hoy - timedelta(days=365)).strftime('%Y-%m-%d')
-    fecha_hoy = hoy.strftime('%Y-%m-%d')
+    # Fechas de los botones de período rápido (sesiones reales, sin SQLite)
+    fecha_7d = periodos['fecha_7d']
+    fecha_30d = periodos['fecha_30d']
+    fecha_90d = periodos['fecha_90d']
+    fecha_365d = periodos['fecha_365d']
+    fecha_hoy = periodos['fecha_hoy']
     
     datos_historicos = []
     estadisticas = {}
     
     # Obtener nombre real de la acción
-    accion_nombre = obtener_nombre_accion(simbolo)
+    accion_nombre = await acceso_async.ejecutar(obtener_nombre_accion, simbolo)
     
     # VERIFICAR CACHÉ DE CONSULTAS PRIMERO (para consultas repetidas)
     datos_cacheados = query_cache.get_cached_query(simbolo, fecha_desde, fecha_hasta)
@@ -992,11 +995,11 @@ def consulta():
         
         if datos_historicos:
             # Ordenar los datos para estadísticas (más antiguo a más reciente)
-            datos_para_estadisticas = sorted(datos_historicos, key=lambda x: x['fecha'])
+            datos_para_estadisticas = orden_cronologico(datos_historicos)
             estadisticas = calcular_estadisticas_historicas(datos_para_estadisticas)
             
             # NUEVO: Calcular comparación con dólar BCV
-            datos_con_dolar = calcular_comparacion_dolar_accion(datos_para_estadisticas)
+            datos_con_dolar = await acceso_async.ejecutar(calcular_comparacion_dolar_accion, datos_para_estadisticas)
             estadisticas_dolar = calcular_estadisticas_comparacion_dolar(datos_con_dolar)
             
             # Paginación (50 registros por página)
@@ -1022,18 +1025,18 @@ def consulta():
         logger.info(f"Consultando histórico SQLite para {simbolo} desde {fecha_desde} hasta {fecha_hasta}")
         
         # USAR FUNCIÓN OPTIMIZADA CON SQLITE
-        datos_historicos = obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta)
+        datos_historicos = await acceso_async.obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta)
         
         # GUARDAR EN CACHÉ DE CONSULTAS (para consultas repetidas exactamente iguales)
         query_cache.cache_query(simbolo, fecha_desde, fecha_hasta, datos_historicos)
         
         if datos_historicos:
             # Ordenar los datos para estadísticas (más antiguo a más reciente)
-            datos_para_estadisticas = sorted(datos_historicos, key=lambda x: x['fecha'])
+            datos_para_estadisticas = orden_cronologico(datos_historicos)
             estadisticas = calcular_estadisticas_historicas(datos_para_estadisticas)
             
             # NUEVO: Calcular comparación con dólar BCV
-            datos_con_dolar = calcular_comparacion_dolar_accion(datos_para_estadisticas)
+            datos_con_dolar = await acceso_async.ejecutar(calcular_comparacion_dolar_accion, datos_para_estadisticas)
             estadisticas_dolar = calcular_estadisticas_comparacion_dolar(datos_con_dolar)
             
             # Paginación (50 registros por página)
@@ -1069,7 +1072,7 @@ def consulta():
     
     if datos_historicos:
         # Ordenar los datos para el gráfico (más antiguo a más reciente)
-        datos_para_grafico = sorted(datos_historicos, key=lambda x: x['fecha'])
+        datos_para_grafico = orden_cronologico(datos_historicos)
         
         # Ajustar el paso según la cantidad de datos para el gráfico
         # Más datos = más espaciado para no sobrecargar el gráfico
@@ -1328,6 +1331,7 @@ def cargar_dolar_bcv():
         }), 500
 
 @app.route('/api/dolar-bcv/estado')
+@acceso_async.vista_en_hilo
 def api_dolar_bcv_estado():
     """API para verificar estado de datos del dólar BCV."""
     try:
@@ -1389,10 +1393,10 @@ def api_dolar_bcv_estado():
         }), 500
 
 @app.route('/api/dolar-bcv/<fecha>')
-def api_dolar_bcv_fecha(fecha):
+async def api_dolar_bcv_fecha(fecha):
     """API para obtener tasa del dólar BCV por fecha."""
     try:
-        datos = obtener_tasa_dolar_bcv(fecha)
+        datos = await acceso_async.ejecutar(obtener_tasa_dolar_bcv, fecha)
         
         return jsonify({
             'success': True,
@@ -1424,6 +1428,19 @@ def cache_status():
             'fechas_unicas': sqlite_stats['fechas_unicas'],
             'fechas_en_cache': sqlite_stats['fechas_en_cache'],
             'db_size_mb': f"{sqlite_stats['db_size_mb']:.2f}",
+            'tablas': sqlite_stats['tablas'],
+            'pool_conexiones': sqlite_stats['pool_conexiones'],
+            'cache_acciones': sqlite_stats['cache_acciones'],
+            'cache_historicos': sqlite_stats['cache_historicos'],
+            'almacen_columnar': sqlite_stats['almacen_columnar'],
+            'particiones': sqlite_stats['particiones'],
+            'fechas_sin_datos': sqlite_stats['fechas_sin_datos'],
+            'acceso_async': acceso_async.estadisticas(),
+            'data_cache': obtener_indice().estadisticas(),
+            'vigilante_data_cache': vigilante_data_cache.estadisticas(),
+            'calendario_bursatil': calendario_bursatil.estadisticas(),
+            'descargador_bvc': descargador_bvc.estadisticas(),
+            'parser_bvc': estadisticas_parser(),
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         },
         'query_cache': {
@@ -1431,6 +1448,10 @@ def cache_status():
             'cache_hits': query_stats['cache_hits'],
             'cache_misses': query_stats['cache_misses'],
             'hit_rate': f"{query_stats['hit_rate']*100:.1f}%",
+            'evictions': query_stats['evictions'],
+            'expired': query_stats['expired'],
+            'invalidated': query_stats['invalidated'],
+            'bytes': query_stats['bytes'],
             'most_frequent': query_stats['most_frequent'],
             'recent_queries': query_stats['recent_queries']
         }
@@ -1441,10 +1462,11 @@ def clear_cache():
     """Limpia el caché en memoria."""
     sqlite_manager.limpiar_cache()
     query_cache.clear_query_cache()
+    sin_datos = sqlite_manager.olvidar_fechas_sin_datos()
     
     return render_template('exito.html',
                          mensaje="Caché limpiado exitosamente",
-                         detalles="Se limpiaron ambos cachés: SQLite y consultas",
+                         detalles=f"Se limpiaron ambos cachés: SQLite y consultas ({sin_datos} fechas sin datos se volverán a buscar)",
                          volver_url="/")
 
 @app.route('/admin/clear-query-cache')
@@ -1512,15 +1534,40 @@ def optimizar_sqlite():
                              detalles=str(e),
                              volver_url="/admin/cache-status")
 
+@app.route('/admin/auditoria-sql')
+def auditoria_sql():
+    """
+    Plan de consulta (EXPLAIN QUERY PLAN) de cada sentencia SQL de la app,
+    problemas detectados e índices recomendados. ?verificar=0 omite probar
+    los índices propuestos en una copia en memoria.
+    """
+    try:
+        reporte = auditar_app(sqlite_manager.db_path,
+                              carpeta=os.path.dirname(os.path.abspath(__file__)),
+                              registro=registro_sentencias,
+                              verificar=request.args.get('verificar', '1') != '0')
+        return jsonify({
+            'success': True,
+            'trazando_ejecucion': os.environ.get('AUDITAR_SQL') == '1',
+            'data': reporte
+        })
+    except Exception as e:
+        logger.error(f"Error en auditoría SQL: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}',
+            'data': None
+        }), 500
+
 # ========== API ENDPOINTS ==========
 @app.route('/api/datos/<fecha>')
-def api_datos(fecha):
+async def api_datos(fecha):
     """
     Endpoint API para obtener datos en formato JSON.
     Fecha formato: YYYYMMDD
     """
     try:
-        acciones, indice = descargar_y_guardar(fecha)
+        acciones, indice = await acceso_async.descargar_y_guardar(fecha)
         
         if not acciones:
             return jsonify({
@@ -1599,7 +1646,7 @@ def api_datos(fecha):
         }), 500
 
 @app.route('/api/historico')
-def api_historico():
+async def api_historico():
     """
     API para obtener datos históricos de una acción.
     Parámetros: simbolo, fecha_desde, fecha_hasta
@@ -1615,6 +1662,10 @@ def api_historico():
             'data': None
         }), 400
     
+    # Rango invertido: se corrige como en /consulta
+    if fecha_desde.replace('-', '') > fecha_hasta.replace('-', ''):
+        fecha_desde, fecha_hasta = fecha_hasta, fecha_desde
+    
     try:
         # Verificar caché de consultas primero
         datos_cacheados = query_cache.get_cached_query(simbolo, fecha_desde, fecha_hasta)
@@ -1624,7 +1675,7 @@ def api_historico():
             datos_historicos = datos_cacheados
         else:
             # Usar SQLite para consulta ultra rápida
-            datos_historicos = obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta)
+            datos_historicos = await acceso_async.obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta)
             # Guardar en caché para próximas consultas
             query_cache.cache_query(simbolo, fecha_desde, fecha_hasta, datos_historicos)
         
@@ -1652,6 +1703,7 @@ def api_historico():
 
 # ========== NUEVA API PARA HISTORICO COMPLETO ==========
 @app.route('/api/historico-completo')
+@acceso_async.vista_en_hilo
 def api_historico_completo():
     """API para obtener el primer y último registro de una acción"""
     simbolo = request.args.get('simbolo', '').upper()
@@ -1660,36 +1712,26 @@ def api_historico_completo():
         return jsonify({'success': False, 'message': 'Parámetro simbolo requerido'})
     
     try:
-        import sqlite3
-        
         db_path = "database/bolsa_datos.db"
         if not os.path.exists(db_path):
             return jsonify({'success': False, 'message': 'Base de datos no encontrada'})
         
-        conn = sqlite3.connect(db_path)
+        conn = sqlite_manager.conexion_lectura()
         cursor = conn.cursor()
         
         # Obtener la fecha más antigua para esta acción
         cursor.execute('''
-            SELECT MIN(fecha) as primera_fecha 
-            FROM ( 
-                SELECT fecha FROM acciones WHERE simbolo = ?
-                UNION
-                SELECT fecha FROM datos_manuales WHERE simbolo = ?
-            )
-        ''', (simbolo, simbolo))
+            SELECT (SELECT fecha FROM cotizaciones_efectivas
+                    WHERE simbolo = ? ORDER BY fecha_num LIMIT 1) as primera_fecha
+        ''', (simbolo,))
         
         primera_fecha = cursor.fetchone()[0]
         
         # Obtener la fecha más reciente (hoy o la última disponible)
         cursor.execute('''
-            SELECT MAX(fecha) as ultima_fecha 
-            FROM ( 
-                SELECT fecha FROM acciones WHERE simbolo = ?
-                UNION
-                SELECT fecha FROM datos_manuales WHERE simbolo = ?
-            )
-        ''', (simbolo, simbolo))
+            SELECT (SELECT fecha FROM cotizaciones_efectivas
+                    WHERE simbolo = ? ORDER BY fecha_num DESC LIMIT 1) as ultima_fecha
+        ''', (simbolo,))
         
         ultima_fecha = cursor.fetchone()[0]
         
@@ -1722,18 +1764,17 @@ def api_historico_completo():
 
 # ========== NUEVA API PARA OBTENER ACCIONES ACTIVAS ==========
 @app.route('/api/acciones-activas')
+@acceso_async.vista_en_hilo
 def api_acciones_activas():
     """
     API para obtener acciones que han tenido actividad en los últimos 30 días.
     """
     try:
-        import sqlite3
-        
         db_path = "database/bolsa_datos.db"
         if not os.path.exists(db_path):
             return jsonify({'success': False, 'message': 'Base de datos no encontrada', 'acciones': []})
         
-        conn = sqlite3.connect(db_path)
+        conn = sqlite_manager.conexion_lectura()
         cursor = conn.cursor()
         
         # Calcular fecha hace 30 días
@@ -1742,15 +1783,11 @@ def api_acciones_activas():
         
         # Obtener acciones únicas que han tenido actividad en los últimos 30 días
         cursor.execute('''
-            SELECT DISTINCT a.simbolo, a.nombre
-            FROM acciones a
-            WHERE a.fecha >= ?
-            UNION
-            SELECT DISTINCT dm.simbolo, dm.nombre
-            FROM datos_manuales dm
-            WHERE dm.fecha >= ?
+            SELECT DISTINCT simbolo, nombre
+            FROM cotizaciones_efectivas
+            WHERE fecha_num >= ?
             ORDER BY simbolo
-        ''', (fecha_limite, fecha_limite))
+        ''', (fecha_limite,))
         
         acciones = []
         simbolos_unicos = set()
@@ -1771,14 +1808,9 @@ def api_acciones_activas():
                            AVG(variacion) as variacion_promedio,
                            MAX(hoy) as precio_max,
                            MIN(hoy) as precio_min
-                    FROM (
-                        SELECT hoy, variacion FROM acciones 
-                        WHERE simbolo = ? AND fecha >= ?
-                        UNION ALL
-                        SELECT hoy, variacion FROM datos_manuales 
-                        WHERE simbolo = ? AND fecha >= ?
-                    )
-                ''', (simbolo, fecha_limite, simbolo, fecha_limite))
+                    FROM cotizaciones_efectivas 
+                    WHERE simbolo = ? AND fecha_num >= ?
+                ''', (simbolo, fecha_limite))
                 
                 stats = cursor.fetchone()
                 dias_activos = stats[0] if stats else 0
@@ -1830,30 +1862,25 @@ def api_acciones_activas():
 
 # También mantén la API anterior para compatibilidad
 @app.route('/api/acciones-disponibles')
+@acceso_async.vista_en_hilo
 def api_acciones_disponibles():
     """
     API para obtener todas las acciones disponibles en la base de datos.
     """
     try:
-        import sqlite3
-        
         db_path = "database/bolsa_datos.db"
         if not os.path.exists(db_path):
             return jsonify({'success': False, 'message': 'Base de datos no encontrada', 'acciones': []})
         
-        conn = sqlite3.connect(db_path)
+        conn = sqlite_manager.conexion_lectura()
         cursor = conn.cursor()
         
         # Obtener acciones únicas con sus nombres
         cursor.execute('''
             SELECT DISTINCT simbolo, nombre 
-            FROM (
-                SELECT simbolo, nombre FROM acciones 
-                UNION 
-                SELECT simbolo, nombre FROM datos_manuales
-            ) 
+            FROM cotizaciones_efectivas 
             WHERE simbolo IS NOT NULL AND simbolo != ''
-            ORDER BY simbolo
+            ORDER BY simbolo, nombre
         ''')
         
         acciones = []
@@ -1886,11 +1913,11 @@ def api_acciones_disponibles():
         }), 500
 
 @app.route('/api/status')
-def api_status():
+async def api_status():
     """
     Endpoint para verificar el estado del servidor.
     """
-    sqlite_stats = sqlite_manager.estadisticas()
+    sqlite_stats = await acceso_async.estadisticas_sqlite()
     query_stats = query_cache.get_cache_stats()
     
     return jsonify({
@@ -1904,13 +1931,16 @@ def api_status():
                 'engine': 'SQLite',
                 'total_acciones': sqlite_stats['total_acciones'],
                 'fechas_unicas': sqlite_stats['fechas_unicas'],
+                'fecha_min': sqlite_stats['fecha_min'],
+                'fecha_max': sqlite_stats['fecha_max'],
                 'size_mb': f"{sqlite_stats['db_size_mb']:.2f}",
                 'optimized': True
             },
             'cache': {
                 'sqlite_cache_hits': sqlite_stats['fechas_en_cache'],
                 'query_cache_hits': query_stats['cache_hits'],
-                'query_cache_hit_rate': f"{query_stats['hit_rate']*100:.1f}%"
+                'query_cache_hit_rate': f"{query_stats['hit_rate']*100:.1f}%",
+                'precarga': dict(_estado_precarga)
             },
             'caracteristicas': [
                 'Dashboard con Índice IBC',
@@ -1939,15 +1969,16 @@ def api_status():
 @app.route('/admin/diagnostico-tablas')
 def diagnostico_tablas():
     """Diagnóstico de tablas en la base de datos"""
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return jsonify({'error': 'Base de datos no encontrada'})
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
+    # Conteos mantenidos por triggers (sin recorrer las tablas grandes)
+    contadores = sqlite_manager.obtener_estadisticas_tablas()
+    
     # Obtener todas las tablas
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
     tablas = cursor.fetchall()
@@ -1958,9 +1989,12 @@ def diagnostico_tablas():
         # Obtener estructura
         cursor.execute(f"PRAGMA table_info({nombre_tabla})")
         columnas = cursor.fetchall()
-        # Obtener conteo de registros
-        cursor.execute(f"SELECT COUNT(*) FROM {nombre_tabla}")
-        count = cursor.fetchone()[0]
+        # Obtener conteo de registros (COUNT solo en tablas sin contador: diccionarios, dólar BCV)
+        if nombre_tabla in contadores:
+            count = contadores[nombre_tabla]['filas']
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {nombre_tabla}")
+            count = cursor.fetchone()[0]
         
         resultado[nombre_tabla] = {
             'columnas': [col[1] for col in columnas],  # Nombre de columnas
@@ -1980,10 +2014,7 @@ def diagnostico_tablas():
 @app.route('/debug/indices/<fecha_desde>/<fecha_hasta>')
 def debug_indices(fecha_desde, fecha_hasta):
     """Endpoint para depurar datos del índice"""
-    import sqlite3
-    
-    db_path = "database/bolsa_datos.db"
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     # Convertir fechas al formato SQLite (YYYYMMDD)
@@ -2073,7 +2104,7 @@ def debug_indices(fecha_desde, fecha_hasta):
 
 # ========== RUTAS PARA RANKINGS Y ÍNDICES ==========
 @app.route('/rankings')
-def rankings():
+async def rankings():
     """
     Rankings por rango de fechas: Top ganadoras, perdedoras, más y menos negociadas.
     """
@@ -2081,19 +2112,20 @@ def rankings():
     fecha_desde = request.args.get('fecha_desde', '')
     fecha_hasta = request.args.get('fecha_hasta', '')
     
-    # Si no hay fechas, usar valores por defecto (último mes)
+    # Si no hay fechas, usar valores por defecto (último mes de sesiones)
     hoy = datetime.now()
+    periodos = calendario_bursatil.periodos_rapidos(hoy)
     if not fecha_desde:
-        fecha_desde = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
+        fecha_desde = periodos['fecha_30d']
     if not fecha_hasta:
-        fecha_hasta = hoy.strftime('%Y-%m-%d')
+        fecha_hasta = periodos['fecha_hoy']
     
-    # Calcular fechas para los botones de período rápido
-    fecha_7d = (hoy - timedelta(days=7)).strftime('%Y-%m-%d')
-    fecha_30d = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
-    fecha_90d = (hoy - timedelta(days=90)).strftime('%Y-%m-%d')
-    fecha_365d = (hoy - timedelta(days=365)).strftime('%Y-%m-%d')
-    fecha_hoy = hoy.strftime('%Y-%m-%d')
+    # Fechas de los botones de período rápido (sesiones reales, sin SQLite)
+    fecha_7d = periodos['fecha_7d']
+    fecha_30d = periodos['fecha_30d']
+    fecha_90d = periodos['fecha_90d']
+    fecha_365d = periodos['fecha_365d']
+    fecha_hoy = periodos['fecha_hoy']
     
     # Inicializar resultados
     top_ganadoras = []
@@ -2110,8 +2142,11 @@ def rankings():
         
         logger.info(f"Calculando rankings del {fecha_desde} al {fecha_hasta}")
         
-        # Obtener rankings desde SQLite
-        rankings_data = obtener_rankings_por_rango(fecha_desde_sql, fecha_hasta_sql)
+        # Obtener rankings desde SQLite (un rango sin sesiones no necesita consulta)
+        if calendario_bursatil.sesiones_entre(fecha_desde_sql, fecha_hasta_sql):
+            rankings_data = await acceso_async.ejecutar(obtener_rankings_por_rango, fecha_desde_sql, fecha_hasta_sql)
+        else:
+            rankings_data = {}
         
         top_ganadoras = rankings_data.get('top_ganadoras', [])
         top_perdedoras = rankings_data.get('top_perdedoras', [])
@@ -2149,7 +2184,7 @@ def rankings():
 
 # ========== RUTA CORREGIDA PARA ÍNDICES IBC ==========
 @app.route('/indices')
-def indices():
+async def indices():
     """
     Página de análisis del Índice Bursátil de Caracas (IBC) con comparativa del dólar BCV.
     """
@@ -2157,19 +2192,20 @@ def indices():
     fecha_desde = request.args.get('fecha_desde', '')
     fecha_hasta = request.args.get('fecha_hasta', '')
     
-    # Si no hay fechas, usar valores por defecto (último mes)
+    # Si no hay fechas, usar valores por defecto (último mes de sesiones)
     hoy = datetime.now()
+    periodos = calendario_bursatil.periodos_rapidos(hoy)
     if not fecha_desde:
-        fecha_desde = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
+        fecha_desde = periodos['fecha_30d']
     if not fecha_hasta:
-        fecha_hasta = hoy.strftime('%Y-%m-%d')
+        fecha_hasta = periodos['fecha_hoy']
     
-    # Calcular fechas para los botones de período rápido
-    fecha_7d = (hoy - timedelta(days=7)).strftime('%Y-%m-%d')
-    fecha_30d = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
-    fecha_90d = (hoy - timedelta(days=90)).strftime('%Y-%m-%d')
-    fecha_365d = (hoy - timedelta(days=365)).strftime('%Y-%m-%d')
-    fecha_hoy = hoy.strftime('%Y-%m-%d')
+    # Fechas de los botones de período rápido (sesiones reales, sin SQLite)
+    fecha_7d = periodos['fecha_7d']
+    fecha_30d = periodos['fecha_30d']
+    fecha_90d = periodos['fecha_90d']
+    fecha_365d = periodos['fecha_365d']
+    fecha_hoy = periodos['fecha_hoy']
     
     try:
         # Convertir fechas a formato SQLite
@@ -2181,16 +2217,16 @@ def indices():
     except Exception as e:
         logger.error(f"Error formateando fechas: {e}")
         # Usar valores por defecto si hay error
-        fecha_desde = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
-        fecha_hasta = hoy.strftime('%Y-%m-%d')
-        fecha_desde_sql = (hoy - timedelta(days=30)).strftime('%Y%m%d')
-        fecha_hasta_sql = hoy.strftime('%Y%m%d')
-    
-    # Obtener datos del índice desde SQLite usando la función corregida
-    datos_indice, estadisticas_indice = obtener_datos_indice_historico(fecha_desde_sql, fecha_hasta_sql)
-    
-    # NUEVO: Obtener datos del dólar BCV para el mismo período
-    datos_dolar_bcv = obtener_datos_dolar_bcv_historico(fecha_desde, fecha_hasta)
+        fecha_desde = periodos['fecha_30d']
+        fecha_hasta = periodos['fecha_hoy']
+        fecha_desde_sql = fecha_desde.replace('-', '')
+        fecha_hasta_sql = fecha_hasta.replace('-', '')
+    
+    # Índice (SQLite) y dólar BCV del mismo período, en paralelo en el pool de hilos
+    (datos_indice, estadisticas_indice), datos_dolar_bcv = await asyncio.gather(
+        acceso_async.ejecutar(obtener_datos_indice_historico, fecha_desde_sql, fecha_hasta_sql),
+        acceso_async.ejecutar(obtener_datos_dolar_bcv_historico, fecha_desde, fecha_hasta)
+    )
     
     # Preparar datos para el gráfico - CORREGIDO PARA ALINEAR FECHAS Y MANEJAR DATOS FALTANTES
     labels = []
@@ -2338,30 +2374,21 @@ def obtener_rankings_por_rango(fecha_desde, fecha_hasta):
     """
     Obtiene rankings por rango de fechas desde SQLite.
     """
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return {}
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
         # 1. Obtener todas las acciones en el rango
         cursor.execute('''
             SELECT simbolo, nombre, variacion, monto, fecha
-            FROM (
-                SELECT simbolo, nombre, variacion, monto, fecha 
-                FROM acciones 
-                WHERE fecha BETWEEN ? AND ?
-                UNION ALL
-                SELECT simbolo, nombre, variacion, monto, fecha 
-                FROM datos_manuales 
-                WHERE fecha BETWEEN ? AND ?
-            ) 
-            ORDER BY fecha, simbolo
-        ''', (fecha_desde, fecha_hasta, fecha_desde, fecha_hasta))
+            FROM cotizaciones_efectivas 
+            WHERE fecha_num BETWEEN ? AND ?
+            ORDER BY fecha_num, simbolo
+        ''', (fecha_desde, fecha_hasta))
         
         datos = cursor.fetchall()
         
@@ -2486,18 +2513,41 @@ def obtener_rankings_por_rango(fecha_desde, fecha_hasta):
     finally:
         conn.close()
 
-# Precargar datos comunes al recibir la primera solicitud
-@app.before_request
-def iniciar_cache():
-    """Precarga datos comunes al recibir la primera solicitud."""
-    global _cache_precargado
-    if not _cache_precargado:
-        try:
-            precargar_datos_comunes()
-            logger.info("✅ Caché SQLite precargado exitosamente")
-            _cache_precargado = True
-        except Exception as e:
-            logger.error(f"Error precargando caché SQLite: {e}")
+# ========== PRECARGA DE CACHÉ EN SEGUNDO PLANO ==========
+def _precargar_cache():
+    """Cuerpo del hilo de precarga (.dat recientes + caché de SQLite)."""
+    inicio = datetime.now()
+    _estado_precarga['inicio'] = inicio.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        fechas = precargar_datos_comunes()
+        _estado_precarga.update(estado='completada', fechas=fechas)
+        logger.info("✅ Caché SQLite precargado exitosamente")
+    except Exception as e:
+        _estado_precarga.update(estado='error', error=str(e))
+        logger.error(f"Error precargando caché SQLite: {e}")
+    fin = datetime.now()
+    _estado_precarga.update(fin=fin.strftime('%Y-%m-%d %H:%M:%S'),
+                            duracion_s=round((fin - inicio).total_seconds(), 2))
+
+def iniciar_precarga():
+    """
+    Lanza la precarga una sola vez en un hilo daemon. Las solicitudes nunca la
+    esperan: mientras corre, las lecturas van a SQLite como en frío.
+    """
+    with _lock_precarga:
+        if _estado_precarga['estado'] != 'pendiente':
+            return False
+        _estado_precarga['estado'] = 'en_curso'
+    threading.Thread(target=_precargar_cache, name="PrecargaCache", daemon=True).start()
+    return True
+
+# La precarga arranca al cargar la aplicación (servidor de desarrollo o WSGI)
+iniciar_precarga()
+
+# Con VIGILAR_DATA_CACHE=1 los .dat que se copien a data_cache se cargan solos.
+# Con varios procesos WSGI conviene uno solo: python vigilante_data_cache.py aparte
+if os.environ.get('VIGILAR_DATA_CACHE') == '1':
+    vigilante_data_cache.iniciar()
 
 # Inyectar la función now() y constantes para que funcionen en el HTML
 @app.context_processor
@@ -2530,13 +2580,10 @@ if __name__ == '__main__':
         print("  • ✅ GRÁFICO COMPARATIVO IBC vs DÓLAR BCV")
         print("=" * 60)
         
-        print("🔄 Precargando caché SQLite al iniciar...")
-        precargar_datos_comunes()
+        print("🔄 Precargando caché SQLite en segundo plano (estado en /api/status)...")
         sqlite_stats = sqlite_manager.estadisticas()
-        query_stats = query_cache.get_cache_stats()
-        print(f"✅ SQLite precargado: {sqlite_stats['fechas_unicas']} fechas, {sqlite_stats['total_acciones']} acciones")
+        print(f"✅ SQLite: {sqlite_stats['fechas_unicas']} fechas, {sqlite_stats['total_acciones']} acciones")
         print(f"📊 Tamaño BD: {sqlite_stats['db_size_mb']:.2f} MB")
-        _cache_precargado = True
         
         # Verificar tabla dólar BCV
         crear_tabla_dolar_bcv()
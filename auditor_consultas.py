@@ -0,0 +1,354 @@
+# auditor_consultas.py - Auditoría de planes de consulta (EXPLAIN QUERY PLAN) y asesor de índices
+# Recolecta las sentencias SQL de la app (análisis estático del código y, si se activa,
+# las que se ejecutan realmente en el pool), revisa su plan contra una base real y
+# propone índices para los SCAN completos, índices automáticos y B-trees temporales.
+#
+# Uso: python auditor_consultas.py [ruta_db] [--json] [--sin-verificar]
+
+import ast
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+# Módulos cuyo SQL se audita
+ARCHIVOS_APP = (
+    'app.py',
+    'sqlite_manager.py',
+    'datos_manuales.py',
+    'extractor.py',
+    'almacen_columnar.py',
+    'cargar_todos_dat.py',
+)
+
+# Con menos filas un SCAN completo no merece un índice
+FILAS_MINIMAS_SCAN = 1000
+
+_RE_ESPACIOS = re.compile(r'\s+')
+_RE_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_RE_TABLAS = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(?!WHERE|ON|JOIN|SET|ORDER|GROUP|'
+    r'LEFT|INNER|CROSS|USING|LIMIT|UNION|VALUES|SELECT|DEFAULT|WITH|EXCEPT|INTERSECT|NATURAL|HAVING)(\w+))?',
+    re.IGNORECASE)
+_RE_COMPARACION = re.compile(
+    r'(?:\b(\w+)\.)?\b(\w+)\s*(=|==|>=|<=|>|<|\bIN\b|\bBETWEEN\b|\bLIKE\b)', re.IGNORECASE)
+_RE_MIN_MAX = re.compile(r'\b(?:MIN|MAX)\s*\(\s*(?:\w+\.)?(\w+)\s*\)', re.IGNORECASE)
+_RE_SET = re.compile(r'\bSET\b.*?(?=\bWHERE\b|$)', re.IGNORECASE)
+
+def _normalizar(sql):
+    return _RE_ESPACIOS.sub(' ', sql).strip().rstrip(';')
+
+def _es_auditable(sql):
+    """Solo sentencias cuyo plan lee tablas (se omiten DDL, PRAGMA e INSERT ... VALUES)."""
+    if re.search(r'\btemp\.', sql, re.IGNORECASE):
+        return False  # Tablas temporales de un trabajo de escritura: no existen fuera de él
+    primera = sql.split(' ', 1)[0].upper()
+    if primera in ('SELECT', 'WITH', 'UPDATE', 'DELETE'):
+        return True
+    return primera in ('INSERT', 'REPLACE') and ' SELECT ' in sql.upper()
+
+# ========== RECOLECCIÓN DE SENTENCIAS ==========
+def recolectar_sentencias(archivos=ARCHIVOS_APP, carpeta='.'):
+    """
+    Análisis estático: toma el SQL literal de cada .execute()/.executemany() de los
+    archivos indicados. Retorna {sql_normalizado: [origenes 'archivo:línea']}.
+    Las sentencias armadas con f-strings se marcan como dinámicas (origen sin SQL).
+    """
+    sentencias = {}
+    dinamicas = []
+    for archivo in archivos:
+        ruta = os.path.join(carpeta, archivo)
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, encoding='utf-8') as f:
+            arbol = ast.parse(f.read(), filename=archivo)
+        for nodo in ast.walk(arbol):
+            if not (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute)
+                    and nodo.func.attr in ('execute', 'executemany') and nodo.args):
+                continue
+            origen = f"{archivo}:{nodo.lineno}"
+            argumento = nodo.args[0]
+            if isinstance(argumento, ast.Constant) and isinstance(argumento.value, str):
+                sql = _normalizar(argumento.value)
+                if _es_auditable(sql):
+                    sentencias.setdefault(sql, []).append(origen)
+            else:
+                dinamicas.append(origen)
+    return sentencias, dinamicas
+
+class RegistroSentencias:
+    """
+    Registro en tiempo de ejecución de las sentencias que se ejecutan (trace callback
+    de sqlite3). Agrupa por la forma de la sentencia con los literales como '?' y
+    guarda un ejemplo ya expandido, que se puede explicar sin parámetros.
+    """
+
+    def __init__(self, max_sentencias=500):
+        self.max_sentencias = max_sentencias
+        self._sentencias = {}  # {forma: [ejemplo, veces]}
+        self._lock = threading.Lock()
+
+    def anotar(self, sql):
+        sql = _normalizar(sql)
+        if not _es_auditable(sql):
+            return
+        forma = _RE_LITERALES.sub('?', sql)
+        with self._lock:
+            entrada = self._sentencias.get(forma)
+            if entrada is not None:
+                entrada[1] += 1
+            elif len(self._sentencias) < self.max_sentencias:
+                self._sentencias[forma] = [sql, 1]
+
+    def sentencias(self):
+        """{sql_ejemplo: ['ejecutada Nx']}, en el formato de recolectar_sentencias."""
+        with self._lock:
+            return {ejemplo: [f"ejecutada {veces}x"]
+                    for ejemplo, veces in self._sentencias.values()}
+
+    def limpiar(self):
+        with self._lock:
+            self._sentencias.clear()
+
+# ========== PLANES Y PROPUESTAS ==========
+def _plan(conn, sql):
+    """Filas 'detail' de EXPLAIN QUERY PLAN (los parámetros se enlazan a NULL)."""
+    filas = conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count('?')).fetchall()
+    return [fila[3] for fila in filas]
+
+def _alias_tablas(sql, vistas):
+    """
+    {alias o nombre: tabla} de las tablas nombradas en la sentencia. Las vistas se
+    expanden con su definición: el plan nombra las tablas internas de la vista.
+    """
+    alias = {}
+    for tabla, nombre in _RE_TABLAS.findall(sql):
+        alias[tabla] = tabla
+        if nombre:
+            alias[nombre] = tabla
+        if tabla in vistas:
+            for interno, tabla_interna in _alias_tablas(vistas[tabla], {}).items():
+                alias.setdefault(interno, tabla_interna)
+    return alias
+
+def _problemas(sql, detalles, alias, filas_tabla):
+    """Lista de (tipo, alias, detalle) de las operaciones costosas del plan."""
+    con_filtro = re.search(r'\b(?:WHERE|ON)\b', sql, re.IGNORECASE) is not None
+    problemas = []
+    for detalle in detalles:
+        partes = detalle.split()
+        if partes[0] == 'SCAN' and len(partes) > 1 and partes[1] in alias:
+            tabla = alias[partes[1]]
+            # Recorrer un índice entero solo es problema si la consulta filtra:
+            # un COUNT/MIN/MAX/DISTINCT de toda la tabla no tiene mejor plan
+            if 'INDEX' in partes and not con_filtro:
+                continue
+            tipo = 'scan_indice' if 'INDEX' in partes else 'scan_completo'
+            if filas_tabla(tabla) >= FILAS_MINIMAS_SCAN:
+                problemas.append((tipo, partes[1], detalle))
+        elif 'AUTOMATIC' in partes and len(partes) > 1 and partes[1] in alias:
+            problemas.append(('indice_automatico', partes[1], detalle))
+        elif detalle.startswith('USE TEMP B-TREE'):
+            problemas.append(('btree_temporal', None, detalle))
+    return problemas
+
+def _columnas_clausula(sql, clausula):
+    """Columnas (sin alias) de GROUP BY / ORDER BY, hasta la siguiente cláusula."""
+    m = re.search(rf'\b{clausula}\s+(.*?)(?=\bLIMIT\b|\bHAVING\b|\bORDER\b|\bUNION\b|\)|$)',
+                  sql, re.IGNORECASE)
+    if not m:
+        return []
+    columnas = []
+    for termino in m.group(1).split(','):
+        palabras = termino.strip().split()
+        if palabras:
+            columnas.append(palabras[0].split('.')[-1])
+    return columnas
+
+def _proponer_indice(sql, alias, tabla, columnas_tabla):
+    """
+    Índice candidato para 'tabla': igualdades primero, luego agrupación/orden y
+    por último la columna de rango o de MIN/MAX. None si no hay columnas útiles.
+    """
+    filtro = _RE_SET.sub(' ', sql)
+    igualdades, rangos = [], []
+    for calificador, columna, operador in _RE_COMPARACION.findall(filtro):
+        if columna not in columnas_tabla or (calificador and calificador != alias):
+            continue
+        destino = igualdades if operador.upper() in ('=', '==', 'IN') else rangos
+        destino.append(columna)
+
+    seleccion = re.match(r'SELECT\s+DISTINCT\s+(.*?)\s+FROM\b', sql, re.IGNORECASE)
+    distintas = [c.strip().split('.')[-1] for c in seleccion.group(1).split(',')] if seleccion else []
+    orden = (_columnas_clausula(sql, 'GROUP BY') + distintas +
+             _columnas_clausula(sql, 'ORDER BY') + rangos + _RE_MIN_MAX.findall(sql))
+
+    propuesta = []
+    for columna in igualdades + orden:
+        if columna in columnas_tabla and columna not in propuesta:
+            propuesta.append(columna)
+    if not propuesta:
+        return None
+    propuesta = propuesta[:4]
+    return f"CREATE INDEX IF NOT EXISTS idx_{tabla}_{'_'.join(propuesta)} ON {tabla}({', '.join(propuesta)})"
+
+class _Base:
+    """Conexión de solo lectura a la base auditada y, para verificar, una copia en memoria."""
+
+    def __init__(self, db_path, verificar):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        self.copia = None
+        if verificar:
+            self.copia = sqlite3.connect(':memory:')
+            self.conn.backup(self.copia)
+        self.vistas = dict(self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'"))
+        self._columnas = {}
+        self._filas = {}
+
+    def columnas(self, tabla):
+        if tabla not in self._columnas:
+            self._columnas[tabla] = {fila[1] for fila in self.conn.execute(f'PRAGMA table_info("{tabla}")')}
+        return self._columnas[tabla]
+
+    def filas(self, tabla):
+        if tabla not in self._filas:
+            try:
+                self._filas[tabla] = self.conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+            except sqlite3.Error:
+                self._filas[tabla] = 0
+        return self._filas[tabla]
+
+    def verificar(self, sql, indice, problemas):
+        """¿El índice quita alguno de los problemas? (se crea y se borra en la copia)."""
+        nombre = indice.split()[5]
+        try:
+            self.copia.execute(indice)
+            despues = _problemas(sql, _plan(self.copia, sql), _alias_tablas(sql, self.vistas), self.filas)
+        finally:
+            self.copia.execute(f"DROP INDEX IF EXISTS {nombre}")
+        return len(despues) < len(problemas)
+
+    def cerrar(self):
+        self.conn.close()
+        if self.copia is not None:
+            self.copia.close()
+
+def auditar(db_path, sentencias, dinamicas=(), verificar=True):
+    """
+    Ejecuta EXPLAIN QUERY PLAN de cada sentencia sobre db_path (solo lectura).
+    sentencias: {sql: [origenes]}. Retorna el reporte (dict serializable a JSON).
+    Con verificar=True cada índice propuesto se prueba en una copia en memoria y
+    solo se recomienda si mejora el plan.
+    """
+    base = _Base(db_path, verificar)
+    resultados = []
+    recomendados = {}
+    try:
+        for sql, origenes in sentencias.items():
+            resultado = {'sql': sql, 'origenes': origenes, 'plan': [], 'problemas': [], 'propuestas': []}
+            resultados.append(resultado)
+            try:
+                resultado['plan'] = _plan(base.conn, sql)
+            except sqlite3.Error as e:
+                resultado['error'] = str(e)
+                continue
+
+            alias = _alias_tablas(sql, base.vistas)
+            problemas = _problemas(sql, resultado['plan'], alias, base.filas)
+            resultado['problemas'] = [{'tipo': tipo, 'detalle': detalle} for tipo, _, detalle in problemas]
+
+            # Tablas a indexar: las del SCAN/índice automático; para B-trees, la principal
+            objetivos = [a for _, a, _ in problemas if a]
+            if any(a is None for _, a, _ in problemas) and alias:
+                objetivos.append(next(iter(alias)))
+            for nombre in dict.fromkeys(objetivos):
+                tabla = alias[nombre]
+                if tabla in base.vistas or tabla.startswith('sqlite_'):
+                    continue  # Se indexan las tablas, no las vistas ni el catálogo
+                indice = _proponer_indice(sql, nombre, tabla, base.columnas(tabla))
+                if indice is None:
+                    continue
+                propuesta = {'indice': indice, 'mejora': None}
+                if verificar:
+                    try:
+                        propuesta['mejora'] = base.verificar(sql, indice, problemas)
+                    except sqlite3.Error as e:
+                        propuesta['mejora'] = False
+                        propuesta['error'] = str(e)
+                resultado['propuestas'].append(propuesta)
+                if propuesta['mejora'] is not False:
+                    recomendados.setdefault(indice, []).extend(origenes)
+    finally:
+        base.cerrar()
+
+    return {
+        'base_datos': db_path,
+        'sentencias': len(resultados),
+        'con_problemas': sum(1 for r in resultados if r['problemas']),
+        'con_error': sum(1 for r in resultados if 'error' in r),
+        'dinamicas_sin_auditar': list(dinamicas),
+        'indices_recomendados': [{'indice': indice, 'origenes': sorted(set(origenes))}
+                                 for indice, origenes in recomendados.items()],
+        'resultados': resultados,
+    }
+
+def auditar_app(db_path, carpeta='.', registro=None, verificar=True):
+    """Audita el SQL estático de ARCHIVOS_APP más el registrado en ejecución (si hay)."""
+    sentencias, dinamicas = recolectar_sentencias(carpeta=carpeta)
+    if registro is not None:
+        for sql, origenes in registro.sentencias().items():
+            sentencias.setdefault(sql, []).extend(origenes)
+    return auditar(db_path, sentencias, dinamicas, verificar)
+
+def imprimir_reporte(reporte):
+    print("=" * 70)
+    print(f"=== AUDITORÍA DE CONSULTAS SQL: {reporte['base_datos']} ===")
+    print("=" * 70)
+    print(f"📊 {reporte['sentencias']} sentencias | {reporte['con_problemas']} con problemas | "
+          f"{reporte['con_error']} con error | {len(reporte['dinamicas_sin_auditar'])} dinámicas sin auditar")
+
+    for resultado in reporte['resultados']:
+        if not resultado['problemas'] and 'error' not in resultado:
+            continue
+        print(f"\n📍 {', '.join(resultado['origenes'])}")
+        print(f"   {resultado['sql'][:160]}{'...' if len(resultado['sql']) > 160 else ''}")
+        if 'error' in resultado:
+            print(f"   ❌ {resultado['error']}")
+            continue
+        for problema in resultado['problemas']:
+            print(f"   ⚠️  {problema['tipo']}: {problema['detalle']}")
+        for propuesta in resultado['propuestas']:
+            marca = {True: '✅', False: '➖', None: '💡'}[propuesta['mejora']]
+            print(f"   {marca} {propuesta['indice']}")
+
+    print("\n" + "=" * 70)
+    if reporte['indices_recomendados']:
+        print("💡 ÍNDICES RECOMENDADOS:")
+        for recomendado in reporte['indices_recomendados']:
+            print(f"   {recomendado['indice']};")
+            print(f"      ↳ {', '.join(recomendado['origenes'])}")
+    else:
+        print("✅ Sin índices recomendados")
+    print("=" * 70)
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    db_path = argumentos[0] if argumentos else "database/bolsa_datos.db"
+    if not os.path.exists(db_path):
+        print(f"❌ Base de datos no encontrada: {db_path}")
+        return
+
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    reporte = auditar_app(db_path, carpeta=carpeta, verificar='--sin-verificar' not in sys.argv)
+    if '--json' in sys.argv:
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+    else:
+        imprimir_reporte(reporte)
+
+# Registro global de sentencias ejecutadas (se activa con AUDITAR_SQL=1 en app.py)
+registro_sentencias = RegistroSentencias()
+
+if __name__ == "__main__":
+    main()
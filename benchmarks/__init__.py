@@ -0,0 +1 @@
+# benchmarks - Scripts de medición de rendimiento (ejecutar con: python -m benchmarks.<nombre>)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# benchmarks/conexiones.py - Costo de abrir conexiones SQLite: antes (connect por llamada) vs pool
+#
+# Uso: python -m benchmarks.conexiones [ruta_db] [iteraciones]
+# Trabaja sobre una COPIA temporal de la base de datos para no modificarla.
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlite_pool import PoolConexiones
+
+CONSULTA_FECHA = '''
+    SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs,
+           variacion, cantidad, monto, fuente
+    FROM acciones
+    WHERE fecha = ?
+    UNION
+    SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs,
+           variacion, cantidad, monto, fuente
+    FROM datos_manuales
+    WHERE fecha = ?
+    ORDER BY simbolo
+'''
+
+def _medir(nombre, funcion, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    total = time.perf_counter() - inicio
+    print(f"   • {nombre:<38} {total * 1000:9.1f} ms total | {total / iteraciones * 1e6:8.1f} µs/llamada")
+    return total
+
+def main():
+    db_origen = sys.argv[1] if len(sys.argv) > 1 else "database/bolsa_datos.db"
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    if not os.path.exists(db_origen):
+        print(f"❌ Base de datos no encontrada: {db_origen}")
+        return
+
+    carpeta = tempfile.mkdtemp(prefix="bench_conexiones_")
+    db_path = os.path.join(carpeta, "bolsa_datos.db")
+    shutil.copy(db_origen, db_path)
+
+    conn = sqlite3.connect(db_path)
+    fecha = conn.execute("SELECT MAX(fecha) FROM acciones").fetchone()[0] or '20260101'
+    conn.close()
+
+    pool = PoolConexiones(db_path)
+
+    def antes_solo_conexion():
+        c = sqlite3.connect(db_path, check_same_thread=False)
+        c.close()
+
+    def despues_solo_conexion():
+        c = pool.obtener()
+        pool.liberar(c)
+
+    def antes_consulta():
+        c = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            c.execute(CONSULTA_FECHA, (fecha, fecha)).fetchall()
+        finally:
+            c.close()
+
+    def despues_consulta():
+        c = pool.obtener()
+        try:
+            c.execute(CONSULTA_FECHA, (fecha, fecha)).fetchall()
+        finally:
+            pool.liberar(c)
+
+    print("=" * 70)
+    print(f"=== BENCHMARK DE CONEXIONES SQLite ({iteraciones} iteraciones) ===")
+    print("=" * 70)
+    print("1️⃣  Solo abrir/cerrar (o prestar/devolver) conexión:")
+    t_antes = _medir("ANTES: sqlite3.connect por llamada", antes_solo_conexion, iteraciones)
+    t_despues = _medir("DESPUÉS: PoolConexiones", despues_solo_conexion, iteraciones)
+    print(f"   ⚡ Aceleración: {t_antes / t_despues:.1f}x")
+
+    print(f"\n2️⃣  Conexión + consulta de acciones por fecha ({fecha}):")
+    t_antes = _medir("ANTES: sqlite3.connect por llamada", antes_consulta, iteraciones)
+    t_despues = _medir("DESPUÉS: PoolConexiones", despues_consulta, iteraciones)
+    print(f"   ⚡ Aceleración: {t_antes / t_despues:.1f}x")
+
+    print(f"\n📊 Pool: {pool.estadisticas()}")
+    pool.cerrar()
+    shutil.rmtree(carpeta, ignore_errors=True)
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
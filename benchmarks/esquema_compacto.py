@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# benchmarks/esquema_compacto.py - Archivo completo: tablas acciones/datos_manuales TEXT vs cotizaciones compacta
+#
+# Uso: python -m benchmarks.esquema_compacto [ruta_db] [iteraciones]
+# ruta_db es una base anterior a la migración v1 (acciones y datos_manuales como tablas),
+# que no se modifica. ANTES es una copia tal cual; DESPUÉS es otra copia migrada por
+# sqlite_manager en un proceso aparte (carpeta de trabajo propia). Las dos se compactan
+# con VACUUM y se compara el archivo entero (tablas, índices, contadores y triggers) y la
+# latencia de las consultas por fecha, histórico de un símbolo y rango de fechas.
+
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLUMNAS = '''fecha, simbolo, nombre, anterior, hoy, diferencia_bs,
+              variacion, cantidad, monto, fuente'''
+
+def _efectivas(filtro):
+    """ANTES: filas efectivas (el manual gana) de las tablas TEXT con el mismo filtro."""
+    return f'''
+        SELECT {COLUMNAS} FROM datos_manuales WHERE {filtro}
+        UNION ALL
+        SELECT {COLUMNAS} FROM acciones a WHERE {filtro}
+           AND NOT EXISTS (SELECT 1 FROM datos_manuales m
+                           WHERE m.fecha = a.fecha AND m.simbolo = a.simbolo)'''
+
+# (descripción, consulta ANTES, consulta DESPUÉS); la columna de filtro cambia a fecha_num
+CONSULTAS = [
+    ('Acciones por fecha',
+     f"{_efectivas('fecha = :fecha')} ORDER BY simbolo",
+     f'SELECT {COLUMNAS} FROM cotizaciones_efectivas WHERE fecha_num = :fecha ORDER BY simbolo'),
+    ('Histórico de un símbolo',
+     f"{_efectivas('simbolo = :simbolo AND fecha BETWEEN :desde AND :hasta')} ORDER BY fecha DESC",
+     f'''SELECT {COLUMNAS} FROM cotizaciones_efectivas
+         WHERE simbolo = :simbolo AND fecha_num BETWEEN :desde AND :hasta ORDER BY fecha_num DESC'''),
+    ('Rango de fechas (rankings)',
+     f"{_efectivas('fecha BETWEEN :desde AND :hasta')} ORDER BY fecha, simbolo",
+     f'''SELECT {COLUMNAS} FROM cotizaciones_efectivas
+         WHERE fecha_num BETWEEN :desde AND :hasta ORDER BY fecha_num, simbolo'''),
+]
+
+def _medir(nombre, funcion, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    total = time.perf_counter() - inicio
+    print(f"   • {nombre:<38} {total * 1000:9.1f} ms total | {total / iteraciones * 1e6:8.1f} µs/llamada")
+    return total
+
+def _compactar(db_path):
+    """Deja el archivo sin WAL y compactado con VACUUM; retorna su tamaño en bytes."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('VACUUM')
+    conn.close()
+    return os.path.getsize(db_path)
+
+def _migrar(db_origen, carpeta):
+    """Copia la base a carpeta/database y la migra importando sqlite_manager en otro proceso."""
+    os.makedirs(os.path.join(carpeta, 'database'))
+    destino = os.path.join(carpeta, 'database', 'bolsa_datos.db')
+    shutil.copy(db_origen, destino)
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (RAIZ, os.environ.get('PYTHONPATH')))))
+    proceso = subprocess.run([sys.executable, '-c', 'import sqlite_manager'],
+                             cwd=carpeta, env=entorno, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError((proceso.stderr or proceso.stdout).strip()[-2000:])
+    return destino
+
+def _tamanos_por_objeto(conn):
+    """{tabla o índice: bytes} usando dbstat (None si SQLite no lo incluye)."""
+    try:
+        return dict(conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC"
+        ).fetchall())
+    except sqlite3.OperationalError:
+        return None
+
+def main():
+    db_origen = sys.argv[1] if len(sys.argv) > 1 else "database/bolsa_datos.db"
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    if not os.path.exists(db_origen):
+        print(f"❌ Base de datos no encontrada: {db_origen}")
+        return
+    origen = sqlite3.connect(f'file:{os.path.abspath(db_origen)}?mode=ro', uri=True)
+    tipo = origen.execute("SELECT type FROM sqlite_master WHERE name = 'acciones'").fetchone()
+    origen.close()
+    if tipo != ('table',):
+        print("❌ La base ya está migrada (acciones no es una tabla): indicar una copia anterior a la v1")
+        return
+
+    carpeta = tempfile.mkdtemp(prefix="bench_esquema_")
+    try:
+        db_antes = os.path.join(carpeta, "antes.db")
+        shutil.copy(db_origen, db_antes)
+        db_despues = _migrar(db_origen, os.path.join(carpeta, "despues"))
+        tam_antes = _compactar(db_antes)
+        tam_despues = _compactar(db_despues)
+
+        antes = sqlite3.connect(db_antes)
+        despues = sqlite3.connect(db_despues)
+        registros = despues.execute("SELECT COUNT(*) FROM cotizaciones").fetchone()[0]
+        fecha = despues.execute("SELECT MAX(fecha) FROM cotizaciones WHERE manual = 0").fetchone()[0] or 20260101
+        simbolo = despues.execute('''
+            SELECT s.simbolo FROM cotizaciones c JOIN simbolos s ON s.id = c.simbolo_id
+            GROUP BY c.simbolo_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()
+        parametros = [
+            {'fecha': fecha},
+            {'simbolo': simbolo[0] if simbolo else 'BNC', 'desde': fecha - 30000, 'hasta': fecha},
+            {'desde': fecha - 10000, 'hasta': fecha},
+        ]
+
+        print("=" * 70)
+        print(f"=== BENCHMARK ESQUEMA COMPACTO ({registros} cotizaciones, {iteraciones} iteraciones) ===")
+        print("=" * 70)
+        print("1️⃣  Tamaño del archivo completo (tras VACUUM):")
+        print(f"   • ANTES: acciones + datos_manuales TEXT {tam_antes / 1024:9.1f} KB")
+        print(f"   • DESPUÉS: cotizaciones + vistas       {tam_despues / 1024:9.1f} KB")
+        print(f"   💾 Reducción: {(1 - tam_despues / tam_antes) * 100:.1f}%")
+        for etiqueta, conn in (("ANTES", antes), ("DESPUÉS", despues)):
+            tamanos = _tamanos_por_objeto(conn)
+            if tamanos:
+                detalle = ', '.join(f"{nombre} {tam / 1024:.0f} KB" for nombre, tam in tamanos.items()
+                                    if tam >= 8192)
+                print(f"     {etiqueta}: {detalle}")
+
+        for numero, ((descripcion, sql_antes, sql_despues), params) in enumerate(zip(CONSULTAS, parametros), 2):
+            # ANTES filtra por fecha TEXT
+            params_antes = {k: (f"{v:08d}" if isinstance(v, int) else v) for k, v in params.items()}
+            filas_antes = antes.execute(sql_antes, params_antes).fetchall()
+            filas_despues = despues.execute(sql_despues, params).fetchall()
+            iguales = "✅ mismas filas" if filas_antes == filas_despues else "❌ resultados distintos"
+            print(f"\n{numero}️⃣  {descripcion} {params} - {len(filas_antes)} filas, {iguales}:")
+            t_antes = _medir("ANTES: tablas TEXT",
+                             lambda: antes.execute(sql_antes, params_antes).fetchall(), iteraciones)
+            t_despues = _medir("DESPUÉS: vista sobre cotizaciones",
+                               lambda: despues.execute(sql_despues, params).fetchall(), iteraciones)
+            print(f"   ⚡ Aceleración: {t_antes / t_despues:.1f}x")
+
+        antes.close()
+        despues.close()
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
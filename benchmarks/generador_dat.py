@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# benchmarks/generador_dat.py - Archivos .dat sintéticos con el formato de la BVC
+#
+# Uso: python -m benchmarks.generador_dat carpeta [--anios=N] [--simbolos=M] [--desde=YYYYMMDD]
+#                                                  [--semilla=S] [--gz]
+# Escribe un <YYYYMMDD>.dat por día hábil (lunes a viernes, con algunos feriados) de
+# `anios` años para `simbolos` símbolos: líneas R| de 13 campos y una IG| con el IBC,
+# números en formato venezolano ('1.234.567,89'), fin de línea CRLF. Los precios siguen
+# un paseo aleatorio y hay días sin operaciones (cantidad y monto en cero).
+# Con la misma semilla los archivos son idénticos byte a byte.
+
+import gzip
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Símbolos con el aspecto de los de la BVC; del 21 en adelante se numeran
+SIMBOLOS_BVC = (
+    ('ABC.A', 'BANCO DEL CARIBE C.A. CLASE A'), ('BNC', 'BANCO NACIONAL DE CREDITO'),
+    ('BPV', 'BANCO PROVINCIAL S.A.'), ('BVCC', 'BOLSA DE VALORES DE CARACAS'),
+    ('BVL', 'BANCO VENEZOLANO DE CREDITO'), ('CCR', 'CERAMICA CARABOBO CLASE A'),
+    ('CGQ', 'CORPORACION GRUPO QUIMICO'), ('CRM.A', 'CORIMON C.A.'),
+    ('DOM', 'DOMINGUEZ & CIA. S.A.'), ('EFE', 'PRODUCTOS EFE S.A.'),
+    ('ENV', 'ENVASES VENEZOLANOS S.A.'), ('FNC', 'FABRICA NACIONAL DE CEMENTOS'),
+    ('FVI.B', 'FONDO DE VALORES INMOBILIARIOS CLASE B'), ('GZL', 'GRUPO ZULIANO C.A.'),
+    ('IVC.A', 'INVACA CLASE A'), ('MPA', 'MANUFACTURAS DE PAPEL C.A.'),
+    ('MVZ.A', 'MERCANTIL SERVICIOS FINANCIEROS CLASE A'),
+    ('MVZ.B', 'MERCANTIL SERVICIOS FINANCIEROS CLASE B'),
+    ('PGR', 'PROAGRO C.A.'), ('RST', 'RON SANTA TERESA C.A.'),
+)
+
+def formato_bvc(valor, decimales=2):
+    """1234567.891 -> '1.234.567,89'"""
+    texto = f"{valor:,.{decimales}f}"
+    return texto.replace(',', '_').replace('.', ',').replace('_', '.')
+
+def escribir_dat(ruta, filas, indice, comprimir=False):
+    """
+    Escribe un .dat (o .dat.gz). filas: (simbolo, nombre, anterior, hoy, variacion,
+    cantidad, monto); indice: (valor, variacion) o None.
+    """
+    lineas = []
+    for simbolo, nombre, anterior, hoy, variacion, cantidad, monto in filas:
+        anterior, hoy = anterior or 0, hoy or 0
+        lineas.append('|'.join((
+            'R', nombre, simbolo, formato_bvc(anterior), formato_bvc(hoy),
+            formato_bvc(variacion or 0), formato_bvc(max(anterior, hoy)), formato_bvc(min(anterior, hoy)),
+            '0,00', '0,00', '0', str(int(cantidad or 0)), formato_bvc(monto or 0))))
+    if indice:
+        lineas.append(f"IG|IBC|{formato_bvc(indice[0])}|0,00|{formato_bvc(indice[1] or 0)}")
+    datos = ('\r\n'.join(lineas) + '\r\n').encode('utf-8')
+    if comprimir:
+        with gzip.open(ruta + '.gz', 'wb') as f:
+            f.write(datos)
+    else:
+        with open(ruta, 'wb') as f:
+            f.write(datos)
+
+def simbolos_sinteticos(cantidad):
+    """[(simbolo, nombre)] con los de SIMBOLOS_BVC primero."""
+    simbolos = list(SIMBOLOS_BVC[:cantidad])
+    for numero in range(len(simbolos), cantidad):
+        simbolos.append((f"S{numero:03d}", f"EMPRESA SINTETICA {numero:03d} C.A."))
+    return simbolos
+
+def dias_habiles(desde, anios, aleatorio, feriados=0.03):
+    """Días de lunes a viernes de `anios` años desde `desde`, sin un `feriados` al azar."""
+    hasta = date(desde.year + anios, desde.month, min(desde.day, 28))
+    dia = desde
+    while dia < hasta:
+        if dia.weekday() < 5 and aleatorio.random() >= feriados:
+            yield dia
+        dia += timedelta(days=1)
+
+def generar_dat(carpeta, anios=1, simbolos=40, desde=date(2015, 1, 2), semilla=42, comprimir=False):
+    """
+    Escribe los .dat de `anios` años x `simbolos` símbolos en la carpeta.
+    Retorna {'archivos', 'filas', 'indices', 'bytes', 'desde', 'hasta'}.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    aleatorio = random.Random(semilla)
+    listado = simbolos_sinteticos(simbolos)
+    precios = {simbolo: aleatorio.uniform(1, 5000) for simbolo, _ in listado}
+    ibc = aleatorio.uniform(1000, 20000)
+
+    archivos = filas = 0
+    primero = ultimo = None
+    for dia in dias_habiles(desde, anios, aleatorio):
+        filas_dia = []
+        for simbolo, nombre in listado:
+            anterior = precios[simbolo]
+            if aleatorio.random() < 0.3:
+                # Sin operaciones: el precio no cambia
+                hoy, cantidad, monto = anterior, 0, 0
+            else:
+                hoy = max(0.01, round(anterior * aleatorio.lognormvariate(0.0005, 0.025), 2))
+                cantidad = aleatorio.randint(1, 200000)
+                monto = hoy * cantidad
+            precios[simbolo] = hoy
+            filas_dia.append((simbolo, nombre, anterior, hoy, (hoy - anterior) / anterior * 100,
+                              cantidad, monto))
+        variacion_ibc = aleatorio.gauss(0.05, 1.2)
+        ibc *= 1 + variacion_ibc / 100
+
+        escribir_dat(os.path.join(carpeta, f"{dia:%Y%m%d}.dat"), filas_dia, (ibc, variacion_ibc), comprimir)
+        archivos += 1
+        filas += len(filas_dia)
+        primero = primero or dia
+        ultimo = dia
+
+    tamano = sum(entrada.stat().st_size for entrada in os.scandir(carpeta) if entrada.is_file())
+    return {
+        'archivos': archivos,
+        'filas': filas,
+        'indices': archivos,
+        'bytes': tamano,
+        'desde': f"{primero:%Y%m%d}" if primero else None,
+        'hasta': f"{ultimo:%Y%m%d}" if ultimo else None
+    }
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    if not argumentos:
+        print("Uso: python -m benchmarks.generador_dat carpeta [--anios=N] [--simbolos=M] "
+              "[--desde=YYYYMMDD] [--semilla=S] [--gz]")
+        sys.exit(1)
+
+    desde = opciones.get('desde', '20150102')
+    resumen = generar_dat(argumentos[0],
+                          anios=int(opciones.get('anios', 1)),
+                          simbolos=int(opciones.get('simbolos', 40)),
+                          desde=date(int(desde[:4]), int(desde[4:6]), int(desde[6:])),
+                          semilla=int(opciones.get('semilla', 42)),
+                          comprimir='--gz' in sys.argv)
+    print(f"✅ {resumen['archivos']} archivos .dat ({resumen['desde']} a {resumen['hasta']}), "
+          f"{resumen['filas']} filas R|, {resumen['bytes'] / 1024 / 1024:.1f} MB en {argumentos[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# benchmarks/ingesta.py - Velocidad de parseo y carga de .dat sobre una base en frío
+#
+# Uso: python -m benchmarks.ingesta [--anios=N] [--simbolos=M] [--trabajadores=N]
+#                                   [--descargas=N] [--simultaneas=N] [--latencia=MS]
+#                                   [--escenarios=a,b] [--salida=ruta.json]
+#                                   [--comparar=anterior.json]
+# Genera con benchmarks/generador_dat.py `anios` años x `simbolos` símbolos (1 x 40 por
+# defecto) y mide cada escenario en un proceso aparte, con su propia carpeta de trabajo:
+# base de datos nueva, sin cachés en memoria ni memoria de tokens del parser. La base del
+# repositorio no se toca.
+#   parsear_archivo_dat      dat_parser.parsear_archivo_dat archivo por archivo (sin SQLite)
+#   cargar_a_sqlite          cargar_todos_dat.cargar_a_sqlite (data_cache completo)
+#   cargar_desde_data_cache  dat_parser.cargar_desde_data_cache_sqlite
+#   descargar_y_guardar      extractor.descargar_y_guardar contra benchmarks/servidor_bvc.py
+#                            sirviendo los .dat generados (las primeras `descargas` fechas)
+#   descargar_rango          descargador_bvc.descargar_rango de las mismas fechas, con
+#                            `simultaneas` descargas en paralelo
+# --latencia agrega milisegundos de espera a cada respuesta del servidor local.
+# El resultado se guarda en JSON (benchmarks/resultados/ingesta_<fecha>.json por defecto)
+# con los parámetros, la máquina y el commit, para comparar corridas con --comparar.
+
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generador_dat import generar_dat
+from benchmarks.servidor_bvc import ServidorBVCLocal
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+ESCENARIOS = ('parsear_archivo_dat', 'cargar_a_sqlite', 'cargar_desde_data_cache', 'descargar_y_guardar',
+              'descargar_rango')
+DESCARGAS = ('descargar_y_guardar', 'descargar_rango')
+
+# ---------- Dentro del proceso de cada escenario (cwd = carpeta de trabajo) ----------
+def _filas_en_base():
+    conn = sqlite3.connect("database/bolsa_datos.db")
+    try:
+        return conn.execute("SELECT COUNT(*) FROM acciones").fetchone()[0]
+    finally:
+        conn.close()
+
+def _medir_escenario(escenario, datos, trabajadores, descargas, simultaneas, latencia_servidor):
+    """Corre un escenario y retorna sus métricas (segundos, archivos, filas, ...)."""
+    archivos = sorted(f for f in os.listdir(datos) if f.endswith('.dat'))
+    if escenario in ('cargar_a_sqlite', 'cargar_desde_data_cache'):
+        try:
+            os.symlink(datos, 'data_cache', target_is_directory=True)
+        except OSError:
+            shutil.copytree(datos, 'data_cache')
+
+    # Los módulos se importan aquí: sqlite_manager crea la base en la carpeta de trabajo
+    latencias = []
+    servidor = None
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        if escenario == 'parsear_archivo_dat':
+            from dat_parser import parsear_archivo_dat
+            inicio = time.perf_counter()
+            filas = sum(len(parsear_archivo_dat(os.path.join(datos, f))[0]) for f in archivos)
+            segundos = time.perf_counter() - inicio
+        elif escenario == 'cargar_a_sqlite':
+            from cargar_todos_dat import cargar_a_sqlite
+            inicio = time.perf_counter()
+            cargar_a_sqlite(trabajadores=trabajadores)
+            segundos = time.perf_counter() - inicio
+            filas = _filas_en_base()
+        elif escenario == 'cargar_desde_data_cache':
+            from dat_parser import cargar_desde_data_cache_sqlite
+            inicio = time.perf_counter()
+            cargar_desde_data_cache_sqlite("data_cache", trabajadores)
+            segundos = time.perf_counter() - inicio
+            filas = _filas_en_base()
+        elif escenario in DESCARGAS:
+            import extractor
+            from descargador_bvc import descargador_bvc
+            servidor = ServidorBVCLocal(datos, latencia=latencia_servidor)
+            descargador_bvc.url = servidor.iniciar()
+            descargador_bvc.simultaneas = simultaneas
+            archivos = archivos[:descargas]
+            filas = 0
+            inicio = time.perf_counter()
+            if escenario == 'descargar_y_guardar':
+                for archivo in archivos:
+                    t0 = time.perf_counter()
+                    filas += len(extractor.descargar_y_guardar(archivo[:8])[0])
+                    latencias.append(time.perf_counter() - t0)
+            else:
+                filas = descargador_bvc.descargar_rango([archivo[:8] for archivo in archivos])['filas']
+            segundos = time.perf_counter() - inicio
+            servidor.detener()
+        else:
+            raise ValueError(f"Escenario desconocido: {escenario}")
+
+    segundos = max(segundos, 1e-9)
+    resultado = {
+        'segundos': round(segundos, 4),
+        'archivos': len(archivos),
+        'filas': filas,
+        'archivos_por_segundo': round(len(archivos) / segundos, 1),
+        'filas_por_segundo': round(filas / segundos, 1)
+    }
+    if latencias:
+        latencias.sort()
+        resultado['latencia_ms'] = {
+            'media': round(sum(latencias) / len(latencias) * 1000, 3),
+            'p50': round(latencias[len(latencias) // 2] * 1000, 3),
+            'p95': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 3),
+            'max': round(latencias[-1] * 1000, 3)
+        }
+    if servidor is not None:
+        resultado['conexiones'] = servidor.estadisticas()['conexiones']
+    return resultado
+
+# ---------- Proceso principal ----------
+def _correr_escenario(escenario, datos, trabajadores, descargas, simultaneas, latencia_servidor):
+    """Lanza el escenario en un proceso nuevo con una carpeta de trabajo vacía."""
+    trabajo = tempfile.mkdtemp(prefix=f'bench_{escenario}_')
+    archivo_resultado = os.path.join(trabajo, 'resultado.json')
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (RAIZ, os.environ.get('PYTHONPATH')))))
+    try:
+        proceso = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.ingesta', f'--escenario={escenario}', f'--datos={datos}',
+             f'--trabajadores={trabajadores}', f'--descargas={descargas}', f'--simultaneas={simultaneas}',
+             f'--latencia={latencia_servidor * 1000:g}', f'--resultado={archivo_resultado}'],
+            cwd=trabajo, env=entorno, capture_output=True, text=True)
+        if proceso.returncode != 0 or not os.path.exists(archivo_resultado):
+            return {'error': (proceso.stderr or proceso.stdout).strip()[-2000:]}
+        with open(archivo_resultado, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _comparar(actual, ruta_anterior):
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+    print(f"\n📈 Comparación con {ruta_anterior} ({anterior.get('fecha')}, commit {anterior.get('commit')}):")
+    for escenario, datos in actual['escenarios'].items():
+        previo = anterior.get('escenarios', {}).get(escenario)
+        if not previo or 'segundos' not in previo or 'segundos' not in datos:
+            print(f"   • {escenario:<26} sin dato comparable")
+            continue
+        print(f"   • {escenario:<26} {previo['segundos']:9.3f}s -> {datos['segundos']:9.3f}s "
+              f"(x{previo['segundos'] / datos['segundos']:.2f})")
+
+def main():
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    trabajadores = int(opciones.get('trabajadores', os.cpu_count() or 1))
+    descargas = int(opciones.get('descargas', 100))
+    simultaneas = int(opciones.get('simultaneas', 4))
+    latencia_servidor = float(opciones.get('latencia', 0)) / 1000
+
+    if 'escenario' in opciones:
+        resultado = _medir_escenario(opciones['escenario'], opciones['datos'], trabajadores, descargas,
+                                     simultaneas, latencia_servidor)
+        with open(opciones['resultado'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f)
+        return
+
+    anios = int(opciones.get('anios', 1))
+    simbolos = int(opciones.get('simbolos', 40))
+    escenarios = opciones['escenarios'].split(',') if 'escenarios' in opciones else ESCENARIOS
+    ahora = datetime.now()
+    salida = opciones.get('salida') or os.path.join(CARPETA_RESULTADOS, f"ingesta_{ahora:%Y%m%d_%H%M%S}.json")
+
+    datos = tempfile.mkdtemp(prefix='bench_dat_')
+    try:
+        print("=" * 70)
+        print(f"=== BENCHMARK INGESTA .DAT ({anios} años x {simbolos} símbolos, "
+              f"{trabajadores} procesos, base en frío) ===")
+        print("=" * 70)
+        generado = generar_dat(datos, anios=anios, simbolos=simbolos)
+        print(f"📝 Generados {generado['archivos']} archivos, {generado['filas']} filas R|, "
+              f"{generado['bytes'] / 1024 / 1024:.1f} MB")
+
+        reporte = {
+            'benchmark': 'ingesta',
+            'fecha': ahora.strftime('%Y-%m-%d %H:%M:%S'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'nucleos': os.cpu_count(),
+            'parametros': {'anios': anios, 'simbolos': simbolos, 'trabajadores': trabajadores,
+                           'descargas': descargas, 'simultaneas': simultaneas,
+                           'latencia_ms': latencia_servidor * 1000},
+            'datos': generado,
+            'escenarios': {}
+        }
+        for escenario in escenarios:
+            resultado = _correr_escenario(escenario, datos, trabajadores, descargas, simultaneas, latencia_servidor)
+            reporte['escenarios'][escenario] = resultado
+            if 'error' in resultado:
+                print(f"   ❌ {escenario:<26} {resultado['error'].splitlines()[-1] if resultado['error'] else 'error'}")
+                continue
+            esperadas = generado['filas'] if escenario not in DESCARGAS else None
+            control = '' if esperadas is None else (' ✅' if resultado['filas'] == esperadas else ' ❌ filas')
+            latencia = (f" | p50 {resultado['latencia_ms']['p50']:.1f} ms, p95 {resultado['latencia_ms']['p95']:.1f} ms"
+                        if 'latencia_ms' in resultado else '')
+            conexiones = f" | {resultado['conexiones']} conexiones" if 'conexiones' in resultado else ''
+            print(f"   • {escenario:<26} {resultado['segundos']:8.2f}s | {resultado['archivos_por_segundo']:8.0f} archivos/s | "
+                  f"{resultado['filas_por_segundo']:9.0f} filas/s{latencia}{conexiones}{control}")
+    finally:
+        shutil.rmtree(datos, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados en {salida}")
+
+    if 'comparar' in opciones:
+        _comparar(reporte, opciones['comparar'])
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# benchmarks/parser_bvc.py - Parser del .dat de la BVC: copia original vs parser_bvc.py
+#
+# Uso: python -m benchmarks.parser_bvc [carpeta_dat] [archivos]
+# Con una carpeta de .dat (p. ej. data_cache) usa esos archivos. Si no, escribe `archivos`
+# .dat (3000 por defecto) en una carpeta temporal con las cotizaciones reales de la base
+# (acciones e indices, sin modificarla), en el formato de la BVC: '6.230,00', 'R|'/'IG|'.
+# Mide solo el parseo (los archivos se leen antes) y comprueba que la salida es idéntica.
+
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import parser_bvc
+from benchmarks.generador_dat import escribir_dat
+
+# ---------- ANTES: limpiar_numero + bucle R|/IG| (copiado en dat_parser, extractor y cargar_todos_dat) ----------
+def _limpiar_numero_original(texto):
+    if not texto or not isinstance(texto, str):
+        return 0.0
+    t = texto.strip()
+    if t in ["-", "", "N/D", "0", "0,00", "0.00"]:
+        return 0.0
+    try:
+        t = t.replace('Bs.', '').replace('bs.', '').replace('Bs', '').replace('$', '').strip()
+        if "." in t and "," in t:
+            partes = t.split(",")
+            if len(partes[-1]) == 2:
+                t = t.replace(".", "").replace(",", ".")
+            else:
+                t = t.replace(",", "")
+        elif "," in t:
+            partes = t.split(",")
+            if len(partes[-1]) == 2:
+                t = t.replace(",", ".")
+            else:
+                t = t.replace(",", "")
+        t = ''.join(c for c in t if c.isdigit() or c in '.-')
+        if not t:
+            return 0.0
+        result = float(t)
+        if result < 0.0001 and result > -0.0001:
+            return 0.0
+        return result
+    except Exception as e:
+        print(f"Error limpiando número '{texto}': {e}")
+        return 0.0
+
+def _parsear_original(contenido, fecha_str, fuente):
+    acciones = []
+    indice = None
+    for linea in contenido.split('\n'):
+        linea = linea.strip()
+        if not linea:
+            continue
+        if linea.startswith('R|') and '|' in linea:
+            partes = linea.split('|')
+            if len(partes) >= 13:
+                simbolo = partes[2].strip()
+                p_anterior = _limpiar_numero_original(partes[3])
+                p_hoy = _limpiar_numero_original(partes[4])
+                if p_anterior > 0 and p_hoy > 0:
+                    diferencia_bs = p_hoy - p_anterior
+                    variacion_real = (diferencia_bs / p_anterior) * 100
+                else:
+                    diferencia_bs = 0
+                    variacion_real = 0.0
+                acciones.append({
+                    'fecha': fecha_str,
+                    'nombre': partes[1].strip(),
+                    'simbolo': simbolo,
+                    'anterior': p_anterior,
+                    'hoy': p_hoy,
+                    'diferencia_bs': round(diferencia_bs, 4),
+                    'variacion': round(variacion_real, 2),
+                    'cantidad': int(_limpiar_numero_original(partes[11])),
+                    'monto': _limpiar_numero_original(partes[12]),
+                    'fuente': fuente
+                })
+        elif linea.startswith('IG|') and '|' in linea:
+            partes = linea.split('|')
+            if len(partes) >= 5:
+                indice = {
+                    'fecha': fecha_str,
+                    'valor': _limpiar_numero_original(partes[2]),
+                    'variacion': _limpiar_numero_original(partes[4]),
+                    'fuente': fuente
+                }
+    return acciones, indice
+
+# ---------- Archivos .dat de prueba ----------
+def _dias_de_la_base(db_path):
+    """{fecha: (filas de acciones, fila de índice)} de la base (solo lectura)."""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        dias = {}
+        for fila in conn.execute('SELECT fecha, simbolo, nombre, anterior, hoy, variacion, '
+                                 'cantidad, monto FROM acciones ORDER BY fecha, simbolo'):
+            dias.setdefault(fila[0], ([], None))[0].append(fila[1:])
+        for fecha, valor, variacion in conn.execute('SELECT fecha, valor, variacion FROM indices'):
+            if fecha in dias:
+                dias[fecha] = (dias[fecha][0], (valor, variacion))
+        return dias
+    finally:
+        conn.close()
+
+def _generar_archivos(carpeta, archivos, db_path="database/bolsa_datos.db"):
+    """Escribe `archivos` .dat repitiendo los días reales de la base (o sintéticos si no hay base)."""
+    dias = list(_dias_de_la_base(db_path).values())
+    if not dias:
+        aleatorio = random.Random(42)
+        dias = [([(f"SIM{s:02d}", f"EMPRESA {s:02d} C.A.", p, p * (1 + aleatorio.gauss(0, 0.02)),
+                   0, aleatorio.randint(0, 50000), aleatorio.uniform(0, 1e6))
+                  for s, p in ((s, aleatorio.uniform(0.5, 500)) for s in range(40))],
+                 (aleatorio.uniform(100, 2000), aleatorio.gauss(0, 1))) for _ in range(250)]
+    dia = date(2010, 1, 4)
+    for numero in range(archivos):
+        filas, indice = dias[numero % len(dias)]
+        escribir_dat(os.path.join(carpeta, f"{dia:%Y%m%d}.dat"), filas, indice)
+        dia += timedelta(days=1)
+
+def _medir(funcion, contenidos):
+    inicio = time.perf_counter()
+    salidas = [funcion(texto, fecha, 'archivo_dat') for fecha, texto in contenidos]
+    return time.perf_counter() - inicio, salidas
+
+def main():
+    carpeta = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].isdigit() else None
+    archivos = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 3000
+
+    temporal = None
+    if carpeta is None or not any(f.endswith('.dat') for f in os.listdir(carpeta)):
+        temporal = tempfile.mkdtemp(prefix='bench_dat_')
+        _generar_archivos(temporal, archivos)
+        carpeta = temporal
+
+    try:
+        contenidos = []
+        for nombre in sorted(os.listdir(carpeta)):
+            match = re.search(r'(\d{8})\.dat$', nombre)
+            if match:
+                with open(os.path.join(carpeta, nombre), encoding='utf-8') as f:
+                    contenidos.append((match.group(1), f.read()))
+    finally:
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    lineas = sum(texto.count('\n') for _, texto in contenidos)
+    print("=" * 70)
+    print(f"=== BENCHMARK PARSER .DAT ({len(contenidos)} archivos, {lineas} líneas"
+          f"{', generados desde la base' if temporal else ''}) ===")
+    print("=" * 70)
+
+    t_antes, salida_antes = _medir(_parsear_original, contenidos)
+    parser_bvc.limpiar_cache()
+    t_frio, salida_nueva = _medir(parser_bvc.parsear_dat, contenidos)
+    t_caliente, _ = _medir(parser_bvc.parsear_dat, contenidos)
+    t_filas, _ = _medir(parser_bvc.parsear_filas, contenidos)
+    t_columnas, _ = _medir(parser_bvc.parsear_columnas, contenidos)
+
+    def linea(nombre, segundos):
+        print(f"   • {nombre:<44} {segundos * 1000:9.1f} ms | {lineas / segundos:10.0f} líneas/s | "
+              f"x{t_antes / segundos:4.1f}")
+
+    linea("ANTES: limpiar_numero copiado (dicts)", t_antes)
+    linea("DESPUÉS: parsear_dat (dicts, en frío)", t_frio)
+    linea("DESPUÉS: parsear_dat (dicts, memoria llena)", t_caliente)
+    linea("DESPUÉS: parsear_filas (tuplas)", t_filas)
+    linea("DESPUÉS: parsear_columnas (array.array)", t_columnas)
+
+    cache = parser_bvc.estadisticas_cache()
+    print(f"\n🧠 Memoria de tokens: {cache['tokens']} tokens distintos "
+          f"(decodificados {cache['decodificados']} veces en 4 pasadas)")
+    print(f"🔍 Misma salida que el parser original: {'✅' if salida_nueva == salida_antes else '❌'}")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# benchmarks/registros_cotizacion.py - Memoria del histórico: diccionarios por fila vs __slots__
+#
+# Uso: python -m benchmarks.registros_cotizacion [simbolos] [anios]
+# Genera un histórico sintético de `anios` años hábiles para `simbolos` símbolos (por
+# defecto 10 años y los símbolos de la base, o 60) y mide con tracemalloc lo que ocupa
+# cada capa del camino SQLite -> obtener_historico_rapido -> comparación con el dólar:
+# ANTES con un diccionario nuevo por capa, DESPUÉS con cotizacion.py.
+
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from cotizacion import CotizacionDolar, CotizacionHistorica
+
+def _simbolos_de_la_base(db_path="database/bolsa_datos.db"):
+    if not os.path.exists(db_path):
+        return 60
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT COUNT(DISTINCT simbolo) FROM acciones").fetchone()[0] or 60
+    except sqlite3.Error:
+        return 60
+    finally:
+        conn.close()
+
+def _filas_sqlite(simbolos, anios):
+    """Tuplas como las entrega el cursor (valores nuevos por fila, como en SQLite)."""
+    aleatorio = random.Random(42)
+    dias = [date(2016, 1, 4) + timedelta(days=i) for i in range(anios * 365)]
+    dias = [d for d in dias if d.weekday() < 5]
+    filas = []
+    for s in range(simbolos):
+        simbolo = f"SIM{s:03d}"
+        precio = 10.0
+        for dia in dias:
+            anterior = precio
+            precio = round(max(0.01, precio * (1 + aleatorio.gauss(0, 0.02))), 2)
+            filas.append((dia.strftime('%Y%m%d'), simbolo, f"EMPRESA {s:03d} C.A.",
+                          anterior, precio, round(precio - anterior, 4),
+                          round((precio - anterior) / anterior * 100, 2),
+                          aleatorio.randint(0, 50000), round(precio * 1000, 2), 'automatico'))
+    return filas
+
+def _tasa(fecha):
+    return {'tasa': 36.5, 'variacion': 0.0012, 'encontrado_exacto': True, 'fecha': fecha}
+
+# ---------- ANTES: un diccionario por fila en cada capa ----------
+def _antes_sqlite(filas):
+    columnas = ['fecha', 'simbolo', 'nombre', 'precio', 'variacion', 'cambio_bs',
+                'cantidad', 'monto', 'anterior', 'fuente']
+    resultados = []
+    for fecha, simbolo, nombre, anterior, hoy, diferencia_bs, variacion, cantidad, monto, fuente in filas:
+        resultado = dict(zip(columnas, (fecha, simbolo, nombre, hoy, variacion, diferencia_bs,
+                                        cantidad, monto, anterior, fuente)))
+        fecha_dt = datetime.strptime(resultado['fecha'], '%Y%m%d')
+        resultado['fecha_formateada'] = fecha_dt.strftime('%d/%m/%Y')
+        resultados.append(resultado)
+    return resultados
+
+def _antes_rapido(datos):
+    return [{
+        'fecha': d['fecha'], 'fecha_formateada': d['fecha_formateada'], 'precio': d['precio'],
+        'variacion': d['variacion'], 'cambio_bs': d['cambio_bs'], 'cantidad': d['cantidad'],
+        'monto': d['monto'], 'anterior': d['anterior'], 'fuente': d['fuente']
+    } for d in datos]
+
+def _antes_dolar(datos):
+    resultados = []
+    for dato in datos:
+        tasa = _tasa(dato['fecha'])
+        precio_usd = dato['precio'] / tasa['tasa']
+        anterior_usd = dato['anterior'] / tasa['tasa'] if dato['anterior'] > 0 else 0
+        variacion_usd = (precio_usd - anterior_usd) / anterior_usd * 100 if anterior_usd > 0 else 0
+        variacion_dolar = tasa['variacion'] * 100
+        resultados.append({
+            **dato,
+            'tasa_dolar': tasa['tasa'],
+            'precio_usd': precio_usd,
+            'anterior_usd': anterior_usd,
+            'variacion_usd_porcentaje': round(variacion_usd, 2),
+            'variacion_dolar_bcv': round(variacion_dolar, 2),
+            'diferencia_vs_dolar': round(dato['variacion'] - variacion_dolar, 2),
+            'dolar_encontrado_exacto': tasa['encontrado_exacto'],
+            'fecha_dolar': tasa['fecha']
+        })
+    return resultados
+
+# ---------- DESPUÉS: registros compactos, sin copias ----------
+def _despues_sqlite(filas):
+    return [CotizacionHistorica(*fila) for fila in filas]
+
+def _despues_rapido(datos):
+    return list(datos)
+
+def _despues_dolar(datos):
+    resultados = []
+    for dato in datos:
+        tasa = _tasa(dato['fecha'])
+        resultados.append(CotizacionDolar(dato, tasa['tasa'], tasa['variacion'] * 100,
+                                          tasa['encontrado_exacto'], tasa['fecha']))
+    return resultados
+
+def _medir_capas(capas, filas):
+    """
+    Aplica las capas en cadena; retorna ([(bytes retenidos, segundos)] por capa, salidas).
+    La memoria se mide con tracemalloc y el tiempo en una pasada aparte sin él.
+    """
+    tiempos = []
+    datos = filas
+    for capa in capas:
+        inicio = time.perf_counter()
+        datos = capa(datos)
+        tiempos.append(time.perf_counter() - inicio)
+    del datos
+
+    memoria = []
+    conservar = []
+    datos = filas
+    tracemalloc.start()
+    for capa in capas:
+        antes = tracemalloc.get_traced_memory()[0]
+        datos = capa(datos)
+        memoria.append(tracemalloc.get_traced_memory()[0] - antes)
+        conservar.append(datos)  # Todas las capas viven a la vez, como en /consulta
+    tracemalloc.stop()
+    return list(zip(memoria, tiempos)), conservar
+
+def main():
+    simbolos = int(sys.argv[1]) if len(sys.argv) > 1 else _simbolos_de_la_base()
+    anios = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    filas = _filas_sqlite(simbolos, anios)
+    n = len(filas)
+
+    print("=" * 70)
+    print(f"=== BENCHMARK REGISTROS DE COTIZACIÓN ({simbolos} símbolos x {anios} años = {n} filas) ===")
+    print("=" * 70)
+
+    nombres = ("SQLite -> filas", "obtener_historico_rapido", "comparación con dólar BCV")
+    antes, datos_antes = _medir_capas((_antes_sqlite, _antes_rapido, _antes_dolar), filas)
+    despues, datos_despues = _medir_capas((_despues_sqlite, _despues_rapido, _despues_dolar), filas)
+
+    for numero, (nombre, (b_antes, t_antes), (b_despues, t_despues)) in enumerate(
+            zip(nombres, antes, despues), 1):
+        print(f"{numero}️⃣  {nombre}:")
+        print(f"   • ANTES: dict por fila   {b_antes / 1048576:8.1f} MB | {b_antes / n:6.0f} B/fila | {t_antes * 1000:8.1f} ms")
+        print(f"   • DESPUÉS: __slots__      {b_despues / 1048576:8.1f} MB | {b_despues / n:6.0f} B/fila | {t_despues * 1000:8.1f} ms")
+
+    total_antes = sum(b for b, _ in antes)
+    total_despues = sum(b for b, _ in despues)
+    print(f"\n💾 Total retenido: {total_antes / 1048576:.1f} MB -> {total_despues / 1048576:.1f} MB "
+          f"({(1 - total_despues / total_antes) * 100:.1f}% menos)")
+
+    iguales = all(all(d[clave] == valor for clave, valor in a.items())
+                  for d, a in zip(datos_despues[-1], datos_antes[-1]))
+    claves_extra = set(datos_despues[-1][0]) - set(datos_antes[-1][0])
+    print(f"🔍 Mismos valores en la salida final: {'✅' if iguales else '❌'}"
+          f" (claves adicionales: {', '.join(sorted(claves_extra)) or 'ninguna'})")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
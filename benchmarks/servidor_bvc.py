@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# benchmarks/servidor_bvc.py - Servidor HTTP local que imita la descarga diaria de la BVC
+#
+# Uso: python -m benchmarks.servidor_bvc [carpeta] [--puerto=N] [--latencia=MS]
+#                                        [--fallos=P] [--paginas-error=P] [--semilla=S]
+# Responde GET /descargar-diario-bolsa/?type=dat&fecha=YYYYMMDD con el <fecha>.dat (o
+# .dat.gz, descomprimido) de la carpeta (data_cache por defecto, o los de
+# benchmarks/generador_dat.py) y 404 si no hay archivo. HTTP/1.1 con keep-alive, para
+# medir la reutilización de conexiones de descargador_bvc. Para ejercitar los reintentos:
+#   --latencia       milisegundos de espera antes de cada respuesta
+#   --fallos         proporción de respuestas 503 con Retry-After: 0
+#   --paginas-error  proporción de páginas HTML 200 en lugar del .dat
+# Apuntar el descargador: python descargador_bvc.py desde hasta --url=<plantilla impresa>
+
+import gzip
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RUTA = "/descargar-diario-bolsa/"
+PAGINA_ERROR = (b"<!DOCTYPE html>\r\n<html><head><title>Mantenimiento</title></head>\r\n"
+                b"<body><h1>Servicio no disponible temporalmente</h1></body></html>\r\n")
+
+class ServidorBVCLocal:
+    """
+    Servidor en un hilo daemon (puerto libre por defecto).
+    - iniciar() -> plantilla de URL con {fecha} para descargador_bvc.url
+    - detener(); también como context manager
+    - estadisticas(): solicitudes, conexiones, respuestas por status
+    """
+
+    def __init__(self, carpeta="data_cache", puerto=0, latencia=0.0, fallos=0.0, paginas_error=0.0,
+                 semilla=42):
+        self.carpeta = carpeta
+        self.puerto = puerto
+        self.latencia = latencia  # Segundos
+        self.fallos = fallos
+        self.paginas_error = paginas_error
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = None
+
+        # Estadísticas
+        self.solicitudes = 0
+        self.conexiones = 0
+        self.respuestas = {}
+
+    def _leer_dat(self, fecha):
+        for nombre, abrir in ((f"{fecha}.dat", open), (f"{fecha}.dat.gz", gzip.open)):
+            ruta = os.path.join(self.carpeta, nombre)
+            if os.path.exists(ruta):
+                with abrir(ruta, 'rb') as f:
+                    return f.read()
+        return None
+
+    def _sortear(self):
+        """'fallo', 'pagina_error' o None para la próxima respuesta."""
+        with self._lock:
+            sorteo = self._aleatorio.random()
+        if sorteo < self.fallos:
+            return 'fallo'
+        if sorteo < self.fallos + self.paginas_error:
+            return 'pagina_error'
+        return None
+
+    def _contar(self, status):
+        with self._lock:
+            self.respuestas[status] = self.respuestas.get(status, 0) + 1
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive: varias solicitudes por conexión
+            # Cabeceras y cuerpo salen en dos escrituras: sin TCP_NODELAY, Nagle y el ACK
+            # diferido del cliente agregan ~40 ms a cada respuesta de una conexión reutilizada
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def _responder(self, status, datos, tipo='text/plain; charset=utf-8', cabeceras=()):
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(datos)))
+                for nombre, valor in cabeceras:
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+                servidor._contar(status)
+
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.solicitudes += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                partes = urlparse(self.path)
+                fecha = parse_qs(partes.query).get('fecha', [''])[0]
+                if partes.path.rstrip('/') != RUTA.rstrip('/') or not (fecha.isdigit() and len(fecha) == 8):
+                    self._responder(404, b'')
+                    return
+                resultado = servidor._sortear()
+                if resultado == 'fallo':
+                    self._responder(503, b'', cabeceras=(('Retry-After', '0'),))
+                    return
+                if resultado == 'pagina_error':
+                    self._responder(200, PAGINA_ERROR, tipo='text/html; charset=utf-8')
+                    return
+                datos = servidor._leer_dat(fecha)
+                if datos is None:
+                    self._responder(404, b'')
+                else:
+                    self._responder(200, datos)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+    def iniciar(self):
+        if self._servidor is None:
+            self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), self._manejador())
+            self._servidor.daemon_threads = True
+            self.puerto = self._servidor.server_address[1]
+            threading.Thread(target=self._servidor.serve_forever, name="ServidorBVCLocal",
+                             daemon=True).start()
+        return self.url()
+
+    def url(self):
+        return f"http://127.0.0.1:{self.puerto}{RUTA}?type=dat&fecha={{fecha}}"
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'solicitudes': self.solicitudes,
+                'conexiones': self.conexiones,
+                'respuestas': dict(self.respuestas)
+            }
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    servidor = ServidorBVCLocal(
+        argumentos[0] if argumentos else "data_cache",
+        puerto=int(opciones.get('puerto', 8765)),
+        latencia=float(opciones.get('latencia', 0)) / 1000,
+        fallos=float(opciones.get('fallos', 0)),
+        paginas_error=float(opciones.get('paginas-error', 0)),
+        semilla=int(opciones.get('semilla', 42)))
+
+    url = servidor.iniciar()
+    print(f"🧪 Sirviendo los .dat de {servidor.carpeta} en {url}. Ctrl+C para salir.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.detener()
+        print(f"🛑 Servidor detenido: {servidor.estadisticas()}")
+
+if __name__ == "__main__":
+    main()
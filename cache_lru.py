@@ -0,0 +1,211 @@
+# cache_lru.py - Caché LRU en memoria con TTL y límite de tamaño (entradas y bytes)
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def estimar_bytes(valor):
+    """
+    Tamaño aproximado de un valor en memoria.
+    Para listas de registros se mide el primer elemento y se multiplica,
+    así el costo es O(columnas) y no O(filas).
+    """
+    tamano = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamano += sum(sys.getsizeof(k) + estimar_bytes(v) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple)) and valor:
+        tamano += estimar_bytes(valor[0]) * len(valor)
+    elif hasattr(valor, '__slots__'):
+        # Registros con __slots__ (cotizacion.py): los valores de cada slot
+        for clase in type(valor).__mro__:
+            for nombre in clase.__dict__.get('__slots__', ()):
+                tamano += estimar_bytes(getattr(valor, nombre, None))
+    return tamano
+
+class _Entrada:
+    __slots__ = ('valor', 'expira', 'bytes', 'hits', 'ultimo_acceso')
+
+    def __init__(self, valor, expira, bytes_):
+        self.valor = valor
+        self.expira = expira
+        self.bytes = bytes_
+        self.hits = 0
+        self.ultimo_acceso = time.time()
+
+class CacheLRU:
+    """
+    Caché LRU segura entre hilos.
+    - obtener/guardar/expulsar en O(1) (OrderedDict: el final es lo más reciente)
+    - TTL por entrada (ttl=None: no expira)
+    - límite de entradas y de bytes aproximados
+    - contadores de aciertos, fallos, expulsiones, expiradas e invalidaciones
+    - índice secundario por símbolo y rango de fechas (YYYYMMDD) para que
+      una escritura invalide exactamente las entradas que la cubren
+    """
+
+    def __init__(self, nombre, max_entradas=100, max_bytes=None, ttl=None):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        # Índice secundario: simbolo ('*' = todos) -> claves, y clave -> (simbolo, desde, hasta)
+        self._por_simbolo = {}
+        self._cobertura = {}
+
+        # Estadísticas
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiradas = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, defecto=None):
+        """Devuelve el valor cacheado (y lo marca como el más reciente) o defecto."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return defecto
+
+            ahora = time.time()
+            if entrada.expira is not None and entrada.expira <= ahora:
+                self._quitar(clave)
+                self.expiradas += 1
+                self.fallos += 1
+                return defecto
+
+            self._datos.move_to_end(clave)
+            entrada.hits += 1
+            entrada.ultimo_acceso = ahora
+            self.aciertos += 1
+            return entrada.valor
+
+    def guardar(self, clave, valor, ttl=None, simbolo=None, desde=None, hasta=None):
+        """
+        Guarda un valor. ttl sobrescribe el TTL por defecto de la caché.
+        simbolo/desde/hasta declaran qué datos cubre la entrada (simbolo=None: todos,
+        desde/hasta=None: sin límite); solo se indexan si se indica alguno.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expira = time.time() + ttl if ttl else None
+        entrada = _Entrada(valor, expira, estimar_bytes(valor))
+
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = entrada
+            self._bytes += entrada.bytes
+            if simbolo is not None or desde is not None or hasta is not None:
+                self._cobertura[clave] = (simbolo, desde, hasta)
+                self._por_simbolo.setdefault(simbolo or '*', set()).add(clave)
+            self._recortar()
+
+    def eliminar(self, clave):
+        """Elimina una clave si existe. Devuelve True si estaba en caché."""
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+                return True
+            return False
+
+    def limpiar(self):
+        """Vacía la caché. Devuelve cuántas entradas se eliminaron."""
+        with self._lock:
+            eliminadas = len(self._datos)
+            self._datos.clear()
+            self._bytes = 0
+            self._por_simbolo.clear()
+            self._cobertura.clear()
+            return eliminadas
+
+    def invalidar(self, fecha=None, simbolos=None):
+        """
+        Elimina las entradas indexadas que cubren la fecha (YYYYMMDD) para alguno de
+        los símbolos. fecha=None: cualquier fecha; simbolos=None: cualquier símbolo.
+        Devuelve cuántas entradas se eliminaron.
+        """
+        with self._lock:
+            if simbolos is None:
+                candidatas = list(self._cobertura)
+            else:
+                candidatas = set(self._por_simbolo.get('*', ()))
+                for simbolo in simbolos:
+                    candidatas.update(self._por_simbolo.get(simbolo, ()))
+
+            eliminadas = 0
+            for clave in candidatas:
+                _, desde, hasta = self._cobertura[clave]
+                if fecha is None or ((desde is None or desde <= fecha) and
+                                     (hasta is None or fecha <= hasta)):
+                    self._quitar(clave)
+                    eliminadas += 1
+            self.invalidaciones += eliminadas
+            return eliminadas
+
+    def claves(self):
+        """Copia de las claves, de la menos a la más recientemente usada."""
+        with self._lock:
+            return list(self._datos.keys())
+
+    def entradas(self):
+        """Copia de (clave, valor, hits, ultimo_acceso), de la menos a la más reciente."""
+        with self._lock:
+            return [(clave, e.valor, e.hits, e.ultimo_acceso) for clave, e in self._datos.items()]
+
+    def __contains__(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            return entrada is not None and (entrada.expira is None or entrada.expira > time.time())
+
+    def __len__(self):
+        return len(self._datos)
+
+    def _quitar(self, clave):
+        entrada = self._datos.pop(clave)
+        self._bytes -= entrada.bytes
+        self._desindexar(clave)
+
+    def _desindexar(self, clave):
+        cobertura = self._cobertura.pop(clave, None)
+        if cobertura is not None:
+            grupo = cobertura[0] or '*'
+            claves = self._por_simbolo[grupo]
+            claves.discard(clave)
+            if not claves:
+                del self._por_simbolo[grupo]
+
+    def _recortar(self):
+        """Expulsa las entradas menos usadas hasta respetar los límites."""
+        while self._datos and (
+            len(self._datos) > self.max_entradas or
+            (self.max_bytes is not None and self._bytes > self.max_bytes and len(self._datos) > 1)
+        ):
+            clave, entrada = self._datos.popitem(last=False)
+            self._bytes -= entrada.bytes
+            self._desindexar(clave)
+            self.expulsiones += 1
+
+    def estadisticas(self):
+        """Estadísticas de uso de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'nombre': self.nombre,
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+                'expiradas': self.expiradas,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': self.aciertos / consultas if consultas > 0 else 0
+            }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# calendario_bursatil.py - Calendario de sesiones bursátiles en memoria
+#
+# Lista ordenada de las fechas con cotizaciones (automáticas o manuales, de la base
+# principal y de las particiones) que se carga una vez de estadisticas_fechas y se
+# mantiene al día con notificar_cambios: cada escritura agrega o quita solo sus fechas.
+# Las preguntas "última sesión en o antes de X", "N sesiones atrás" o "sesiones entre
+# dos fechas" se responden con bisect, sin SQLite ni red; el dashboard ya no prueba día
+# por día hacia atrás y los botones de período rápido caen en sesiones reales.
+#
+# Uso: python calendario_bursatil.py [fecha YYYYMMDD]
+
+import bisect
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+PERIODOS_RAPIDOS = {'fecha_7d': 7, 'fecha_30d': 30, 'fecha_90d': 90, 'fecha_365d': 365}
+
+def clave_fecha(fecha):
+    """date, datetime, 'YYYY-MM-DD' o 'YYYYMMDD' -> 'YYYYMMDD'."""
+    if isinstance(fecha, (date, datetime)):
+        return fecha.strftime('%Y%m%d')
+    return str(fecha).replace('-', '')
+
+def _a_date(clave):
+    return date(int(clave[:4]), int(clave[4:6]), int(clave[6:8]))
+
+class CalendarioBursatil:
+    """
+    Fechas con datos (YYYYMMDD) ordenadas, seguras entre hilos.
+    - sesion_en_o_antes / sesion_anterior / sesion_en_o_despues / sesion_siguiente
+    - sesiones_atras(fecha, n) / sesiones_entre(desde, hasta)
+    - periodos_rapidos(hoy) para los botones de /consulta, /rankings e /indices
+    - actualizar(cambios) como suscriptor de sqlite_manager.notificar_cambios
+    """
+
+    def __init__(self, manager=None):
+        self.manager = manager
+        self._fechas = None  # None: todavía no se cargó (o hay que recargar)
+        self._suscrito = False
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.consultas = 0
+        self.cargas = 0
+        self.actualizaciones = 0
+
+    def _manager(self):
+        if self.manager is None:
+            from sqlite_manager import sqlite_manager
+            self.manager = sqlite_manager
+        if not self._suscrito:
+            self._suscrito = True
+            self.manager.suscribir_invalidacion(self.actualizar)
+        return self.manager
+
+    def _vigentes(self):
+        """Lista ordenada de sesiones (la carga la primera vez). No modificar."""
+        fechas = self._fechas
+        if fechas is None:
+            manager = self._manager()
+            with self._lock:
+                if self._fechas is None:
+                    self._fechas = sorted(manager.obtener_fechas_con_datos())
+                    self.cargas += 1
+                fechas = self._fechas
+        self.consultas += 1
+        return fechas
+
+    def actualizar(self, cambios):
+        """Agrega o quita las fechas escritas según tengan cotizaciones (None: recarga todo)."""
+        if self._fechas is None:
+            return  # Se leerá completo en la próxima consulta
+        if None in cambios:
+            self.recargar()
+            return
+        claves = [int(fecha) for fecha in cambios if str(fecha).isdigit()]
+        if not claves:
+            return
+        manager = self._manager()
+        marcas = ','.join('?' * len(claves))
+        with manager.pool.conexion() as conn:
+            con_datos = {f"{fecha:08d}" for (fecha,) in conn.execute(
+                f"SELECT fecha FROM estadisticas_fechas WHERE tabla = 'cotizaciones' AND fecha IN ({marcas})",
+                claves)}
+        with self._lock:
+            if self._fechas is None:
+                return
+            # Copia nueva: quien esté recorriendo la lista anterior no la ve cambiar
+            fechas = list(self._fechas)
+            for clave in (f"{fecha:08d}" for fecha in claves):
+                posicion = bisect.bisect_left(fechas, clave)
+                presente = posicion < len(fechas) and fechas[posicion] == clave
+                if clave in con_datos and not presente:
+                    fechas.insert(posicion, clave)
+                elif clave not in con_datos and presente:
+                    del fechas[posicion]
+            self._fechas = fechas
+            self.actualizaciones += 1
+
+    def recargar(self):
+        """Descarta la lista; la próxima consulta la vuelve a leer de SQLite."""
+        with self._lock:
+            self._fechas = None
+
+    # ========== CONSULTAS (bisect) ==========
+
+    def __contains__(self, fecha):
+        fechas = self._vigentes()
+        clave = clave_fecha(fecha)
+        posicion = bisect.bisect_left(fechas, clave)
+        return posicion < len(fechas) and fechas[posicion] == clave
+
+    def __len__(self):
+        return len(self._vigentes())
+
+    def primera_sesion(self):
+        fechas = self._vigentes()
+        return fechas[0] if fechas else None
+
+    def ultima_sesion(self):
+        fechas = self._vigentes()
+        return fechas[-1] if fechas else None
+
+    def sesion_en_o_antes(self, fecha):
+        """Última sesión <= fecha (YYYYMMDD) o None."""
+        fechas = self._vigentes()
+        posicion = bisect.bisect_right(fechas, clave_fecha(fecha))
+        return fechas[posicion - 1] if posicion else None
+
+    def sesion_anterior(self, fecha):
+        """Última sesión < fecha o None."""
+        fechas = self._vigentes()
+        posicion = bisect.bisect_left(fechas, clave_fecha(fecha))
+        return fechas[posicion - 1] if posicion else None
+
+    def sesion_en_o_despues(self, fecha):
+        """Primera sesión >= fecha o None."""
+        fechas = self._vigentes()
+        posicion = bisect.bisect_left(fechas, clave_fecha(fecha))
+        return fechas[posicion] if posicion < len(fechas) else None
+
+    def sesion_siguiente(self, fecha):
+        """Primera sesión > fecha o None."""
+        fechas = self._vigentes()
+        posicion = bisect.bisect_right(fechas, clave_fecha(fecha))
+        return fechas[posicion] if posicion < len(fechas) else None
+
+    def sesiones_atras(self, fecha, n):
+        """
+        La sesión n sesiones antes de la última sesión <= fecha (n=0: esa misma).
+        None si no hay tantas.
+        """
+        fechas = self._vigentes()
+        posicion = bisect.bisect_right(fechas, clave_fecha(fecha)) - 1 - int(n)
+        return fechas[posicion] if 0 <= posicion < len(fechas) else None
+
+    def sesiones_entre(self, desde, hasta):
+        """Sesiones en [desde, hasta], ordenadas."""
+        fechas = self._vigentes()
+        return fechas[bisect.bisect_left(fechas, clave_fecha(desde)):bisect.bisect_right(fechas, clave_fecha(hasta))]
+
+    def periodos_rapidos(self, hoy=None):
+        """
+        Fechas 'YYYY-MM-DD' de los botones de período rápido: fecha_hoy es la última
+        sesión <= hoy y cada fecha_Nd la primera sesión dentro de los N días anteriores.
+        Sin sesiones, cuenta días de calendario desde hoy.
+        """
+        hoy = hoy or datetime.now()
+        ancla = self.sesion_en_o_antes(hoy)
+        if ancla is None:
+            base = hoy.date() if isinstance(hoy, datetime) else hoy
+            periodos = {nombre: base - timedelta(days=dias) for nombre, dias in PERIODOS_RAPIDOS.items()}
+            periodos['fecha_hoy'] = base
+            return {nombre: dia.strftime('%Y-%m-%d') for nombre, dia in periodos.items()}
+
+        dia_ancla = _a_date(ancla)
+        periodos = {}
+        for nombre, dias in PERIODOS_RAPIDOS.items():
+            inicio = self.sesion_en_o_despues(dia_ancla - timedelta(days=dias)) or ancla
+            periodos[nombre] = _a_date(inicio).strftime('%Y-%m-%d')
+        periodos['fecha_hoy'] = dia_ancla.strftime('%Y-%m-%d')
+        return periodos
+
+    def estadisticas(self):
+        fechas = self._fechas or []
+        return {
+            'cargado': self._fechas is not None,
+            'sesiones': len(fechas),
+            'primera': fechas[0] if fechas else None,
+            'ultima': fechas[-1] if fechas else None,
+            'consultas': self.consultas,
+            'cargas': self.cargas,
+            'actualizaciones': self.actualizaciones
+        }
+
+# Instancia global
+calendario_bursatil = CalendarioBursatil()
+
+def main():
+    fecha = sys.argv[1] if len(sys.argv) > 1 else datetime.now().strftime('%Y%m%d')
+    calendario = calendario_bursatil
+    print(f"📅 {len(calendario)} sesiones ({calendario.primera_sesion()} a {calendario.ultima_sesion()})")
+    print(f"   • En o antes de {fecha}: {calendario.sesion_en_o_antes(fecha)}")
+    print(f"   • Anterior: {calendario.sesion_anterior(fecha)} | siguiente: {calendario.sesion_siguiente(fecha)}")
+    print(f"   • 5 sesiones atrás: {calendario.sesiones_atras(fecha, 5)}")
+    print(f"   • Períodos rápidos: {calendario.periodos_rapidos(datetime.strptime(fecha, '%Y%m%d'))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# cotizacion.py - Registros compactos de cotizaciones (__slots__) en lugar de un
+# diccionario por fila, desde SQLite hasta las plantillas y el JSON
+
+from collections.abc import Mapping
+
+def formatear_fecha(fecha):
+    """'YYYYMMDD' -> 'DD/MM/YYYY'; cualquier otro valor se devuelve igual."""
+    if fecha and len(fecha) == 8:
+        return f"{fecha[6:8]}/{fecha[4:6]}/{fecha[:4]}"
+    return fecha
+
+class Cotizacion(Mapping):
+    """
+    Fila diaria de cotizaciones_efectivas. Sin __dict__ por instancia; se construye
+    con Cotizacion(*fila) seleccionando las columnas en el orden de __slots__.
+    Se lee como un diccionario de solo lectura (c['hoy'], c.get('monto', 0),
+    'anterior' in c, {**c}, dict(c)) y como objeto (c.hoy, también en Jinja).
+    CLAVES define qué expone como mapeo y, por lo tanto, en el JSON.
+    """
+    __slots__ = ('fecha', 'simbolo', 'nombre', 'anterior', 'hoy', 'diferencia_bs',
+                 'variacion', 'cantidad', 'monto', 'fuente')
+    CLAVES = __slots__
+    _CLAVES = frozenset(CLAVES)
+
+    def __init__(self, fecha, simbolo, nombre, anterior, hoy, diferencia_bs,
+                 variacion, cantidad, monto, fuente):
+        self.fecha = fecha
+        self.simbolo = simbolo
+        self.nombre = nombre
+        self.anterior = anterior
+        self.hoy = hoy
+        self.diferencia_bs = diferencia_bs
+        self.variacion = variacion
+        self.cantidad = cantidad
+        self.monto = monto
+        self.fuente = fuente
+
+    def __getitem__(self, clave):
+        if clave in self._CLAVES:
+            return getattr(self, clave)
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        if clave in self._CLAVES:
+            return getattr(self, clave)
+        return defecto
+
+    def __contains__(self, clave):
+        return clave in self._CLAVES
+
+    def __iter__(self):
+        return iter(self.CLAVES)
+
+    def __len__(self):
+        return len(self.CLAVES)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class CotizacionHistorica(Cotizacion):
+    """
+    Fila del histórico de un símbolo. 'precio' y 'cambio_bs' son alias de hoy y
+    diferencia_bs; 'fecha_formateada' (DD/MM/YYYY) se calcula al leerla.
+    """
+    __slots__ = ()
+    CLAVES = ('fecha', 'simbolo', 'nombre', 'precio', 'variacion', 'cambio_bs',
+              'cantidad', 'monto', 'anterior', 'fuente', 'fecha_formateada')
+    _CLAVES = frozenset(CLAVES)
+
+    @property
+    def precio(self):
+        return self.hoy
+
+    @property
+    def cambio_bs(self):
+        return self.diferencia_bs
+
+    @property
+    def fecha_formateada(self):
+        return formatear_fecha(self.fecha)
+
+class CotizacionDolar(Mapping):
+    """
+    Cotización del histórico comparada con el dólar BCV. Guarda la fila original
+    (sin copiarla) y la tasa del día; los valores en USD se calculan al leerlos.
+    """
+    __slots__ = ('cotizacion', 'tasa_dolar', 'variacion_dolar', 'dolar_encontrado_exacto', 'fecha_dolar')
+    CLAVES_DOLAR = ('tasa_dolar', 'precio_usd', 'anterior_usd', 'variacion_usd_porcentaje',
+                    'variacion_dolar_bcv', 'diferencia_vs_dolar', 'dolar_encontrado_exacto',
+                    'fecha_dolar')
+    _CLAVES_DOLAR = frozenset(CLAVES_DOLAR)
+
+    def __init__(self, cotizacion, tasa_dolar, variacion_dolar, dolar_encontrado_exacto, fecha_dolar):
+        self.cotizacion = cotizacion
+        self.tasa_dolar = tasa_dolar            # Nunca 0: sin tasa se usa 1
+        self.variacion_dolar = variacion_dolar  # En porcentaje, sin redondear
+        self.dolar_encontrado_exacto = dolar_encontrado_exacto
+        self.fecha_dolar = fecha_dolar
+
+    @property
+    def precio_usd(self):
+        return self.cotizacion['precio'] / self.tasa_dolar
+
+    @property
+    def anterior_usd(self):
+        anterior = self.cotizacion.get('anterior', 0)
+        return anterior / self.tasa_dolar if anterior > 0 else 0
+
+    @property
+    def variacion_usd_porcentaje(self):
+        anterior_usd = self.anterior_usd
+        if anterior_usd > 0:
+            return round((self.precio_usd - anterior_usd) / anterior_usd * 100, 2)
+        return 0
+
+    @property
+    def variacion_dolar_bcv(self):
+        return round(self.variacion_dolar, 2)
+
+    @property
+    def diferencia_vs_dolar(self):
+        return round(self.cotizacion.get('variacion', 0) - self.variacion_dolar, 2)
+
+    def __getattr__(self, nombre):
+        # Solo se llama si el atributo no existe aquí: se delega en la fila (Jinja: d.precio)
+        if nombre.startswith('__'):
+            raise AttributeError(nombre)
+        return getattr(self.cotizacion, nombre)
+
+    def __getitem__(self, clave):
+        if clave in self._CLAVES_DOLAR:
+            return getattr(self, clave)
+        return self.cotizacion[clave]
+
+    def get(self, clave, defecto=None):
+        if clave in self._CLAVES_DOLAR:
+            return getattr(self, clave)
+        return self.cotizacion.get(clave, defecto)
+
+    def __contains__(self, clave):
+        return clave in self._CLAVES_DOLAR or clave in self.cotizacion
+
+    def __iter__(self):
+        yield from self.cotizacion
+        yield from self.CLAVES_DOLAR
+
+    def __len__(self):
+        return len(self.cotizacion) + len(self.CLAVES_DOLAR)
+
+    def __repr__(self):
+        return f"CotizacionDolar({dict(self)!r})"
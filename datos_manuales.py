@@ -11,13 +11,11 @@ def crear_tablas_manuales():
 def obtener_nombre_real_accion(simbolo):
     """Busca el nombre real de una acción en la base de datos automática"""
     # Necesitamos acceder a la base de datos SQLite
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return simbolo.upper()
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
@@ -102,13 +100,11 @@ def obtener_datos_manuales(fecha):
 
 def listar_fechas_con_datos_manuales():
     """Lista todas las fechas que tienen datos manuales desde SQLite"""
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return []
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
@@ -152,13 +148,11 @@ def verificar_fecha_con_datos(fecha):
 
 def obtener_acciones_manuales_por_simbolo(simbolo):
     """Obtiene todas las acciones manuales para un símbolo específico desde SQLite"""
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return []
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
@@ -180,13 +174,11 @@ def obtener_acciones_manuales_por_simbolo(simbolo):
 
 def obtener_todas_acciones_manuales():
     """Obtiene todas las acciones ingresadas manualmente desde SQLite"""
-    import sqlite3
-    
     db_path = "database/bolsa_datos.db"
     if not os.path.exists(db_path):
         return []
     
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_manager.conexion_lectura()
     cursor = conn.cursor()
     
     try:
@@ -218,47 +210,52 @@ def corregir_nombres_manuales():
     
     print(f"📊 Encontradas {len(acciones_manuales)} acciones manuales")
     
-    import sqlite3
-    db_path = "database/bolsa_datos.db"
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    corregidas = 0
+    # Calcular primero los cambios (lecturas) y luego escribirlos en un solo trabajo
+    cambios = []
     simbolos_procesados = set()
     
-    try:
-        for accion in acciones_manuales:
-            simbolo = accion['simbolo'].upper()
-            
-            if simbolo in simbolos_procesados:
-                continue
-                
-            simbolos_procesados.add(simbolo)
-            
-            # Buscar nombre real
-            nombre_real = obtener_nombre_real_accion(simbolo)
-            nombre_actual = accion.get('nombre', simbolo)
+    for accion in acciones_manuales:
+        simbolo = accion['simbolo'].upper()
+        
+        if simbolo in simbolos_procesados:
+            continue
             
-            if nombre_actual != nombre_real:
-                # Actualizar en base de datos
-                cursor.execute('''
-                    UPDATE datos_manuales 
-                    SET nombre = ?
-                    WHERE simbolo = ?
-                ''', (nombre_real, simbolo))
-                
-                # Contar cuántas se actualizaron
-                cursor.execute('SELECT changes()')
-                actualizadas = cursor.fetchone()[0]
-                
-                if actualizadas > 0:
-                    print(f"✅ {simbolo}: '{nombre_actual}' → '{nombre_real}' ({actualizadas} registros)")
-                    corregidas += actualizadas
+        simbolos_procesados.add(simbolo)
         
-        conn.commit()
+        # Buscar nombre real
+        nombre_real = obtener_nombre_real_accion(simbolo)
+        nombre_actual = accion.get('nombre', simbolo)
         
-    finally:
-        conn.close()
+        if nombre_actual != nombre_real:
+            cambios.append((simbolo, nombre_actual, nombre_real))
+    
+    def _escribir(conn):
+        cursor = conn.cursor()
+        corregidas = 0
+        for simbolo, nombre_actual, nombre_real in cambios:
+            # Contar antes: datos_manuales es una vista y changes() no cuenta las filas
+            # que su trigger INSTEAD OF actualiza en cotizaciones
+            cursor.execute('SELECT COUNT(*) FROM datos_manuales WHERE simbolo = ?', (simbolo,))
+            actualizadas = cursor.fetchone()[0]
+            
+            # Actualizar en base de datos
+            cursor.execute('''
+                UPDATE datos_manuales 
+                SET nombre = ?
+                WHERE simbolo = ?
+            ''', (nombre_real, simbolo))
+            
+            if actualizadas > 0:
+                print(f"✅ {simbolo}: '{nombre_actual}' → '{nombre_real}' ({actualizadas} registros)")
+                corregidas += actualizadas
+        return corregidas
+    
+    # Escritura a través del escritor único de SQLite
+    corregidas = sqlite_manager.ejecutar_escritura(_escribir) if cambios else 0
+
+    # Los nombres cambian en todas las fechas de esos símbolos
+    if corregidas:
+        sqlite_manager.notificar_cambios({None: {simbolo for simbolo, _, _ in cambios}})
     
     print(f"\n✅ Corrección completada: {corregidas} registros actualizados")
     return corregidas
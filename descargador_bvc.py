@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# descargador_bvc.py - Descargas del .dat diario de la BVC con sesión compartida y reintentos
+#
+# Una sola requests.Session (keep-alive: las descargas seguidas reutilizan la conexión
+# TLS) con un pool de `simultaneas` conexiones. Los errores de red, los timeouts y las
+# respuestas 429/5xx se reintentan con espera exponencial (con azar, y respetando
+# Retry-After); un 404 u otro 4xx es una respuesta definitiva. Una respuesta 200 sin
+# líneas R| no es un .dat: si es una página HTML (mantenimiento, bloqueo, error del
+# servidor) no confirma que la fecha no tenga datos y no entra en fechas_sin_datos.
+# descargar_rango rellena un rango de fechas con como máximo `simultaneas` descargas
+# en paralelo; las escrituras siguen pasando por el escritor único de SQLite.
+#
+# Para probar o medir sin red: python -m benchmarks.servidor_bvc carpeta y --url=...
+#
+# Uso: python descargador_bvc.py desde hasta [--simultaneas=N] [--reintentos=N]
+#                                [--url=plantilla] [--fines-de-semana]
+#   (fechas YYYYMMDD; se saltan las que ya tienen datos o se confirmaron sin datos)
+
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from parser_bvc import parsear_dat_lineas
+
+URL_DESCARGA_BVC = "https://www.bolsadecaracas.com/descargar-diario-bolsa/?type=dat&fecha={fecha}"
+CABECERAS = {'User-Agent': 'Mozilla/5.0'}
+
+TIMEOUT = (5, 10)  # Segundos de conexión y de lectura
+REINTENTOS = 2
+ESPERA_BASE = 0.5  # Primera espera entre reintentos; se duplica en cada uno
+ESPERA_MAXIMA = 8.0
+SIMULTANEAS = 4
+STATUS_REINTENTABLES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+class _LineasVistas:
+    """Itera las líneas de la respuesta recordando la primera con contenido."""
+
+    def __init__(self, lineas):
+        self._lineas = lineas
+        self.primera = None
+
+    def __iter__(self):
+        for linea in self._lineas:
+            if self.primera is None and linea.strip():
+                self.primera = linea.strip()
+            yield linea
+
+def es_pagina_error(primera_linea, tipo_contenido=''):
+    """True si una respuesta sin líneas R| parece una página HTML y no un .dat vacío."""
+    if 'html' in (tipo_contenido or '').lower():
+        return True
+    return bool(primera_linea) and primera_linea.lstrip('\ufeff').startswith('<')
+
+def espera_reintento(intento, retry_after=None):
+    """Segundos antes del reintento `intento` (1, 2, ...): Retry-After o exponencial con azar."""
+    if retry_after:
+        try:
+            return min(ESPERA_MAXIMA, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # Retry-After con fecha HTTP: se usa la espera exponencial
+    espera = min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** (intento - 1))
+    return espera / 2 + random.uniform(0, espera / 2)
+
+class DescargadorBVC:
+    """
+    Cliente HTTP de la BVC compartido por todo el proceso.
+    - descargar(fecha) -> (acciones, indice, respondio)
+    - descargar_rango(fechas) para rellenar históricos en paralelo
+    - estadisticas() para /admin/cache-status
+    """
+
+    def __init__(self, url=URL_DESCARGA_BVC, simultaneas=SIMULTANEAS, reintentos=REINTENTOS,
+                 timeout=TIMEOUT):
+        self.url = url
+        self.simultaneas = simultaneas
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self._sesion = None
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.descargas = 0
+        self.con_datos = 0
+        self.sin_datos = 0
+        self.reintentos_hechos = 0
+        self.paginas_error = 0
+        self.fallidas = 0
+        self.ultimo_error = None
+
+    def sesion(self):
+        """requests.Session con keep-alive y `simultaneas` conexiones por host."""
+        with self._lock:
+            if self._sesion is None:
+                sesion = requests.Session()
+                sesion.headers.update(CABECERAS)
+                adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, self.simultaneas),
+                                        max_retries=0)
+                sesion.mount('http://', adaptador)
+                sesion.mount('https://', adaptador)
+                self._sesion = sesion
+            return self._sesion
+
+    def cerrar(self):
+        with self._lock:
+            if self._sesion is not None:
+                self._sesion.close()
+                self._sesion = None
+
+    def _contar(self, campo, cantidad=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + cantidad)
+
+    def descargar(self, fecha_vvc, reintentos=None):
+        """
+        Descarga y parsea el .dat de una fecha (sin guardar). Retorna (acciones, indice,
+        respondio); respondio es False si no hubo una respuesta definitiva de la BVC
+        (error de red, timeout, 429/5xx tras los reintentos o una página de error).
+        """
+        reintentos = self.reintentos if reintentos is None else reintentos
+        url = self.url.format(fecha=fecha_vvc)
+        retry_after = None
+        motivo = None
+        for intento in range(reintentos + 1):
+            if intento:
+                self._contar('reintentos_hechos')
+                time.sleep(espera_reintento(intento, retry_after))
+            retry_after = None
+            try:
+                # stream=True: el .dat se parsea línea a línea mientras llega
+                with self.sesion().get(url, timeout=self.timeout, stream=True) as respuesta:
+                    if respuesta.status_code != 200:
+                        respuesta.content  # Cuerpo leído: la conexión vuelve al pool en vez de cerrarse
+                    if respuesta.status_code in STATUS_REINTENTABLES:
+                        retry_after = respuesta.headers.get('Retry-After')
+                        motivo = f"HTTP {respuesta.status_code}"
+                        continue
+                    self._contar('descargas')
+                    if respuesta.status_code != 200:
+                        self._contar('sin_datos')
+                        return [], None, True
+                    respuesta.encoding = respuesta.encoding or 'utf-8'
+                    lineas = _LineasVistas(respuesta.iter_lines(decode_unicode=True))
+                    acciones, indice = parsear_dat_lineas(lineas, fecha_vvc, fuente='automatico')
+                    tipo_contenido = respuesta.headers.get('Content-Type', '')
+            except requests.RequestException as e:
+                motivo = repr(e)
+                continue
+
+            if acciones:
+                self._contar('con_datos')
+                return acciones, indice, True
+            if es_pagina_error(lineas.primera, tipo_contenido):
+                # Sin líneas R| y con aspecto de HTML: no es un .dat ni confirma que no haya
+                self._contar('paginas_error')
+                self.ultimo_error = f"{fecha_vvc}: página de error ({tipo_contenido or lineas.primera[:40]})"
+                print(f"⚠️  La BVC respondió una página de error para {fecha_vvc}")
+                return [], None, False
+            self._contar('sin_datos')
+            return [], None, True
+
+        self._contar('fallidas')
+        self.ultimo_error = f"{fecha_vvc}: {motivo}"
+        print(f"❌ Error descargando {fecha_vvc} ({reintentos + 1} intentos): {motivo}")
+        return [], None, False
+
+    def _descargar_y_guardar(self, fecha_vvc):
+        from extractor import guardar_datos_descargados
+        from sqlite_manager import sqlite_manager
+
+        acciones, indice, respondio = self.descargar(fecha_vvc)
+        if acciones:
+            guardar_datos_descargados(fecha_vvc, acciones, indice)
+        elif respondio:
+            sqlite_manager.registrar_fecha_sin_datos(fecha_vvc, motivo='bvc_sin_dat')
+        return len(acciones), respondio
+
+    def descargar_rango(self, fechas, simultaneas=None):
+        """
+        Descarga y guarda las fechas YYYYMMDD con como máximo `simultaneas` descargas a la
+        vez. Retorna {'fechas', 'con_datos', 'sin_datos', 'fallidas', 'filas', 'segundos'}.
+        """
+        fechas = list(fechas)
+        simultaneas = max(1, simultaneas or self.simultaneas)
+        resumen = {'fechas': len(fechas), 'con_datos': 0, 'sin_datos': 0, 'fallidas': 0, 'filas': 0}
+        inicio = time.perf_counter()
+        if fechas:
+            with ThreadPoolExecutor(max_workers=simultaneas, thread_name_prefix="DescargadorBVC") as pool:
+                futuros = {pool.submit(self._descargar_y_guardar, fecha): fecha for fecha in fechas}
+                for futuro in as_completed(futuros):
+                    try:
+                        filas, respondio = futuro.result()
+                    except Exception as e:
+                        print(f"❌ Error guardando {futuros[futuro]}: {e}")
+                        filas, respondio = 0, False
+                    resumen['filas'] += filas
+                    clave = 'con_datos' if filas else ('sin_datos' if respondio else 'fallidas')
+                    resumen[clave] += 1
+        resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+        return resumen
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'url': self.url,
+                'simultaneas': self.simultaneas,
+                'reintentos': self.reintentos,
+                'descargas': self.descargas,
+                'con_datos': self.con_datos,
+                'sin_datos': self.sin_datos,
+                'reintentos_hechos': self.reintentos_hechos,
+                'paginas_error': self.paginas_error,
+                'fallidas': self.fallidas,
+                'ultimo_error': self.ultimo_error
+            }
+
+def fechas_pendientes(desde, hasta, fines_de_semana=False):
+    """Fechas YYYYMMDD de [desde, hasta] sin datos en SQLite ni confirmadas sin datos."""
+    from calendario_bursatil import calendario_bursatil
+    from extractor import fecha_conocida_sin_datos
+
+    dia = datetime.strptime(desde, '%Y%m%d')
+    fin = datetime.strptime(hasta, '%Y%m%d')
+    pendientes = []
+    while dia <= fin:
+        fecha = dia.strftime('%Y%m%d')
+        if (fines_de_semana or dia.weekday() < 5) and fecha not in calendario_bursatil \
+                and not fecha_conocida_sin_datos(fecha):
+            pendientes.append(fecha)
+        dia += timedelta(days=1)
+    return pendientes
+
+# Instancia global (la usan extractor y acceso_async)
+descargador_bvc = DescargadorBVC()
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    if len(argumentos) != 2:
+        print("Uso: python descargador_bvc.py desde hasta [--simultaneas=N] [--reintentos=N] "
+              "[--url=plantilla] [--fines-de-semana]")
+        sys.exit(1)
+
+    descargador_bvc.url = opciones.get('url', descargador_bvc.url)
+    descargador_bvc.simultaneas = int(opciones.get('simultaneas', SIMULTANEAS))
+    descargador_bvc.reintentos = int(opciones.get('reintentos', REINTENTOS))
+
+    fechas = fechas_pendientes(argumentos[0], argumentos[1], '--fines-de-semana' in sys.argv)
+    print(f"🌐 {len(fechas)} fechas por descargar de {argumentos[0]} a {argumentos[1]} "
+          f"({descargador_bvc.simultaneas} simultáneas)")
+    resumen = descargador_bvc.descargar_rango(fechas)
+    print(f"✅ {resumen['con_datos']} con datos ({resumen['filas']} filas), {resumen['sin_datos']} sin datos, "
+          f"{resumen['fallidas']} fallidas en {resumen['segundos']:.1f}s")
+    print(f"📊 {descargador_bvc.estadisticas()}")
+
+if __name__ == "__main__":
+    main()
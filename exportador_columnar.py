@@ -0,0 +1,193 @@
+# exportador_columnar.py - Exporta el histórico completo (acciones, índices y dólar BCV)
+# a archivos columnares mapeables en memoria, leídos con lector_columnar.py.
+#
+# Incremental: cada tabla solo agrega las fechas posteriores a la última exportada.
+# Las correcciones de fechas ya exportadas (p. ej. un dato manual nuevo sobre un día
+# viejo) se recogen con --completo, que reescribe la exportación desde cero.
+#
+# Uso: python exportador_columnar.py [carpeta] [--completo]
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+from lector_columnar import (ARCHIVO_MANIFIESTO, CARPETA_COLUMNAR, NUMPY_DISPONIBLE,
+                             VERSION_FORMATO, leer_manifiesto)
+
+if NUMPY_DISPONIBLE:
+    import numpy as np
+
+TEXTO = None  # dtype de las columnas de texto: códigos de diccionario
+TIPO_CODIGO = '<i4'
+
+# Tabla exportada -> origen, consulta (fecha YYYYMMDD entera primero; ? = última fecha
+# exportada) y columnas (nombre, dtype). Se exportan los datos efectivos: el manual
+# sobre el automático. cantidad es float64 como en el almacén columnar: un NULL es NaN,
+# no 0.
+EXPORTACIONES = {
+    'acciones': {
+        'origen': 'cotizaciones_efectivas',
+        'consulta': '''
+            SELECT fecha_num, simbolo, nombre, anterior, hoy, diferencia_bs,
+                   variacion, cantidad, monto, fuente, manual
+            FROM cotizaciones_efectivas
+            WHERE fecha_num > ?
+            ORDER BY fecha_num, simbolo
+        ''',
+        'fecha_texto': False,
+        'columnas': (('fecha', '<i4'), ('simbolo', TEXTO), ('nombre', TEXTO),
+                     ('anterior', '<f8'), ('hoy', '<f8'), ('diferencia_bs', '<f8'),
+                     ('variacion', '<f8'), ('cantidad', '<f8'), ('monto', '<f8'),
+                     ('fuente', TEXTO), ('manual', '<i1')),
+    },
+    'indices': {
+        'origen': 'indices_efectivos',
+        'consulta': '''
+            SELECT CAST(fecha AS INTEGER), valor, variacion, fuente, manual
+            FROM indices_efectivos
+            WHERE fecha > ?
+            ORDER BY fecha
+        ''',
+        'fecha_texto': True,
+        'columnas': (('fecha', '<i4'), ('valor', '<f8'), ('variacion', '<f8'),
+                     ('fuente', TEXTO), ('manual', '<i1')),
+    },
+    'dolar_bcv': {
+        'origen': 'dolar_bcv',
+        'consulta': '''
+            SELECT CAST(fecha AS INTEGER), tasa, variacion, fuente
+            FROM dolar_bcv
+            WHERE fecha > ?
+            ORDER BY fecha
+        ''',
+        'fecha_texto': True,
+        'columnas': (('fecha', '<i4'), ('tasa', '<f8'), ('variacion', '<f8'), ('fuente', TEXTO)),
+    },
+}
+
+def _escribir_json(ruta, datos):
+    """Escritura atómica: el lector ve el archivo viejo o el nuevo, nunca uno a medias."""
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+def _columna_numerica(valores, dtype):
+    # NULL -> NaN en reales; las columnas enteras (fecha, manual) son NOT NULL
+    if np.dtype(dtype).kind == 'f':
+        return np.array([np.nan if v is None else v for v in valores], dtype=dtype)
+    return np.array([v or 0 for v in valores], dtype=dtype)
+
+def _columnas_manifiesto(definicion):
+    """Columnas de la tabla tal como se guardan en el manifiesto."""
+    return [
+        {'nombre': columna, 'dtype': TIPO_CODIGO, 'diccionario': True} if dtype is TEXTO
+        else {'nombre': columna, 'dtype': dtype}
+        for columna, dtype in definicion['columnas']
+    ]
+
+def _exportar_tabla(conn, nombre, definicion, carpeta_tabla):
+    """Agrega a la tabla exportada las filas posteriores a su última fecha. Retorna filas nuevas."""
+    manifiesto = leer_manifiesto(carpeta_tabla)
+    if manifiesto is not None and manifiesto['columnas'] != _columnas_manifiesto(definicion):
+        manifiesto = None  # Cambió el tipo de alguna columna: la tabla se reescribe desde cero
+    filas = manifiesto['filas'] if manifiesto else 0
+    ultima = manifiesto['ultima_fecha'] if manifiesto else 0
+
+    parametro = f"{ultima:08d}" if definicion['fecha_texto'] else ultima
+    nuevas = conn.execute(definicion['consulta'], (parametro,)).fetchall()
+    if not nuevas and manifiesto is not None:
+        return 0
+
+    os.makedirs(carpeta_tabla, exist_ok=True)
+    valores_por_columna = list(zip(*nuevas)) if nuevas else [()] * len(definicion['columnas'])
+    diccionarios = {}
+    for (columna, dtype), valores in zip(definicion['columnas'], valores_por_columna):
+        if dtype is TEXTO:
+            ruta_dic = os.path.join(carpeta_tabla, f"{columna}.json")
+            diccionario = []
+            if manifiesto is not None and os.path.exists(ruta_dic):
+                with open(ruta_dic, encoding='utf-8') as archivo:
+                    diccionario = json.load(archivo)
+            codigos = {valor: i for i, valor in enumerate(diccionario)}
+            for valor in valores:
+                if valor not in codigos:
+                    codigos[valor] = len(diccionario)
+                    diccionario.append(valor)
+            datos = np.array([codigos[v] for v in valores], dtype=TIPO_CODIGO)
+            diccionarios[columna] = (ruta_dic, diccionario)
+            dtype = TIPO_CODIGO
+        else:
+            datos = _columna_numerica(valores, dtype)
+
+        # Recortar lo que una exportación interrumpida dejó después de las filas válidas
+        ruta_bin = os.path.join(carpeta_tabla, f"{columna}.bin")
+        with open(ruta_bin, 'r+b' if os.path.exists(ruta_bin) else 'w+b') as archivo:
+            archivo.truncate(filas * np.dtype(dtype).itemsize)
+            archivo.seek(0, os.SEEK_END)
+            archivo.write(datos.tobytes())
+
+    # Diccionarios (solo crecen) y, al final, el manifiesto que publica las filas nuevas
+    for ruta_dic, diccionario in diccionarios.values():
+        _escribir_json(ruta_dic, diccionario)
+    _escribir_json(os.path.join(carpeta_tabla, ARCHIVO_MANIFIESTO), {
+        'formato': VERSION_FORMATO,
+        'tabla': nombre,
+        'filas': filas + len(nuevas),
+        'ultima_fecha': nuevas[-1][0] if nuevas else ultima,
+        'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'columnas': _columnas_manifiesto(definicion),
+    })
+    return len(nuevas)
+
+def exportar_historico(conn, carpeta=CARPETA_COLUMNAR, completo=False):
+    """
+    Exporta (o actualiza) todas las tablas. conn: conexión de lectura con las
+    particiones adjuntas (sqlite_manager.conexion_lectura()). Retorna {tabla: filas nuevas}.
+    completo=True construye en una carpeta aparte y la intercambia al terminar.
+    """
+    if not NUMPY_DISPONIBLE:
+        raise RuntimeError("numpy es necesario para exportar en formato columnar")
+
+    destino = carpeta + '.tmp' if completo else carpeta
+    if completo and os.path.exists(destino):
+        shutil.rmtree(destino)
+
+    resultado = {}
+    for nombre, definicion in EXPORTACIONES.items():
+        if not conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = ?",
+                            (definicion['origen'],)).fetchone():
+            print(f"⚠️  {nombre}: tabla de origen inexistente, se omite")
+            continue
+        resultado[nombre] = _exportar_tabla(conn, nombre, definicion, os.path.join(destino, nombre))
+
+    if completo:
+        # Los lectores con archivos abiertos conservan sus mapeos (los inodos siguen vivos)
+        anterior = carpeta + '.anterior'
+        if os.path.exists(carpeta):
+            os.replace(carpeta, anterior)
+        os.replace(destino, carpeta)
+        shutil.rmtree(anterior, ignore_errors=True)
+    return resultado
+
+def main():
+    from sqlite_manager import sqlite_manager
+
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    carpeta = argumentos[0] if argumentos else CARPETA_COLUMNAR
+    completo = '--completo' in sys.argv
+
+    print(f"📤 Exportando histórico columnar a {carpeta}{' (completo)' if completo else ''}...")
+    conn = sqlite_manager.conexion_lectura()
+    try:
+        resultado = exportar_historico(conn, carpeta, completo)
+    finally:
+        conn.close()
+    for nombre, nuevas in resultado.items():
+        print(f"   • {nombre}: {nuevas} filas nuevas")
+    print("✅ Exportación columnar terminada")
+
+if __name__ == "__main__":
+    main()
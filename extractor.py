@@ -1,8 +1,9 @@
 
-import requests
 import os
 from datetime import datetime, timedelta
 from sqlite_manager import sqlite_manager  # NUEVO - Usamos SQLite en lugar de TinyDB
+from indice_data_cache import obtener_indice
+from descargador_bvc import descargador_bvc
 
 # Importar funciones de dat_parser si existe
 try:
@@ -18,58 +19,25 @@ except ImportError:
     def parsear_archivo_dat(ruta_archivo):
         return [], None
 
-def limpiar_numero(texto):
-    """Convierte '6.230,00' o '6230' a float 6230.0 correctamente."""
-    if not texto or not isinstance(texto, str): 
-        return 0.0
-    
-    t = texto.strip()
-    if t in ["-", "", "N/D", "0", "0,00", "0.00"]: 
-        return 0.0
-    
-    try:
-        # Eliminar símbolos de moneda y espacios
-        t = t.replace('Bs.', '').replace('bs.', '').replace('Bs', '').replace('$', '').strip()
-        
-        # Si tiene formato con puntos y comas (1.250,50)
-        if "." in t and "," in t:
-            partes = t.split(",")
-            if len(partes[-1]) == 2:
-                t = t.replace(".", "").replace(",", ".")
-            else:
-                t = t.replace(",", "")
-        elif "," in t:
-            partes = t.split(",")
-            if len(partes[-1]) == 2:
-                t = t.replace(",", ".")
-            else:
-                t = t.replace(",", "")
-        
-        t = ''.join(c for c in t if c.isdigit() or c in '.-')
-        
-        if not t:
-            return 0.0
-            
-        result = float(t)
-        
-        if result < 0.0001 and result > -0.0001:
-            return 0.0
-            
-        return result
-    except Exception as e:
-        print(f"Error limpiando número '{texto}': {e}")
-        return 0.0
+def fecha_conocida_sin_datos(fecha_vvc):
+    """
+    True si la fecha ya se confirmó sin datos (fechas_sin_datos) y desde entonces no
+    apareció un .dat para ella en data_cache. Cuesta una consulta por clave primaria.
+    """
+    if not sqlite_manager.fecha_sin_datos(fecha_vvc):
+        return False
+    return not (DAT_PARSER_DISPONIBLE and fecha_vvc in obtener_indice())
+
+def buscar_datos_locales(fecha_vvc):
+    """Pasos 1 y 2 de descargar_y_guardar: SQLite y archivos .dat. Retorna ([], None) si no hay datos."""
 
-def descargar_y_guardar(fecha_vvc):
-    """Función principal para obtener datos. PRIORIZA SQLITE Y ARCHIVOS .DAT"""
-    
     # 1. PRIMERO BUSCAR EN SQLITE (MUY RÁPIDO)
     datos_sqlite = sqlite_manager.obtener_acciones_por_fecha(fecha_vvc)
     if datos_sqlite:
         indice_sqlite = sqlite_manager.obtener_indice_por_fecha(fecha_vvc)
         print(f"📊 SQLite {fecha_vvc}: {len(datos_sqlite)} registros")
         return datos_sqlite, indice_sqlite
-    
+
     # 2. BUSCAR EN ARCHIVOS .DAT (NUEVO - PRIORIDAD ALTA)
     if DAT_PARSER_DISPONIBLE and os.path.exists("data_cache"):
         print(f"🔍 Buscando en data_cache para {fecha_vvc}...")
@@ -86,72 +54,55 @@ def descargar_y_guardar(fecha_vvc):
                     sqlite_manager.insertar_indice(fecha_vvc, indice_dat)
                 
                 return acciones_dat, indice_dat
-    
-    # 3. Si no está en SQLite ni en archivos .dat, intentar descargar de BVC
-    url = f"https://www.bolsadecaracas.com/descargar-diario-bolsa/?type=dat&fecha={fecha_vvc}"
-    try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-        if response.status_code == 200 and "R|" in response.text:
-            acciones_dia = []
-            indice_dia = None
-            lineas = response.text.split('\n')
-            
-            print(f"🌐 Descargando datos automáticos para {fecha_vvc}...")
-            
-            for linea in lineas:
-                d = linea.split('|')
-                if linea.startswith('R|') and len(d) >= 13:
-                    simbolo = d[2].strip()
-                    p_anterior = limpiar_numero(d[3])
-                    p_hoy = limpiar_numero(d[4])
-                    
-                    if p_anterior > 0 and p_hoy > 0:
-                        diferencia_bs = p_hoy - p_anterior
-                        variacion_real = (diferencia_bs / p_anterior) * 100
-                    else:
-                        diferencia_bs = 0
-                        variacion_real = 0.0
-                    
-                    acciones_dia.append({
-                        'fecha': fecha_vvc,
-                        'nombre': d[1].strip(),
-                        'simbolo': simbolo,
-                        'anterior': p_anterior,
-                        'hoy': p_hoy,
-                        'diferencia_bs': round(diferencia_bs, 4),
-                        'variacion': round(variacion_real, 2),
-                        'cantidad': int(limpiar_numero(d[11])),
-                        'monto': limpiar_numero(d[12]),
-                        'fuente': 'automatico'
-                    })
-                elif linea.startswith('IG|') and len(d) >= 5:
-                    indice_dia = {
-                        'fecha': fecha_vvc,
-                        'valor': limpiar_numero(d[2]),
-                        'variacion': limpiar_numero(d[4]),
-                        'fuente': 'automatico'
-                    }
-            
-            if acciones_dia:
-                print(f"💾 Guardando {len(acciones_dia)} registros automáticos en SQLite...")
-                sqlite_manager.insertar_acciones(fecha_vvc, acciones_dia)
-                if indice_dia: 
-                    sqlite_manager.insertar_indice(fecha_vvc, indice_dia)
-                
-                return acciones_dia, indice_dia
-    except Exception as e:
-        print(f"❌ Error descargando {fecha_vvc}: {e}")
-    
-    # 4. Si no hay datos automáticos, buscar datos manuales (ya están en SQLite)
+
+    return [], None
+
+def guardar_datos_descargados(fecha_vvc, acciones_dia, indice_dia):
+    """Guarda en SQLite lo descargado de la BVC."""
+    print(f"💾 Guardando {len(acciones_dia)} registros automáticos en SQLite...")
+    sqlite_manager.insertar_acciones(fecha_vvc, acciones_dia)
+    if indice_dia:
+        sqlite_manager.insertar_indice(fecha_vvc, indice_dia)
+
+def buscar_datos_manuales(fecha_vvc):
+    """Paso 4 de descargar_y_guardar: datos manuales (ya están en SQLite)."""
     print(f"🔍 Datos automáticos no disponibles para {fecha_vvc}, buscando datos manuales en SQLite...")
     from datos_manuales import obtener_datos_manuales
     datos_manual, indice_manual = obtener_datos_manuales(fecha_vvc)
-    
+
     if datos_manual:
         return datos_manual, indice_manual
-    
+
     return [], None
 
+def descargar_y_guardar(fecha_vvc):
+    """Función principal para obtener datos. PRIORIZA SQLITE Y ARCHIVOS .DAT"""
+
+    # 0. Fechas ya confirmadas sin datos (feriados, días sin publicar): nada que buscar
+    if fecha_conocida_sin_datos(fecha_vvc):
+        return [], None
+
+    # 1 y 2. SQLite y archivos .dat
+    acciones, indice = buscar_datos_locales(fecha_vvc)
+    if acciones:
+        return acciones, indice
+
+    # 3. Si no está en SQLite ni en archivos .dat, intentar descargar de BVC
+    # (sesión compartida con reintentos; la versión async para las vistas está en acceso_async.py)
+    # respondio: la BVC contestó (con o sin .dat); un error de red, un 5xx o una página de
+    # error no confirman nada
+    acciones_dia, indice_dia, respondio = descargador_bvc.descargar(fecha_vvc)
+    if acciones_dia:
+        print(f"🌐 Descargando datos automáticos para {fecha_vvc}...")
+        guardar_datos_descargados(fecha_vvc, acciones_dia, indice_dia)
+        return acciones_dia, indice_dia
+
+    # 4. Si no hay datos automáticos, buscar datos manuales (ya están en SQLite)
+    acciones, indice = buscar_datos_manuales(fecha_vvc)
+    if not acciones and respondio:
+        sqlite_manager.registrar_fecha_sin_datos(fecha_vvc, motivo='bvc_sin_dat')
+    return acciones, indice
+
 # FUNCIÓN OPTIMIZADA PARA HISTÓRICO (USANDO SQLITE)
 def obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta):
     """
@@ -182,35 +133,10 @@ def obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta):
         if datos_historicos:
             print(f"✅ Encontrados {len(datos_historicos)} registros para {simbolo} en SQLite")
             
-            # Formatear datos para salida
-            datos_formateados = []
-            for dato in datos_historicos:
-                fecha_str = dato['fecha']
-                try:
-                    if len(fecha_str) == 8:
-                        fecha_dt = datetime.strptime(fecha_str, '%Y%m%d')
-                        fecha_formateada = fecha_dt.strftime('%d/%m/%Y')
-                    else:
-                        fecha_formateada = fecha_str
-                except:
-                    fecha_formateada = fecha_str
-                
-                datos_formateados.append({
-                    'fecha': fecha_str,
-                    'fecha_formateada': fecha_formateada,
-                    'precio': dato.get('precio', dato.get('hoy', 0)),
-                    'variacion': dato.get('variacion', 0),
-                    'cambio_bs': dato.get('cambio_bs', dato.get('diferencia_bs', 0)),
-                    'cantidad': dato.get('cantidad', 0),
-                    'monto': dato.get('monto', 0),
-                    'anterior': dato.get('anterior', 0),
-                    'fuente': dato.get('fuente', 'desconocida')
-                })
-            
-            # MODIFICADO: Ordenar de más reciente a más antiguo
-            datos_formateados.sort(key=lambda x: x['fecha'], reverse=True)
-            
-            return datos_formateados
+            # Ya vienen de más reciente a más antiguo (SQL y almacén columnar) y con
+            # precio, cambio_bs y fecha_formateada: se devuelven sin copiarlos ni
+            # reordenarlos (HistoricoColumnar no construye las filas). No se modifican.
+            return datos_historicos
         else:
             print(f"⚠️  No se encontraron datos en SQLite para {simbolo}")
             return []
@@ -221,7 +147,7 @@ def obtener_historico_rapido(simbolo, fecha_desde, fecha_hasta):
 
 # Función para precargar datos comunes
 def precargar_datos_comunes():
-    """Precarga datos de los últimos 30 días en caché SQLite."""
+    """Precarga datos de los últimos 30 días en caché SQLite. Retorna las fechas precargadas."""
     hoy = datetime.now()
     fecha_inicio = hoy - timedelta(days=30)
     
@@ -238,8 +164,9 @@ def precargar_datos_comunes():
             print(f"⚠️  Error cargando desde data_cache a SQLite: {e}")
     
     # Luego precargar en caché de SQLite
-    sqlite_manager.precargar_cache(30)
+    fechas = sqlite_manager.precargar_cache(30)
     print("✅ Precarga SQLite completada")
+    return fechas
 
 # Función auxiliar para buscar en archivos .dat si no hay datos
 def buscar_datos_externos(fecha_str):
@@ -247,6 +174,9 @@ def buscar_datos_externos(fecha_str):
     Busca datos en todas las fuentes posibles.
     Útil cuando SQLite no tiene datos.
     """
+    if fecha_conocida_sin_datos(fecha_str):
+        return [], None
+
     # 1. Buscar en archivos .dat
     if DAT_PARSER_DISPONIBLE and os.path.exists("data_cache"):
         acciones, indice = buscar_en_data_cache(fecha_str)
@@ -171,8 +171,10 @@ def agregar_datos_indice_manual():
     for fecha, valor, variacion in datos_prueba:
         try:
             cursor.execute('''
-                INSERT OR REPLACE INTO indices (fecha, valor, variacion, fuente)
+                INSERT INTO indices (fecha, valor, variacion, fuente)
                 VALUES (?, ?, ?, 'prueba')
+                ON CONFLICT(fecha) DO UPDATE SET
+                    valor = excluded.valor, variacion = excluded.variacion, fuente = excluded.fuente
             ''', (fecha, valor, variacion))
         except Exception as e:
             print(f"Error insertando {fecha}: {e}")
@@ -0,0 +1,125 @@
+# indice_data_cache.py - Índice en memoria fecha -> archivo de la carpeta data_cache
+#
+# buscar_en_data_cache resolvía cada fecha con os.path.exists y, si fallaba, con un
+# os.listdir + búsqueda por subcadena; buscar_datos_habiles lo llama hasta 20 veces por
+# solicitud. El índice se construye con un solo os.scandir y se reconstruye solo cuando
+# cambia el mtime de la carpeta (altas, bajas o renombrados de archivos): cada consulta
+# cuesta un stat de la carpeta y una búsqueda en un dict.
+# La lista ordenada de fechas sirve al calendario bursátil (fechas con archivo).
+
+import bisect
+import os
+import threading
+import time
+
+from parser_bvc import fecha_de_nombre
+
+# Un mtime tan reciente puede no reflejar un cambio hecho en el mismo instante (la
+# resolución del reloj del sistema de archivos es gruesa): se vuelve a mirar la carpeta.
+MARGEN_MTIME_NS = 2 * 1000 ** 3
+
+def _prioridad(fecha, nombre):
+    """Si hay varios archivos para una fecha: <fecha>.dat, luego <fecha>.dat.gz, luego el resto."""
+    if nombre == f"{fecha}.dat":
+        return (0, nombre)
+    if nombre == f"{fecha}.dat.gz":
+        return (1, nombre)
+    return (2, nombre)
+
+class IndiceDataCache:
+    """
+    Índice seguro entre hilos de los .dat / .dat.gz de una carpeta.
+    - ruta(fecha) en O(1)
+    - fechas() / fechas_entre(desde, hasta) ordenadas (bisect)
+    - se mantiene al día comparando el mtime de la carpeta en cada consulta
+    """
+
+    def __init__(self, carpeta="data_cache"):
+        self.carpeta = carpeta
+        self._rutas = {}
+        self._fechas = []
+        self._mtime_ns = None  # None: todavía no se construyó (o hay que reconstruir)
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.consultas = 0
+        self.reconstrucciones = 0
+
+    def _estado_carpeta(self):
+        try:
+            return os.stat(self.carpeta).st_mtime_ns
+        except OSError:
+            return -1  # La carpeta no existe: índice vacío
+
+    def _construir(self, mtime_ns):
+        elegidos = {}
+        if mtime_ns != -1:
+            with os.scandir(self.carpeta) as entradas:
+                for entrada in entradas:
+                    fecha = fecha_de_nombre(entrada.name)
+                    if fecha is None or not entrada.is_file():
+                        continue
+                    candidato = _prioridad(fecha, entrada.name)
+                    if fecha not in elegidos or candidato < elegidos[fecha][0]:
+                        elegidos[fecha] = (candidato, entrada.path)
+        self._rutas = {fecha: ruta for fecha, (_, ruta) in elegidos.items()}
+        self._fechas = sorted(self._rutas)
+        self._mtime_ns = mtime_ns if time.time_ns() - mtime_ns > MARGEN_MTIME_NS else None
+        self.reconstrucciones += 1
+
+    def _vigente(self):
+        """Reconstruye el índice si la carpeta cambió desde la última vez."""
+        mtime_ns = self._estado_carpeta()
+        with self._lock:
+            self.consultas += 1
+            if mtime_ns != self._mtime_ns:
+                self._construir(mtime_ns)
+            return self._rutas, self._fechas
+
+    def ruta(self, fecha):
+        """Ruta del archivo de la fecha YYYYMMDD, o None si no hay."""
+        rutas, _ = self._vigente()
+        return rutas.get(fecha)
+
+    def __contains__(self, fecha):
+        return self.ruta(fecha) is not None
+
+    def __len__(self):
+        return len(self._vigente()[1])
+
+    def fechas(self):
+        """Fechas YYYYMMDD con archivo, ordenadas."""
+        return list(self._vigente()[1])
+
+    def fechas_entre(self, desde, hasta):
+        """Fechas con archivo en [desde, hasta] (YYYYMMDD), ordenadas."""
+        _, fechas = self._vigente()
+        return fechas[bisect.bisect_left(fechas, desde):bisect.bisect_right(fechas, hasta)]
+
+    def invalidar(self):
+        """Fuerza la reconstrucción en la próxima consulta."""
+        with self._lock:
+            self._mtime_ns = None
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'carpeta': self.carpeta,
+                'archivos': len(self._rutas),
+                'fecha_min': self._fechas[0] if self._fechas else None,
+                'fecha_max': self._fechas[-1] if self._fechas else None,
+                'consultas': self.consultas,
+                'reconstrucciones': self.reconstrucciones
+            }
+
+_indices = {}
+_lock_indices = threading.Lock()
+
+def obtener_indice(carpeta="data_cache"):
+    """Índice compartido de una carpeta (uno por ruta)."""
+    clave = os.path.abspath(carpeta)
+    with _lock_indices:
+        indice = _indices.get(clave)
+        if indice is None:
+            indice = _indices[clave] = IndiceDataCache(carpeta)
+        return indice
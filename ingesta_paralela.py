@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# ingesta_paralela.py - Carga de archivos .dat en paralelo: N procesos parsean, un escritor confirma
+#
+# Los archivos se reparten en tareas de `archivos_por_tarea` entre los procesos de un
+# ProcessPoolExecutor (parser_bvc.iterar_dat, sin tocar SQLite). El proceso principal
+# junta las filas en lotes de `tamano_lote` y los envía al escritor único de
+# sqlite_manager, una transacción por lote; mientras ese lote se confirma, los procesos
+# siguen parseando. Como mucho hay un lote en escritura y 2 tareas por proceso en
+# vuelo, así la memoria no crece con el tamaño del archivo histórico.
+#
+# Qué archivos se cargan lo decide la tabla ingest_manifest (nombre, tamaño, mtime,
+# hash, filas): un solo recorrido de la carpeta omite los archivos con el mismo tamaño
+# y mtime; los demás se leen y, si el hash tampoco cambió, solo se actualiza su mtime.
+# Un archivo republicado con otro contenido reemplaza las filas de su fecha.
+# Además de .dat se cargan .dat.gz y .zip (un .dat por día, p. ej. un mes).
+#
+# Un solo archivo (p. ej. un paquete .zip con años de .dat) se carga como flujo con
+# ingestar_registros: los registros se leen línea a línea y se confirman por lotes.
+#
+# Uso: python ingesta_paralela.py [carpeta | archivo.zip | archivo.dat.gz] [--trabajadores=N] [--todos]
+#   --trabajadores=0 parsea en el mismo proceso, sin pool
+#   --todos ignora el manifiesto y vuelve a cargar todos los archivos (UPSERT)
+
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from parser_bvc import fecha_de_nombre, iterar_dat
+
+ARCHIVOS_POR_TAREA = 50
+TAMANO_LOTE = 50000  # Filas de acciones por transacción
+INTERVALO_PROGRESO = 2.0  # Segundos entre líneas de progreso
+TAMANO_BLOQUE_HASH = 1024 * 1024
+
+def es_archivo_dat(nombre):
+    return fecha_de_nombre(nombre) is not None or nombre.lower().endswith('.zip')
+
+def _hash_archivo(ruta):
+    """(tamaño, sha256) leyendo el archivo por bloques."""
+    hash_ = hashlib.sha256()
+    tamano = 0
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE_HASH), b''):
+            hash_.update(bloque)
+            tamano += len(bloque)
+    return tamano, hash_.hexdigest()
+
+def _parsear_tarea(entradas):
+    """
+    En un proceso del pool: parsea un grupo de (ruta, fila anterior del manifiesto o None).
+    Retorna (archivos, filas, indices, manifiesto, republicados, iguales, errores).
+    """
+    filas = []
+    indices = []
+    manifiesto = []
+    republicados = []
+    iguales = 0
+    errores = []
+    for ruta, anterior in entradas:
+        nombre = os.path.basename(ruta)
+        try:
+            mtime_ns = os.stat(ruta).st_mtime_ns
+            tamano, hash_ = _hash_archivo(ruta)
+            if anterior is not None and anterior[3] == hash_:
+                # Solo cambió el mtime (copia, touch): nada que cargar
+                manifiesto.append((nombre, tamano, mtime_ns, hash_, anterior[4], anterior[5]))
+                iguales += 1
+                continue
+            acciones = []
+            indices_archivo = []
+            for tipo, fila in iterar_dat(ruta, fuente='archivo_dat'):
+                (acciones if tipo == 'accion' else indices_archivo).append(fila)
+        except Exception as e:
+            errores.append((ruta, str(e)))
+            continue
+        filas.extend(acciones)
+        indices.extend(indices_archivo)  # Si una fecha trae varias líneas IG|, el UPSERT deja la última
+        if anterior is not None:
+            republicados.extend({fila[0] for fila in acciones} | {fila[0] for fila in indices_archivo})
+        manifiesto.append((nombre, tamano, mtime_ns, hash_, len(acciones),
+                           datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    return len(entradas), filas, indices, manifiesto, republicados, iguales, errores
+
+def archivos_pendientes(carpeta, manifiesto=None):
+    """
+    Un recorrido de la carpeta: (pendientes, omitidos). pendientes son (ruta, fila
+    anterior del manifiesto o None) de los .dat nuevos o con otro tamaño o mtime,
+    ordenados por nombre; omitidos cuenta los que siguen iguales al manifiesto.
+    """
+    manifiesto = manifiesto or {}
+    pendientes = []
+    omitidos = 0
+    with os.scandir(carpeta) as entradas:
+        for entrada in entradas:
+            if not es_archivo_dat(entrada.name) or not entrada.is_file():
+                continue
+            anterior = manifiesto.get(entrada.name)
+            if anterior is not None:
+                estado = entrada.stat()
+                if anterior[1] == estado.st_size and anterior[2] == estado.st_mtime_ns:
+                    omitidos += 1
+                    continue
+            pendientes.append((entrada.path, anterior))
+    pendientes.sort()
+    return pendientes, omitidos
+
+class _Medidor:
+    """Acumula los totales de la carga e imprime el rendimiento (archivos/s, filas/s)."""
+
+    def __init__(self, total_archivos):
+        self.total_archivos = total_archivos
+        self.archivos = 0
+        self.filas = 0
+        self.indices = 0
+        self.iguales = 0
+        self.republicados = 0
+        self.errores = 0
+        self.inicio = time.perf_counter()
+        self._ultimo = self.inicio
+
+    def sumar(self, archivos, filas, indices, iguales, republicados, errores):
+        self.archivos += archivos
+        self.filas += filas
+        self.indices += indices
+        self.iguales += iguales
+        self.republicados += republicados
+        self.errores += errores
+        ahora = time.perf_counter()
+        if ahora - self._ultimo >= INTERVALO_PROGRESO:
+            self._ultimo = ahora
+            segundos = ahora - self.inicio
+            print(f"📊 Progreso: {self.archivos}/{self.total_archivos} archivos | "
+                  f"{self.archivos / segundos:.0f} archivos/s | {self.filas / segundos:.0f} filas/s")
+
+    def segundos(self):
+        return max(time.perf_counter() - self.inicio, 1e-6)
+
+class _Lotes:
+    """
+    Filas camino del escritor único: se acumulan y se envían por lotes, con como mucho
+    un lote confirmándose mientras se arma el siguiente.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.totales = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+        self.filas = []
+        self.indices = []
+        self.manifiesto = []
+        self.republicados = []
+        self._en_escritura = None  # Future del lote que el escritor está confirmando
+
+    def esperar(self):
+        if self._en_escritura is not None:
+            resultado = self._en_escritura.result()
+            self._en_escritura = None
+            self.manager.notificar_cambios(resultado['cambios'])
+            for clave in self.totales:
+                self.totales[clave] += resultado[clave]
+
+    def volcar(self):
+        self.esperar()
+        self._en_escritura = self.manager.enviar_ingesta(
+            self.filas, self.indices, self.manifiesto, self.republicados)
+        self.filas, self.indices, self.manifiesto, self.republicados = [], [], [], []
+
+    def terminar(self):
+        """Envía lo que quede y espera su confirmación. Retorna los totales."""
+        if self.filas or self.indices or self.manifiesto:
+            self.volcar()
+        self.esperar()
+        return self.totales
+
+def ingestar_archivos(entradas, trabajadores=None, archivos_por_tarea=ARCHIVOS_POR_TAREA,
+                      tamano_lote=TAMANO_LOTE, manager=None):
+    """
+    Parsea los archivos en `trabajadores` procesos (por defecto, uno por núcleo; 0 en
+    este mismo proceso, sin pool: para pocos archivos o desde un proceso con hilos como
+    el vigilante de data_cache) y carga las filas con el escritor único, registrando
+    cada archivo en ingest_manifest.
+    entradas: rutas o pares (ruta, fila anterior del manifiesto) de archivos_pendientes.
+    Retorna los totales y el rendimiento.
+    """
+    if manager is None:
+        from sqlite_manager import sqlite_manager as manager
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = max(0, trabajadores)
+
+    entradas = [e if isinstance(e, tuple) else (e, None) for e in entradas]
+    tareas = iter([entradas[i:i + archivos_por_tarea] for i in range(0, len(entradas), archivos_por_tarea)])
+    medidor = _Medidor(len(entradas))
+    lotes = _Lotes(manager)
+
+    def recoger(resultado_tarea):
+        (archivos, filas_tarea, indices_tarea, manifiesto_tarea,
+         republicados_tarea, iguales, errores) = resultado_tarea
+        for ruta, error in errores:
+            print(f"❌ Error parseando {ruta}: {error}")
+        lotes.filas.extend(filas_tarea)
+        lotes.indices.extend(indices_tarea)
+        lotes.manifiesto.extend(manifiesto_tarea)
+        lotes.republicados.extend(republicados_tarea)
+        medidor.sumar(archivos, len(filas_tarea), len(indices_tarea), iguales,
+                      len(republicados_tarea), len(errores))
+
+    if trabajadores == 0:
+        for tarea in tareas:
+            recoger(_parsear_tarea(tarea))
+            if len(lotes.filas) >= tamano_lote:
+                lotes.volcar()
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            pendientes = set()
+            for tarea in tareas:
+                pendientes.add(pool.submit(_parsear_tarea, tarea))
+                if len(pendientes) >= trabajadores * 2:
+                    break
+
+            while pendientes:
+                terminadas, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    recoger(futuro.result())
+
+                    tarea = next(tareas, None)
+                    if tarea is not None:
+                        pendientes.add(pool.submit(_parsear_tarea, tarea))
+
+                if len(lotes.filas) >= tamano_lote:
+                    lotes.volcar()
+
+    totales = lotes.terminar()
+    segundos = medidor.segundos()
+    return dict(totales, **{
+        'archivos': medidor.archivos,
+        'filas': medidor.filas,
+        'indices': medidor.indices,
+        'iguales': medidor.iguales,
+        'republicados': medidor.republicados,
+        'errores': medidor.errores,
+        'trabajadores': trabajadores,
+        'segundos': round(segundos, 3),
+        'archivos_por_segundo': round(medidor.archivos / segundos, 1),
+        'filas_por_segundo': round(medidor.filas / segundos, 1)
+    })
+
+def ingestar_registros(registros, tamano_lote=TAMANO_LOTE, manager=None):
+    """
+    Carga un flujo de registros ('accion' | 'indice', tupla) de parser_bvc.iterar_dat o
+    iterar_registros consumiéndolo de a uno: en memoria nunca hay más de dos lotes,
+    sea cual sea el tamaño del origen. Mientras el escritor confirma un lote, se
+    parsea el siguiente. No pasa por ingest_manifest. Retorna totales y rendimiento.
+    """
+    if manager is None:
+        from sqlite_manager import sqlite_manager as manager
+
+    inicio = time.perf_counter()
+    lotes = _Lotes(manager)
+    filas = indices = 0
+    for tipo, fila in registros:
+        if tipo == 'accion':
+            lotes.filas.append(fila)
+            filas += 1
+            if len(lotes.filas) >= tamano_lote:
+                lotes.volcar()
+        else:
+            lotes.indices.append(fila)
+            indices += 1
+    totales = lotes.terminar()
+
+    segundos = max(time.perf_counter() - inicio, 1e-6)
+    return dict(totales, **{
+        'filas': filas,
+        'indices': indices,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos, 1)
+    })
+
+def ingestar_carpeta(carpeta="data_cache", trabajadores=None, todos=False, **opciones):
+    """
+    Carga los .dat nuevos o modificados de la carpeta según ingest_manifest (todos=True
+    los carga todos). Retorna el resultado de ingestar_archivos (con 'omitidos') o None
+    si no hay carpeta.
+    """
+    from sqlite_manager import sqlite_manager
+
+    if not os.path.exists(carpeta):
+        print(f"❌ Carpeta {carpeta} no encontrada")
+        return None
+
+    manifiesto = None if todos else sqlite_manager.obtener_manifiesto_ingesta()
+    entradas, omitidos = archivos_pendientes(carpeta, manifiesto)
+    print(f"📂 {len(entradas)} archivos .dat nuevos o modificados en {carpeta} ({omitidos} sin cambios)")
+    resultado = ingestar_archivos(entradas, trabajadores, manager=sqlite_manager, **opciones)
+    resultado['omitidos'] = omitidos
+    imprimir_resumen(resultado)
+    return resultado
+
+def imprimir_resumen(resultado):
+    procesos = f"{resultado['trabajadores']} procesos" if resultado['trabajadores'] else "este proceso"
+    print(f"🎉 Carga completada con {procesos} en {resultado['segundos']:.1f}s")
+    print(f"   • Archivos: {resultado['archivos']} ({resultado['archivos_por_segundo']:.0f}/s), "
+          f"republicados: {resultado['republicados']}, mismo contenido: {resultado['iguales']}, "
+          f"errores: {resultado['errores']}")
+    print(f"   • Acciones: {resultado['filas']} ({resultado['filas_por_segundo']:.0f}/s), "
+          f"índices: {resultado['indices']}")
+    print(f"   • Insertadas: {resultado['insertados']}, actualizadas: {resultado['actualizados']}, "
+          f"sin cambios: {resultado['sin_cambios']}")
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    carpeta = argumentos[0] if argumentos else "data_cache"
+    trabajadores = None
+    for argumento in sys.argv[1:]:
+        if argumento.startswith('--trabajadores='):
+            trabajadores = int(argumento.split('=', 1)[1])
+
+    if os.path.isfile(carpeta):
+        print(f"📦 Cargando {carpeta} como flujo...")
+        resultado = ingestar_registros(iterar_dat(carpeta, fuente='archivo_dat'))
+        print(f"🎉 {resultado['filas']} acciones ({resultado['filas_por_segundo']:.0f}/s) y "
+              f"{resultado['indices']} índices en {resultado['segundos']:.1f}s | "
+              f"insertadas: {resultado['insertados']}, actualizadas: {resultado['actualizados']}, "
+              f"sin cambios: {resultado['sin_cambios']}")
+    else:
+        ingestar_carpeta(carpeta, trabajadores, todos='--todos' in sys.argv)
+
+if __name__ == "__main__":
+    main()
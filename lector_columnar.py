@@ -0,0 +1,148 @@
+# lector_columnar.py - Lectura sin copias del histórico exportado en columnas
+# (exportador_columnar.py), para notebooks y procesos batch: nunca abre SQLite.
+#
+# Formato de cada tabla (database/columnar/<tabla>/):
+#   manifiesto.json  filas válidas, última fecha exportada y dtype de cada columna
+#   <columna>.bin    valores contiguos little-endian, una entrada por fila
+#   <columna>.json   diccionario de las columnas de texto (el .bin guarda el índice)
+# Las filas van ordenadas por fecha (y símbolo). El manifiesto se escribe al final de
+# cada exportación: lo que pase de 'filas' en un .bin todavía no existe para el lector.
+#
+# Uso:
+#   from lector_columnar import LectorColumnar
+#   acciones = LectorColumnar().tabla('acciones')
+#   acciones['hoy']                      # np.memmap de solo lectura
+#   acciones.rango(20240101, 20241231)    # vistas (sin copia) de las filas del año
+#   LectorColumnar().serie('BNC')         # columnas de un símbolo
+
+import json
+import os
+
+try:
+    import numpy as np
+    NUMPY_DISPONIBLE = True
+except ImportError:
+    NUMPY_DISPONIBLE = False
+    print("⚠️  numpy no disponible: no se pueden leer las exportaciones columnares")
+
+CARPETA_COLUMNAR = "database/columnar"
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+VERSION_FORMATO = 1
+
+def leer_manifiesto(carpeta_tabla):
+    """Manifiesto de una tabla exportada, o None si todavía no se exportó."""
+    ruta = os.path.join(carpeta_tabla, ARCHIVO_MANIFIESTO)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as archivo:
+        manifiesto = json.load(archivo)
+    if manifiesto.get('formato') != VERSION_FORMATO:
+        raise ValueError(f"Formato columnar no soportado en {carpeta_tabla}: {manifiesto.get('formato')}")
+    return manifiesto
+
+class TablaColumnar:
+    """
+    Una tabla exportada. t['col'] devuelve un np.memmap de solo lectura con las
+    filas del manifiesto (las columnas de texto devuelven los códigos del diccionario).
+    """
+
+    def __init__(self, carpeta_tabla):
+        self.carpeta = carpeta_tabla
+        manifiesto = leer_manifiesto(carpeta_tabla)
+        if manifiesto is None:
+            raise FileNotFoundError(f"No hay exportación columnar en {carpeta_tabla}")
+        self.nombre = manifiesto['tabla']
+        self.filas = manifiesto['filas']
+        self.ultima_fecha = manifiesto['ultima_fecha']
+        self.actualizado = manifiesto.get('actualizado')
+        self._tipos = {c['nombre']: c['dtype'] for c in manifiesto['columnas']}
+        self._con_diccionario = {c['nombre'] for c in manifiesto['columnas'] if c.get('diccionario')}
+        self._abiertas = {}
+        self._diccionarios = {}
+
+    @property
+    def columnas(self):
+        return list(self._tipos)
+
+    def __getitem__(self, columna):
+        datos = self._abiertas.get(columna)
+        if datos is None:
+            if columna not in self._tipos:
+                raise KeyError(columna)
+            tipo = np.dtype(self._tipos[columna])
+            if self.filas == 0:
+                datos = np.empty(0, dtype=tipo)  # mmap no admite longitud 0
+            else:
+                datos = np.memmap(os.path.join(self.carpeta, f"{columna}.bin"),
+                                  dtype=tipo, mode='r', shape=(self.filas,))
+            self._abiertas[columna] = datos
+        return datos
+
+    def __contains__(self, columna):
+        return columna in self._tipos
+
+    def __len__(self):
+        return self.filas
+
+    def diccionario(self, columna):
+        """Valores de una columna de texto; el código de cada fila es su posición."""
+        if columna not in self._con_diccionario:
+            raise KeyError(f"{columna} no es una columna de texto")
+        valores = self._diccionarios.get(columna)
+        if valores is None:
+            with open(os.path.join(self.carpeta, f"{columna}.json"), encoding='utf-8') as archivo:
+                valores = json.load(archivo)
+            self._diccionarios[columna] = valores
+        return valores
+
+    def codigo(self, columna, valor):
+        """Código de un valor de texto (-1 si no aparece)."""
+        try:
+            return self.diccionario(columna).index(valor)
+        except ValueError:
+            return -1
+
+    def texto(self, columna, codigos=None):
+        """Valores de texto de la columna (o de los códigos dados). Esto sí copia."""
+        codigos = self[columna] if codigos is None else codigos
+        return np.asarray(self.diccionario(columna), dtype=object)[codigos]
+
+    def rango(self, desde=None, hasta=None):
+        """Columnas de las filas con fecha en [desde, hasta] (YYYYMMDD): vistas, sin copia."""
+        fechas = self['fecha']
+        inicio = 0 if desde is None else int(np.searchsorted(fechas, int(desde), side='left'))
+        fin = self.filas if hasta is None else int(np.searchsorted(fechas, int(hasta), side='right'))
+        return {columna: self[columna][inicio:fin] for columna in self._tipos}
+
+    def __repr__(self):
+        return f"TablaColumnar({self.nombre!r}, filas={self.filas}, ultima_fecha={self.ultima_fecha})"
+
+class LectorColumnar:
+    """Acceso a todas las tablas exportadas en una carpeta."""
+
+    def __init__(self, carpeta=CARPETA_COLUMNAR):
+        self.carpeta = carpeta
+        self._tablas = {}
+
+    def tablas(self):
+        """Nombres de las tablas exportadas."""
+        if not os.path.isdir(self.carpeta):
+            return []
+        return sorted(nombre for nombre in os.listdir(self.carpeta)
+                      if os.path.exists(os.path.join(self.carpeta, nombre, ARCHIVO_MANIFIESTO)))
+
+    def tabla(self, nombre, recargar=False):
+        """
+        TablaColumnar de la tabla. Se conserva abierta: recargar=True relee el
+        manifiesto para ver las filas agregadas por una exportación posterior.
+        """
+        if recargar or nombre not in self._tablas:
+            self._tablas[nombre] = TablaColumnar(os.path.join(self.carpeta, nombre))
+        return self._tablas[nombre]
+
+    def serie(self, simbolo, desde=None, hasta=None):
+        """Columnas de 'acciones' de un símbolo, ordenadas por fecha (copia solo sus filas)."""
+        acciones = self.tabla('acciones')
+        columnas = acciones.rango(desde, hasta)
+        filtro = columnas['simbolo'] == acciones.codigo('simbolo', simbolo.upper())
+        return {columna: valores[filtro] for columna, valores in columnas.items()}
@@ -0,0 +1,265 @@
+# parser_bvc.py - Parser único del .dat diario de la BVC (líneas R| e IG|)
+# Usado por extractor.py (descarga), dat_parser.py (data_cache) e ingesta_paralela.py
+#
+# iterar_registros / iterar_dat generan los registros línea a línea desde cualquier
+# origen (.dat, .dat.gz, .zip con un .dat por día, archivo abierto o flujo HTTP): quien
+# los consume lote a lote (ingesta_paralela.ingestar_registros) mantiene la memoria plana.
+#
+# limpiar_numero decodifica los formatos habituales ('6.230,00', '1.250,5', '12') con una
+# expresión precompilada y str.translate, y memoriza los tokens (muy repetidos: '0,00',
+# precios que no cambian, etc.). Lo que no encaja en esos formatos pasa por el algoritmo
+# de siempre, así el resultado es idéntico para cualquier texto.
+
+import gzip
+import io
+import os
+import re
+import zipfile
+from array import array
+
+# Formatos rápidos: 1.234.567,89 / 1234,56 / 1234 (con signo opcional)
+_NUMERO_SIMPLE = re.compile(r'-?(?:\d{1,3}(?:\.\d{3})+,\d\d|\d+(?:,\d\d)?)')
+_A_DECIMAL = str.maketrans({'.': None, ',': '.'})
+_CEROS = frozenset(["-", "", "N/D", "0", "0,00", "0.00"])
+MAX_TOKENS_MEMORIA = 65536
+
+# Columnas de una fila de acciones (mismo orden que sqlite_manager.COLUMNAS_COTIZACION)
+COLUMNAS_ACCION = ('fecha', 'simbolo', 'nombre', 'anterior', 'hoy', 'diferencia_bs',
+                   'variacion', 'cantidad', 'monto', 'fuente')
+
+def _limpiar_numero_general(texto):
+    """Algoritmo original para los formatos poco comunes. ValueError si no es un número."""
+    # Eliminar símbolos de moneda y espacios
+    t = texto.strip().replace('Bs.', '').replace('bs.', '').replace('Bs', '').replace('$', '').strip()
+
+    # Si tiene formato con puntos y comas (1.250,50)
+    if "." in t and "," in t:
+        partes = t.split(",")
+        if len(partes[-1]) == 2:
+            t = t.replace(".", "").replace(",", ".")
+        else:
+            t = t.replace(",", "")
+    elif "," in t:
+        partes = t.split(",")
+        if len(partes[-1]) == 2:
+            t = t.replace(",", ".")
+        else:
+            t = t.replace(",", "")
+
+    t = ''.join(c for c in t if c.isdigit() or c in '.-')
+
+    if not t:
+        return 0.0
+
+    return float(t)
+
+def _decodificar(texto):
+    t = texto.strip()
+    if t in _CEROS:
+        return 0.0
+    if _NUMERO_SIMPLE.fullmatch(t):
+        resultado = float(t.translate(_A_DECIMAL))
+    else:
+        resultado = _limpiar_numero_general(texto)
+    if -0.0001 < resultado < 0.0001:
+        return 0.0
+    return resultado
+
+class _MemoriaTokens(dict):
+    """
+    token -> float. Un acierto es una búsqueda de dict; solo los fallos decodifican.
+    Un token que no es un número vale 0.0 y queda en invalidos / ultimo_invalido.
+    """
+
+    def __init__(self, max_tokens):
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.fallos = 0
+        self.invalidos = 0
+        self.ultimo_invalido = None
+
+    def __missing__(self, texto):
+        self.fallos += 1
+        if len(self) >= self.max_tokens:
+            self.clear()
+        try:
+            valor = _decodificar(texto)
+        except ValueError as e:
+            self.invalidos += 1
+            self.ultimo_invalido = f"Error limpiando número '{texto}': {e}"
+            valor = 0.0
+        self[texto] = valor
+        return valor
+
+_memoria = _MemoriaTokens(MAX_TOKENS_MEMORIA)
+
+def limpiar_numero(texto):
+    """Convierte '6.230,00' o '6230' a float 6230.0 correctamente."""
+    if not texto or not isinstance(texto, str):
+        return 0.0
+    return _memoria[texto]
+
+def iterar_registros(lineas, fecha, fuente='automatico'):
+    """
+    Genera los registros de un .dat línea a línea, desde cualquier iterable de líneas
+    (lista, archivo abierto, flujo HTTP): ('accion', tupla en el orden de
+    COLUMNAS_ACCION) o ('indice', (fecha, valor, variacion, fuente)).
+    """
+    numero = _memoria  # Acceso directo: los tokens de un .dat siempre son texto
+    for linea in lineas:
+        if not (linea.startswith('R|') or linea.startswith('IG|')):
+            linea = linea.strip()
+            if not (linea.startswith('R|') or linea.startswith('IG|')):
+                continue
+        partes = linea.split('|')
+
+        if partes[0] == 'R':
+            if len(partes) < 13:
+                continue
+            anterior = numero[partes[3]]
+            hoy = numero[partes[4]]
+
+            # Calcular diferencia y variación
+            if anterior > 0 and hoy > 0:
+                diferencia_bs = hoy - anterior
+                variacion = (diferencia_bs / anterior) * 100
+            else:
+                diferencia_bs = 0
+                variacion = 0.0
+
+            yield 'accion', (fecha, partes[2].strip(), partes[1].strip(), anterior, hoy,
+                             round(diferencia_bs, 4), round(variacion, 2),
+                             int(numero[partes[11]]), numero[partes[12]], fuente)
+        elif len(partes) >= 5:
+            yield 'indice', (fecha, numero[partes[2]], numero[partes[4]], fuente)
+
+def parsear_lineas(lineas, fecha, fuente='automatico'):
+    """(acciones, indice) como tuplas, consumiendo las líneas de a una. Vale la última línea IG|."""
+    acciones = []
+    agregar = acciones.append
+    indice = None
+    for tipo, fila in iterar_registros(lineas, fecha, fuente):
+        if tipo == 'accion':
+            agregar(fila)
+        else:
+            indice = fila
+    return acciones, indice
+
+def parsear_filas(texto, fecha, fuente='automatico'):
+    """
+    (acciones, indice) como tuplas listas para la ingesta masiva:
+    acciones en el orden de COLUMNAS_ACCION e indice (fecha, valor, variacion, fuente) o None.
+    """
+    return parsear_lineas(texto.split('\n'), fecha, fuente)
+
+def _como_diccionarios(filas, indice):
+    acciones = [{
+        'fecha': fecha,
+        'nombre': nombre,
+        'simbolo': simbolo,
+        'anterior': anterior,
+        'hoy': hoy,
+        'diferencia_bs': diferencia_bs,
+        'variacion': variacion,
+        'cantidad': cantidad,
+        'monto': monto,
+        'fuente': fuente
+    } for fecha, simbolo, nombre, anterior, hoy, diferencia_bs, variacion, cantidad, monto, fuente in filas]
+    if indice is not None:
+        indice = {'fecha': indice[0], 'valor': indice[1], 'variacion': indice[2], 'fuente': indice[3]}
+    return acciones, indice
+
+def parsear_dat(texto, fecha, fuente='automatico'):
+    """(acciones, indice) como diccionarios, el formato que usan las vistas y el extractor."""
+    return _como_diccionarios(*parsear_filas(texto, fecha, fuente))
+
+def parsear_dat_lineas(lineas, fecha, fuente='automatico'):
+    """Como parsear_dat, pero leyendo las líneas de a una (archivo abierto, flujo HTTP)."""
+    return _como_diccionarios(*parsear_lineas(lineas, fecha, fuente))
+
+# Tipo de cada columna numérica en parsear_columnas (array.array)
+_TIPOS_COLUMNA = {'anterior': 'd', 'hoy': 'd', 'diferencia_bs': 'd', 'variacion': 'd',
+                  'cantidad': 'q', 'monto': 'd'}
+
+def parsear_columnas(texto, fecha, fuente='automatico'):
+    """
+    (columnas, indice): las acciones por columna. Los valores numéricos van en
+    array.array ('d' reales, 'q' cantidad), que numpy lee sin copiar con np.frombuffer;
+    fecha, simbolo, nombre y fuente en listas.
+    """
+    filas, indice = parsear_filas(texto, fecha, fuente)
+    valores = list(zip(*filas)) if filas else [()] * len(COLUMNAS_ACCION)
+    columnas = {}
+    for columna, datos in zip(COLUMNAS_ACCION, valores):
+        tipo = _TIPOS_COLUMNA.get(columna)
+        columnas[columna] = array(tipo, datos) if tipo else list(datos)
+    return columnas, indice
+
+# ---------- Orígenes: .dat, .dat.gz, .zip y flujos ----------
+_NOMBRE_DAT = re.compile(r'(\d{8})\.dat(?:\.gz)?$', re.IGNORECASE)
+
+def fecha_de_nombre(nombre):
+    """'20240115.dat' / '20240115.dat.gz' (con cualquier carpeta o prefijo) -> '20240115' o None."""
+    coincidencia = _NOMBRE_DAT.search(nombre)
+    return coincidencia.group(1) if coincidencia else None
+
+def abrir_dat(origen, fecha=None, encoding='utf-8'):
+    """
+    Genera (fecha, líneas) por cada .dat del origen, sin leerlo entero a memoria:
+    ruta a un .dat, .dat.gz o .zip (p. ej. un mes, un .dat por día), archivo abierto
+    (binario o de texto) o iterable de líneas (response.iter_lines(decode_unicode=True)).
+    Las líneas se leen de a una y solo valen hasta pedir el siguiente .dat.
+    Un origen que no es una ruta necesita la fecha.
+    """
+    if isinstance(origen, (str, os.PathLike)):
+        ruta = os.fspath(origen)
+        if ruta.lower().endswith('.zip'):
+            with zipfile.ZipFile(ruta) as archivo:
+                for miembro in sorted(archivo.namelist()):
+                    fecha_miembro = fecha_de_nombre(miembro)
+                    if fecha_miembro is None:
+                        continue
+                    with archivo.open(miembro) as binario:
+                        if miembro.lower().endswith('.gz'):
+                            binario = gzip.GzipFile(fileobj=binario)
+                        yield fecha_miembro, io.TextIOWrapper(binario, encoding=encoding)
+            return
+        fecha = fecha or fecha_de_nombre(ruta)
+        if fecha is None:
+            raise ValueError(f"No se puede deducir la fecha de {ruta}")
+        abrir = gzip.open if ruta.lower().endswith('.gz') else open
+        with abrir(ruta, 'rt', encoding=encoding) as texto:
+            yield fecha, texto
+        return
+
+    if fecha is None:
+        raise ValueError("Hace falta la fecha para leer un flujo sin nombre de archivo")
+    if isinstance(origen, (io.RawIOBase, io.BufferedIOBase)) or hasattr(origen, 'readinto'):
+        texto = io.TextIOWrapper(origen, encoding=encoding)
+        try:
+            yield fecha, texto
+        finally:
+            texto.detach()  # El flujo lo cierra quien lo abrió
+    else:
+        yield fecha, origen
+
+def iterar_dat(origen, fecha=None, fuente='automatico', encoding='utf-8'):
+    """Registros de iterar_registros de todos los .dat del origen (ver abrir_dat), de a uno."""
+    for fecha_dat, lineas in abrir_dat(origen, fecha, encoding):
+        yield from iterar_registros(lineas, fecha_dat, fuente)
+
+def estadisticas_cache():
+    """Tamaño de la memoria de tokens, cuántos hubo que decodificar y cuántos no eran números."""
+    return {
+        'tokens': len(_memoria),
+        'max_tokens': _memoria.max_tokens,
+        'decodificados': _memoria.fallos,
+        'invalidos': _memoria.invalidos,
+        'ultimo_invalido': _memoria.ultimo_invalido
+    }
+
+def limpiar_cache():
+    _memoria.clear()
+    _memoria.fallos = 0
+    _memoria.invalidos = 0
+    _memoria.ultimo_invalido = None
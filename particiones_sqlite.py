@@ -0,0 +1,265 @@
+# particiones_sqlite.py - Años cerrados en archivos SQLite de solo lectura (uno por año)
+#
+# La base principal (caliente) guarda el año en curso y cualquier escritura nueva; cada
+# año archivado vive en database/particiones/bolsa_AAAA.db, compactado (VACUUM + ANALYZE)
+# y abierto con immutable=1: sin bloqueos, sin WAL y sin comprobar cambios.
+# Las conexiones de lectura lo adjuntan (ATTACH) al abrirse y crean vistas TEMP con los
+# mismos nombres de las tablas, así las consultas existentes leen todos los años sin
+# cambiar una línea de SQL. Si una fila existe en la base caliente y en una partición,
+# gana la caliente (p. ej. un dato manual cargado después de archivar el año); en las
+# tablas efectivas (con columna manual) gana antes el dato manual, esté donde esté: un
+# automático escrito en la caliente no tapa la corrección manual ya archivada.
+# cotizaciones lleva manual en la clave: la unión conserva las dos filas y las vistas
+# (cotizaciones_efectivas, acciones, datos_manuales), recreadas como TEMP, eligen.
+#
+# Uso: python particiones_sqlite.py listar | archivar <anio> | archivar-cerrados | desarchivar <anio>
+
+import glob
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PREFIJO_ARCHIVO = "bolsa_"
+LIMITE_ADJUNTOS = 10  # SQLITE_MAX_ATTACHED por defecto
+
+# Tablas base que se mueven a la partición: (columnas clave). Las derivadas
+# (indices_efectivos, estadísticas) las rellenan los triggers del esquema.
+# cotizaciones usa los mismos ids de diccionario en todos los archivos.
+TABLAS_BASE = {
+    'cotizaciones': ('fecha', 'simbolo_id', 'manual'),
+    'indices': ('fecha',),
+    'indices_manuales': ('fecha',),
+}
+
+# Tablas que las conexiones de lectura ven unidas (caliente + particiones)
+TABLAS_UNIDAS = dict(TABLAS_BASE, indices_efectivos=('fecha',))
+
+# Vistas de main que se recrean como TEMP con el mismo SQL: sus tablas sin esquema
+# pasan a leer las uniones TEMP de arriba (y los diccionarios, que solo crecen, de main)
+VISTAS_UNIDAS = ('cotizaciones_efectivas', 'acciones', 'datos_manuales')
+
+def carpeta_particiones(db_path):
+    """Carpeta de particiones junto a la base principal."""
+    return os.path.join(os.path.dirname(db_path) or '.', 'particiones')
+
+def ruta_particion(carpeta, anio):
+    return os.path.join(carpeta, f"{PREFIJO_ARCHIVO}{int(anio)}.db")
+
+def listar_particiones(carpeta):
+    """[(anio, ruta)] de las particiones existentes, de la más antigua a la más reciente."""
+    particiones = []
+    for ruta in glob.glob(os.path.join(carpeta, f"{PREFIJO_ARCHIVO}*.db")):
+        coincidencia = re.fullmatch(rf"{PREFIJO_ARCHIVO}(\d{{4}})\.db", os.path.basename(ruta))
+        if coincidencia:
+            particiones.append((int(coincidencia.group(1)), ruta))
+    return sorted(particiones)
+
+def _uri_particion(ruta):
+    """URI de solo lectura de una partición (immutable: sin bloqueos ni journal)."""
+    return f"{Path(ruta).resolve().as_uri()}?mode=ro&immutable=1"
+
+def _abrir_particion(ruta):
+    return sqlite3.connect(_uri_particion(ruta), uri=True)
+
+def _columnas(conn, tabla, esquema='main', excluir=('id',)):
+    return [fila[1] for fila in conn.execute(f"PRAGMA {esquema}.table_info({tabla})")
+            if fila[1] not in excluir]
+
+def _rango_anio(anio):
+    return f"{anio}0101", f"{anio}1231"
+
+# ========== LECTURA: ATTACH + VISTAS TEMP ==========
+
+def _sql_union(tabla, claves, columnas, esquemas):
+    """
+    Vista: filas de main y de cada partición. Con la misma clave gana main, salvo
+    en las tablas con columna manual fuera de la clave, donde primero gana la fila manual.
+    """
+    def coinciden(a, b):
+        return ' AND '.join(f"{a}.{c} = {b}.{c}" for c in claves)
+
+    manual = 'manual' in columnas and 'manual' not in claves
+    # main pierde solo ante una fila manual de una partición que tape su automática;
+    # cada partición es un año (p<anio>): fuera de ese año no hace falta buscar
+    fecha = next(c for c in claves if c.startswith('fecha'))
+    tapadas = [f"(h.{fecha} NOT BETWEEN {' AND '.join(_rango_anio(esquema[1:]))}\n"
+               f"         OR NOT EXISTS (SELECT 1 FROM {esquema}.{tabla} x WHERE {coinciden('x', 'h')} AND x.manual > h.manual))"
+               for esquema in esquemas] if manual else []
+    partes = [f"SELECT {', '.join(f'h.{c}' for c in columnas)} FROM main.{tabla} h"
+              + ''.join(f"\n    {'WHERE' if i == 0 else 'AND'} {condicion}" for i, condicion in enumerate(tapadas))]
+    gana_main = ' AND h.manual >= x.manual' if manual else ''
+    for esquema in esquemas:
+        partes.append(f"SELECT {', '.join(f'x.{c}' for c in columnas)} FROM {esquema}.{tabla} x\n"
+                      f"    WHERE NOT EXISTS (SELECT 1 FROM main.{tabla} h WHERE {coinciden('h', 'x')}{gana_main})")
+    return f"CREATE TEMP VIEW {tabla} AS\n" + "\nUNION ALL\n".join(partes)
+
+def _sql_estadisticas(esquemas):
+    """Contadores sumados entre archivos (una fila sobrescrita en main cuenta dos veces)."""
+    todos = ['main'] + list(esquemas)
+    fechas = "\nUNION ALL\n".join(f"SELECT tabla, fecha, filas FROM {e}.estadisticas_fechas" for e in todos)
+    tablas = "\nUNION ALL\n".join(f"SELECT tabla, filas FROM {e}.estadisticas_tablas" for e in todos)
+    return [
+        f"CREATE TEMP VIEW estadisticas_fechas AS\n"
+        f"SELECT tabla, fecha, SUM(filas) AS filas FROM (\n{fechas}\n) GROUP BY tabla, fecha",
+        f"CREATE TEMP VIEW estadisticas_tablas AS\n"
+        f"SELECT t.tabla AS tabla, SUM(t.filas) AS filas,\n"
+        f"       (SELECT COUNT(*) FROM temp.estadisticas_fechas f WHERE f.tabla = t.tabla) AS fechas\n"
+        f"FROM (\n{tablas}\n) t GROUP BY t.tabla",
+    ]
+
+def adjuntar_particiones(conn, particiones):
+    """
+    Adjunta las particiones [(anio, ruta)] como p<anio> y crea las vistas TEMP que
+    unen cada tabla con sus particiones. Se llama una vez por conexión de lectura.
+    """
+    if not particiones:
+        return
+    if len(particiones) > LIMITE_ADJUNTOS:
+        print(f"⚠️  {len(particiones)} particiones: solo se adjuntan las {LIMITE_ADJUNTOS} más recientes")
+        particiones = particiones[-LIMITE_ADJUNTOS:]
+
+    esquemas = []
+    for anio, ruta in particiones:
+        esquema = f"p{anio}"
+        conn.execute(f"ATTACH DATABASE ? AS {esquema}", (_uri_particion(ruta),))
+        esquemas.append(esquema)
+
+    # Las vistas TEMP son una escritura (en memoria): query_only se levanta solo para crearlas
+    solo_consulta = conn.execute("PRAGMA query_only").fetchone()[0]
+    conn.execute("PRAGMA query_only=0")
+    try:
+        for tabla, claves in TABLAS_UNIDAS.items():
+            conn.execute(_sql_union(tabla, claves, _columnas(conn, tabla, excluir=()), esquemas))
+        for vista in VISTAS_UNIDAS:
+            (sql,) = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'view' AND name = ?",
+                                  (vista,)).fetchone()
+            conn.execute(re.sub(r'^CREATE\s+VIEW\s+(IF\s+NOT\s+EXISTS\s+)?', 'CREATE TEMP VIEW ', sql,
+                                flags=re.IGNORECASE))
+        for sentencia in _sql_estadisticas(esquemas):
+            conn.execute(sentencia)
+    finally:
+        conn.execute(f"PRAGMA query_only={solo_consulta}")
+
+# ========== ESCRITURA: CONSTRUIR / BORRAR / RESTAURAR ==========
+
+def construir_particion(conn, anio, carpeta, crear_esquema):
+    """
+    Escribe la partición del año con las filas de conn (base principal) y, si ya
+    existía, las de la partición anterior (gana conn). Se construye en un .tmp y se
+    reemplaza atómicamente: los lectores con el archivo viejo abierto no se enteran.
+    crear_esquema(conn) crea tablas, triggers y migraciones (el de SQLiteManager).
+    Retorna (ruta, filas por tabla).
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    destino = ruta_particion(carpeta, anio)
+    temporal = destino + '.tmp'
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    desde, hasta = _rango_anio(anio)
+    anterior = _abrir_particion(destino) if os.path.exists(destino) else None
+    nueva = sqlite3.connect(temporal)
+    filas = {}
+    try:
+        crear_esquema(nueva)
+
+        # Diccionarios completos con los mismos ids: cotizaciones se compara por simbolo_id
+        for tabla in ('simbolos', 'nombres'):
+            columnas = _columnas(conn, tabla, excluir=())
+            nueva.executemany(
+                f"INSERT OR IGNORE INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                conn.execute(f"SELECT {', '.join(columnas)} FROM main.{tabla} ORDER BY id"))
+
+        # cotizaciones.fecha es INTEGER: la afinidad de la columna convierte los límites
+        for tabla, claves in TABLAS_BASE.items():
+            columnas = _columnas(conn, tabla)
+            posiciones = [columnas.index(c) for c in claves]
+            consulta = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE fecha BETWEEN ? AND ?"
+            por_clave = {}
+            origenes = ([anterior] if anterior is not None else []) + [conn]
+            for origen in origenes:
+                for fila in origen.execute(consulta, (desde, hasta)):
+                    por_clave[tuple(fila[p] for p in posiciones)] = fila
+            # Los triggers del esquema derivan indices_efectivos y estadísticas
+            nueva.executemany(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                sorted(por_clave.values(), key=lambda f: tuple(f[p] for p in posiciones)))
+            filas[tabla] = len(por_clave)
+        nueva.commit()
+
+        nueva.execute("ANALYZE")
+        nueva.commit()
+        nueva.execute("VACUUM")
+    finally:
+        nueva.close()
+        if anterior is not None:
+            anterior.close()
+
+    os.replace(temporal, destino)
+    return destino, filas
+
+def borrar_anio(conn, anio):
+    """Trabajo de escritura: quita el año de la base principal (ya copiado a su partición)."""
+    desde, hasta = _rango_anio(anio)
+    borradas = 0
+    # Manuales primero: al borrarlos los triggers restauran el automático, que se borra después
+    for tabla in ('indices_manuales', 'indices'):
+        borradas += conn.execute(f"DELETE FROM {tabla} WHERE fecha BETWEEN ? AND ?", (desde, hasta)).rowcount
+    borradas += conn.execute("DELETE FROM cotizaciones WHERE fecha BETWEEN ? AND ?",
+                             (int(desde), int(hasta))).rowcount
+    conn.execute("DELETE FROM indices_efectivos WHERE fecha BETWEEN ? AND ?", (desde, hasta))
+    return borradas
+
+def restaurar_particion(conn, ruta):
+    """Trabajo de escritura: copia las filas de la partición a la base principal (gana la principal)."""
+    particion = _abrir_particion(ruta)
+    restauradas = 0
+    try:
+        # Diccionarios primero: los ids de la partición vienen de main, que solo crece
+        for tabla in ('simbolos', 'nombres'):
+            conn.executemany(f"INSERT OR IGNORE INTO {tabla} (id, {tabla[:-1]}) VALUES (?, ?)",
+                             particion.execute(f"SELECT id, {tabla[:-1]} FROM {tabla}"))
+        for tabla in TABLAS_BASE:
+            columnas = _columnas(particion, tabla)
+            lista = ', '.join(columnas)
+            cursor = conn.executemany(
+                f"INSERT OR IGNORE INTO {tabla} ({lista}) VALUES ({', '.join('?' * len(columnas))})",
+                particion.execute(f"SELECT {lista} FROM {tabla}"))
+            restauradas += cursor.rowcount
+    finally:
+        particion.close()
+    return restauradas
+
+def anios_cerrados(conn):
+    """Años anteriores al año en curso que todavía tienen filas en la base principal."""
+    actual = datetime.now().year
+    return [int(anio) for (anio,) in conn.execute(
+        "SELECT DISTINCT fecha / 10000 FROM main.cotizaciones WHERE fecha < ? "
+        "UNION SELECT DISTINCT CAST(substr(fecha, 1, 4) AS INTEGER) FROM main.indices WHERE fecha < ? ORDER BY 1",
+        (actual * 10000 + 101, f"{actual}0101"))]
+
+def main():
+    from sqlite_manager import sqlite_manager
+
+    orden = sys.argv[1] if len(sys.argv) > 1 else 'listar'
+    if orden == 'archivar' and len(sys.argv) > 2:
+        print(sqlite_manager.archivar_anio(int(sys.argv[2])))
+    elif orden == 'archivar-cerrados':
+        with sqlite_manager.pool.conexion() as conn:
+            anios = anios_cerrados(conn)
+        for anio in anios:
+            print(sqlite_manager.archivar_anio(anio))
+    elif orden == 'desarchivar' and len(sys.argv) > 2:
+        print(sqlite_manager.desarchivar_anio(int(sys.argv[2])))
+    elif orden == 'listar':
+        for particion in sqlite_manager.estadisticas()['particiones']:
+            print(f"📦 {particion['anio']}: {particion['archivo']} ({particion['mb']:.2f} MB)")
+    else:
+        print("Uso: python particiones_sqlite.py listar | archivar <anio> | "
+              "archivar-cerrados | desarchivar <anio>")
+
+if __name__ == "__main__":
+    main()
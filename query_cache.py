@@ -3,125 +3,113 @@ import hashlib
 import json
 from datetime import datetime, timedelta
 import time
+from cache_lru import CacheLRU
 
 class QueryCache:
-    def __init__(self):
-        self.query_cache = {}  # {hash: resultado}
-        self.max_cache_size = 100  # Máximo 100 consultas en caché
-        self.cache_hits = 0
-        self.cache_misses = 0
+    def __init__(self, max_cache_size=100, max_bytes=64 * 1024 * 1024, ttl=24 * 3600):
+        # LRU con límite de 100 consultas / 64 MB. Las escrituras invalidan con
+        # precisión (invalidar_cambios), así que el TTL puede ser de 24 horas
+        self.query_cache = CacheLRU('consultas', max_entradas=max_cache_size,
+                                    max_bytes=max_bytes, ttl=ttl)
+        self.max_cache_size = max_cache_size
+        
+    @property
+    def cache_hits(self):
+        return self.query_cache.aciertos
+    
+    @property
+    def cache_misses(self):
+        return self.query_cache.fallos
+        
+    @staticmethod
+    def _normalizar_fecha(fecha):
+        """'2025-01-31' o '20250131' -> '20250131' (formato de SQLite)."""
+        return str(fecha).replace('-', '')
+        
+    def _rango(self, fecha_desde, fecha_hasta):
+        """(desde, hasta) normalizados y en orden: un rango invertido es el mismo rango."""
+        return tuple(sorted((self._normalizar_fecha(fecha_desde), self._normalizar_fecha(fecha_hasta))))
         
     def _generate_hash(self, simbolo, fecha_desde, fecha_hasta):
         """Genera un hash único para la consulta."""
-        key = f"{simbolo.upper()}_{fecha_desde}_{fecha_hasta}"
+        desde, hasta = self._rango(fecha_desde, fecha_hasta)
+        key = f"{simbolo.upper()}_{desde}_{hasta}"
         return hashlib.md5(key.encode()).hexdigest()
     
     def get_cached_query(self, simbolo, fecha_desde, fecha_hasta):
-        """Obtiene consulta del caché si existe."""
+        """Obtiene consulta del caché si existe (y no ha expirado)."""
         query_hash = self._generate_hash(simbolo, fecha_desde, fecha_hasta)
-        
-        if query_hash in self.query_cache:
-            # Verificar si el caché no ha expirado (1 hora)
-            cache_entry = self.query_cache[query_hash]
-            cache_time = cache_entry['timestamp']
-            current_time = datetime.now()
-            
-            if (current_time - cache_time).total_seconds() < 3600:  # 1 hora
-                self.cache_hits += 1
-                cache_entry['hits'] = cache_entry.get('hits', 0) + 1
-                cache_entry['last_accessed'] = datetime.now()
-                
-                print(f"⚡ CONSULTA CACHEADA: {simbolo} ({fecha_desde} a {fecha_hasta})")
-                print(f"   📊 {len(cache_entry['data'])} registros, Hits: {cache_entry['hits']}")
-                
-                return cache_entry['data']
-        
-        self.cache_misses += 1
-        return None
+        cache_entry = self.query_cache.obtener(query_hash)
+        return cache_entry['data'] if cache_entry is not None else None
     
     def cache_query(self, simbolo, fecha_desde, fecha_hasta, data):
-        """Guarda una consulta en el caché."""
+        """Guarda una consulta en el caché (la LRU expulsa la menos usada)."""
         if not data:
             return
         
         query_hash = self._generate_hash(simbolo, fecha_desde, fecha_hasta)
-        
-        # Limpiar caché si es muy grande
-        if len(self.query_cache) >= self.max_cache_size:
-            # Eliminar el menos usado o más antiguo
-            oldest_key = min(self.query_cache.keys(), 
-                           key=lambda k: self.query_cache[k].get('last_accessed', 
-                                                                self.query_cache[k]['timestamp']))
-            removed = self.query_cache.pop(oldest_key)
-            print(f"🗑️  Caché eliminado: {removed.get('simbolo')} ({removed.get('hits', 0)} hits)")
-        
-        # Guardar en caché
-        self.query_cache[query_hash] = {
+        desde, hasta = self._rango(fecha_desde, fecha_hasta)
+        self.query_cache.guardar(query_hash, {
             'timestamp': datetime.now(),
-            'last_accessed': datetime.now(),
             'data': data,
             'simbolo': simbolo.upper(),
             'fecha_desde': fecha_desde,
             'fecha_hasta': fecha_hasta,
-            'count': len(data),
-            'hits': 0
-        }
-        
-        print(f"💾 Consulta guardada en caché: {simbolo} ({len(data)} registros)")
+            'count': len(data)
+        }, simbolo=simbolo.upper(), desde=desde, hasta=hasta)
+    
+    def invalidar_cambios(self, cambios):
+        """
+        Suscriptor de sqlite_manager: elimina solo las consultas cuyo símbolo y
+        rango cubren alguna fecha modificada. cambios: {fecha: {simbolos} o None}
+        """
+        for fecha, simbolos in cambios.items():
+            self.query_cache.invalidar(fecha, simbolos)
     
     def clear_query_cache(self):
         """Limpia el caché de consultas."""
-        cleared = len(self.query_cache)
-        self.query_cache.clear()
+        cleared = self.query_cache.limpiar()
         print(f"🧹 Caché de consultas limpiado ({cleared} consultas eliminadas)")
     
     def get_cache_stats(self):
         """Obtiene estadísticas del caché de consultas."""
-        total_hits = sum(q.get('hits', 0) for q in self.query_cache.values())
+        entradas = self.query_cache.entradas()
+        stats = self.query_cache.estadisticas()
         
         return {
-            'total_queries_cached': len(self.query_cache),
-            'cache_hits': self.cache_hits,
-            'cache_misses': self.cache_misses,
-            'total_hits_all_queries': total_hits,
-            'hit_rate': self.cache_hits / (self.cache_hits + self.cache_misses) 
-                        if (self.cache_hits + self.cache_misses) > 0 else 0,
-            'most_frequent': self._get_most_frequent(),
-            'recent_queries': self._get_recent_queries()
+            'total_queries_cached': stats['entradas'],
+            'cache_hits': stats['aciertos'],
+            'cache_misses': stats['fallos'],
+            'total_hits_all_queries': sum(hits for _, _, hits, _ in entradas),
+            'hit_rate': stats['tasa_aciertos'],
+            'evictions': stats['expulsiones'],
+            'expired': stats['expiradas'],
+            'invalidated': stats['invalidaciones'],
+            'bytes': stats['bytes'],
+            'most_frequent': self._get_most_frequent(entradas),
+            'recent_queries': self._get_recent_queries(entradas)
         }
     
-    def _get_most_frequent(self):
+    def _get_most_frequent(self, entradas):
         """Obtiene las consultas más frecuentes."""
-        if not self.query_cache:
-            return []
-        
-        sorted_queries = sorted(self.query_cache.items(), 
-                               key=lambda x: x[1].get('hits', 0), 
-                               reverse=True)[:5]
+        sorted_queries = sorted(entradas, key=lambda e: e[2], reverse=True)[:5]
         
         return [{
-            'simbolo': q[1]['simbolo'],
-            'periodo': f"{q[1]['fecha_desde']} a {q[1]['fecha_hasta']}",
-            'hits': q[1].get('hits', 0),
-            'count': q[1]['count'],
-            'last_accessed': q[1]['last_accessed'].strftime('%H:%M:%S')
-        } for q in sorted_queries]
+            'simbolo': q['simbolo'],
+            'periodo': f"{q['fecha_desde']} a {q['fecha_hasta']}",
+            'hits': hits,
+            'count': q['count'],
+            'last_accessed': datetime.fromtimestamp(ultimo).strftime('%H:%M:%S')
+        } for _, q, hits, ultimo in sorted_queries]
     
-    def _get_recent_queries(self):
-        """Obtiene las consultas recientes."""
-        if not self.query_cache:
-            return []
-        
-        sorted_queries = sorted(self.query_cache.items(), 
-                               key=lambda x: x[1]['last_accessed'], 
-                               reverse=True)[:5]
-        
+    def _get_recent_queries(self, entradas):
+        """Obtiene las consultas recientes (el orden LRU ya las tiene ordenadas)."""
         return [{
-            'simbolo': q[1]['simbolo'],
-            'periodo': f"{q[1]['fecha_desde']} a {q[1]['fecha_hasta']}",
-            'last_accessed': q[1]['last_accessed'].strftime('%H:%M:%S'),
-            'hits': q[1].get('hits', 0)
-        } for q in sorted_queries]
+            'simbolo': q['simbolo'],
+            'periodo': f"{q['fecha_desde']} a {q['fecha_hasta']}",
+            'last_accessed': datetime.fromtimestamp(ultimo).strftime('%H:%M:%S'),
+            'hits': hits
+        } for _, q, hits, ultimo in reversed(entradas[-5:])]
 
 # Instancia global
 query_cache = QueryCache()
\ No newline at end of file
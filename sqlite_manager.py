@@ -1,11 +1,607 @@
 
 # sqlite_manager.py - Gestor de base de datos SQLite optimizado
 
-import sqlite3
 import os
 from datetime import datetime, timedelta
 import threading
 import time
+from sqlite_pool import PoolConexiones, EscritorSQLite, abrir_conexion, PRAGMAS_POR_DEFECTO
+from cache_lru import CacheLRU
+from almacen_columnar import AlmacenPrecios, NUMPY_DISPONIBLE
+from cotizacion import Cotizacion, CotizacionHistorica
+import particiones_sqlite
+
+# Columnas de una cotización (mismo orden en acciones y datos_manuales)
+COLUMNAS_COTIZACION = ('fecha', 'simbolo', 'nombre', 'anterior', 'hoy', 'diferencia_bs',
+                       'variacion', 'cantidad', 'monto', 'fuente')
+COLUMNAS_INDICE = ('fecha', 'valor', 'variacion', 'fuente')
+
+def _tupla_cotizacion(accion, fecha_str=None, fuente=None):
+    """Convierte un diccionario de acción en la tupla de COLUMNAS_COTIZACION."""
+    return (
+        fecha_str or accion.get('fecha', ''),
+        accion.get('simbolo', ''),
+        accion.get('nombre', ''),
+        accion.get('anterior', 0),
+        accion.get('hoy', 0),
+        accion.get('diferencia_bs', 0),
+        accion.get('variacion', 0),
+        accion.get('cantidad', 0),
+        accion.get('monto', 0),
+        fuente or accion.get('fuente', 'automatico')
+    )
+
+def _upsert_cotizaciones(conn, tabla, tuplas):
+    """
+    Trabajo de escritura: carga masiva con executemany + UPSERT sobre cotizaciones
+    (tabla 'acciones' -> manual = 0, 'datos_manuales' -> manual = 1).
+    Las filas pasan por una tabla temporal para poder contar cuántas son nuevas,
+    cuántas cambian y cuántas ya estaban iguales; solo se reescriben las que cambian
+    (ON CONFLICT ... DO UPDATE ... WHERE), así la clave y los índices no se tocan.
+    Retorna {'insertados', 'actualizados', 'sin_cambios', 'fechas', 'cambios'}, donde
+    'cambios' es {fecha: {simbolos}} solo de las filas nuevas o modificadas.
+    """
+    manual = 1 if tabla == 'datos_manuales' else 0
+    columnas = ', '.join(COLUMNAS_COTIZACION)
+    distinto = ' OR '.join(f"t.{c} IS NOT s.{c}" for c in ('nombre_id',) + _COLUMNAS_VALORES)
+    
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS ingesta_cotizaciones (
+            fecha TEXT, simbolo TEXT, nombre TEXT, anterior REAL, hoy REAL,
+            diferencia_bs REAL, variacion REAL, cantidad INTEGER, monto REAL, fuente TEXT,
+            PRIMARY KEY (fecha, simbolo)
+        )
+    ''')
+    conn.execute('DELETE FROM temp.ingesta_cotizaciones')
+    # Si una (fecha, simbolo) viene repetida gana la última, igual que antes
+    conn.executemany(f'''
+        INSERT OR REPLACE INTO temp.ingesta_cotizaciones ({columnas})
+        VALUES ({', '.join('?' * len(COLUMNAS_COTIZACION))})
+    ''', tuplas)
+    
+    total = conn.execute('SELECT COUNT(*) FROM temp.ingesta_cotizaciones').fetchone()[0]
+    
+    # Símbolos y nombres que todavía no están en los diccionarios
+    conn.execute('''
+        INSERT INTO simbolos (simbolo)
+        SELECT DISTINCT simbolo FROM temp.ingesta_cotizaciones i
+        WHERE NOT EXISTS (SELECT 1 FROM simbolos WHERE simbolo = i.simbolo)
+        ORDER BY simbolo
+    ''')
+    conn.execute('''
+        INSERT INTO nombres (nombre)
+        SELECT DISTINCT nombre FROM temp.ingesta_cotizaciones i
+        WHERE NOT EXISTS (SELECT 1 FROM nombres WHERE nombre = i.nombre)
+        ORDER BY nombre
+    ''')
+    
+    # Las filas de la ingesta con las claves de cotizaciones
+    filas = f'''
+        SELECT CAST(i.fecha AS INTEGER) AS fecha, si.id AS simbolo_id, {manual} AS manual,
+               n.id AS nombre_id, {', '.join(f'i.{c} AS {c}' for c in _COLUMNAS_VALORES)},
+               i.fecha AS fecha_texto, i.simbolo AS simbolo
+        FROM temp.ingesta_cotizaciones i
+        JOIN simbolos si ON si.simbolo = i.simbolo
+        JOIN nombres n ON n.nombre = i.nombre
+    '''
+    
+    # Filas nuevas o distintas: determinan los conteos y qué cachés invalidar
+    cambios = {}
+    insertados = actualizados = 0
+    for fecha, simbolo, es_nueva in conn.execute(f'''
+        SELECT s.fecha_texto, s.simbolo, t.fecha IS NULL
+        FROM ({filas}) s
+        LEFT JOIN cotizaciones t
+               ON t.fecha = s.fecha AND t.simbolo_id = s.simbolo_id AND t.manual = s.manual
+        WHERE t.fecha IS NULL OR {distinto}
+    '''):
+        cambios.setdefault(fecha, set()).add(simbolo)
+        if es_nueva:
+            insertados += 1
+        else:
+            actualizados += 1
+    
+    datos = ('nombre_id',) + _COLUMNAS_VALORES
+    conn.execute(f'''
+        INSERT INTO cotizaciones ({_LISTA_COTIZACION})
+        SELECT {_LISTA_COTIZACION} FROM ({filas}) WHERE true
+        ON CONFLICT(fecha, simbolo_id, manual) DO UPDATE SET
+            {', '.join(f"{c} = excluded.{c}" for c in datos)}
+        WHERE {' OR '.join(f"cotizaciones.{c} IS NOT excluded.{c}" for c in datos)}
+    ''')
+    
+    conn.execute('DELETE FROM temp.ingesta_cotizaciones')
+    
+    return {
+        'insertados': insertados,
+        'actualizados': actualizados,
+        'sin_cambios': total - insertados - actualizados,
+        'fechas': sorted(cambios),
+        'cambios': cambios
+    }
+
+def _upsert_indices(conn, tabla, tuplas):
+    """Trabajo de escritura: UPSERT masivo de índices (una fila por fecha)."""
+    conn.executemany(f'''
+        INSERT INTO {tabla} ({', '.join(COLUMNAS_INDICE)})
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(fecha) DO UPDATE SET
+            valor = excluded.valor,
+            variacion = excluded.variacion,
+            fuente = excluded.fuente
+        WHERE {tabla}.valor IS NOT excluded.valor
+           OR {tabla}.variacion IS NOT excluded.variacion
+           OR {tabla}.fuente IS NOT excluded.fuente
+    ''', tuplas)
+
+# Archivos .dat ya cargados: la ingesta compara tamaño y mtime (y si cambian, el hash)
+# contra esta tabla y solo vuelve a leer los archivos nuevos o republicados.
+COLUMNAS_MANIFIESTO = ('archivo', 'tamano', 'mtime_ns', 'hash', 'filas', 'cargado')
+
+ESQUEMA_MANIFIESTO = '''
+CREATE TABLE IF NOT EXISTS ingest_manifest (
+    archivo TEXT PRIMARY KEY,
+    tamano INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    filas INTEGER NOT NULL DEFAULT 0,
+    cargado TEXT NOT NULL
+) WITHOUT ROWID
+'''
+
+def _quitar_filas_sobrantes(conn, filas, fechas):
+    """
+    Trabajo de escritura: para cada fecha de un archivo republicado, borra las
+    cotizaciones automáticas de los símbolos que ya no trae. Retorna {fecha: None} de
+    las fechas que cambiaron.
+    """
+    por_fecha = {fecha: set() for fecha in fechas}
+    for fila in filas:
+        if fila[0] in por_fecha:
+            por_fecha[fila[0]].add(fila[1])
+    cambios = {}
+    for fecha, simbolos in por_fecha.items():
+        sobrantes = [(int(fecha), simbolo_id) for simbolo_id, simbolo in conn.execute('''
+            SELECT c.simbolo_id, s.simbolo FROM cotizaciones c
+            JOIN simbolos s ON s.id = c.simbolo_id
+            WHERE c.fecha = ? AND c.manual = 0
+        ''', (int(fecha),)) if simbolo not in simbolos]
+        if sobrantes:
+            conn.executemany(
+                'DELETE FROM cotizaciones WHERE fecha = ? AND simbolo_id = ? AND manual = 0', sobrantes)
+            cambios[fecha] = None
+    return cambios
+
+def _ingestar_lote(conn, filas, indices, manifiesto=(), republicados=()):
+    """
+    Trabajo de escritura: cotizaciones, índices y filas de ingest_manifest de un lote de
+    archivos en la misma transacción (un archivo queda registrado solo con sus filas).
+    republicados: fechas de archivos que cambiaron desde la última carga.
+    """
+    sobrantes = _quitar_filas_sobrantes(conn, filas, republicados) if republicados else {}
+    resultado = _upsert_cotizaciones(conn, 'acciones', filas)
+    if indices:
+        _upsert_indices(conn, 'indices', indices)
+    if manifiesto:
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO ingest_manifest ({', '.join(COLUMNAS_MANIFIESTO)})
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', manifiesto)
+    if sobrantes:
+        resultado['cambios'].update(sobrantes)
+        resultado['fechas'] = sorted(resultado['cambios'])
+    return resultado
+
+def _migracion_3_manifiesto_ingesta(conn):
+    """v3: ingest_manifest con los archivos .dat ya cargados."""
+    conn.execute(ESQUEMA_MANIFIESTO)
+
+# Tablas materializadas con UNA fila por fecha / (fecha, simbolo), aplicando la
+# regla "el dato manual gana al automático". Las mantienen los triggers, así que
+# cualquier escritura (app, scripts o migraciones) las deja al día.
+ESQUEMA_EFECTIVAS = '''
+CREATE TABLE IF NOT EXISTS indices_efectivos (
+    fecha TEXT PRIMARY KEY,
+    valor REAL,
+    variacion REAL,
+    fuente TEXT,
+    manual INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_ai AFTER INSERT ON indices
+WHEN NOT EXISTS (SELECT 1 FROM indices_manuales WHERE fecha = NEW.fecha)
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = NEW.fecha;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    VALUES (NEW.fecha, NEW.valor, NEW.variacion, NEW.fuente, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_au AFTER UPDATE ON indices
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = OLD.fecha AND manual = 0;
+    DELETE FROM indices_efectivos WHERE fecha = NEW.fecha AND manual = 0;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    SELECT NEW.fecha, NEW.valor, NEW.variacion, NEW.fuente, 0
+    WHERE NOT EXISTS (SELECT 1 FROM indices_manuales WHERE fecha = NEW.fecha);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_ad AFTER DELETE ON indices
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = OLD.fecha AND manual = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_manuales_ai AFTER INSERT ON indices_manuales
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = NEW.fecha;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    VALUES (NEW.fecha, NEW.valor, NEW.variacion, NEW.fuente, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_manuales_au AFTER UPDATE ON indices_manuales
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = OLD.fecha;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    SELECT fecha, valor, variacion, fuente, 0 FROM indices WHERE fecha = OLD.fecha;
+    DELETE FROM indices_efectivos WHERE fecha = NEW.fecha;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    VALUES (NEW.fecha, NEW.valor, NEW.variacion, NEW.fuente, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indices_manuales_ad AFTER DELETE ON indices_manuales
+BEGIN
+    DELETE FROM indices_efectivos WHERE fecha = OLD.fecha;
+    INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+    SELECT fecha, valor, variacion, fuente, 0 FROM indices WHERE fecha = OLD.fecha;
+END;
+'''
+
+# ========== ESQUEMA COMPACTO DE COTIZACIONES (migración v1) ==========
+# Una sola copia de cada cotización: automáticas (manual = 0) y manuales (manual = 1)
+# en cotizaciones, WITHOUT ROWID agrupada por (fecha, simbolo_id, manual), con fechas
+# enteras YYYYMMDD y diccionarios de símbolos y nombres. La consulta por fecha (la más
+# frecuente) lee un tramo contiguo de la tabla: la clave primaria es su índice cubriente.
+# idx_cotizaciones_simbolo sirve los históricos de un símbolo.
+# acciones y datos_manuales son vistas con las columnas de antes (fecha TEXT: CAST basta,
+# YYYYMMDD siempre tiene 8 dígitos) más fecha_num para filtrar por la clave;
+# cotizaciones_efectivas toma la fila manual cuando existe. Las escrituras de la app van directo a cotizaciones (_upsert_cotizaciones); los
+# triggers INSTEAD OF atienden a los scripts que todavía escriben en las vistas.
+
+# Columnas de valores de una cotización (todas menos fecha, simbolo y nombre)
+_COLUMNAS_VALORES = ('anterior', 'hoy', 'diferencia_bs', 'variacion', 'cantidad', 'monto', 'fuente')
+_LISTA_COTIZACION = 'fecha, simbolo_id, manual, nombre_id, ' + ', '.join(_COLUMNAS_VALORES)
+
+ESQUEMA_COTIZACIONES = '''
+CREATE TABLE IF NOT EXISTS simbolos (
+    id INTEGER PRIMARY KEY,
+    simbolo TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS nombres (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS cotizaciones (
+    fecha INTEGER NOT NULL,
+    simbolo_id INTEGER NOT NULL,
+    manual INTEGER NOT NULL DEFAULT 0,
+    nombre_id INTEGER NOT NULL,
+    anterior REAL,
+    hoy REAL,
+    diferencia_bs REAL,
+    variacion REAL,
+    cantidad INTEGER,
+    monto REAL,
+    fuente TEXT,
+    PRIMARY KEY (fecha, simbolo_id, manual)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_cotizaciones_simbolo ON cotizaciones(simbolo_id, fecha);
+'''
+
+_SELECT_COTIZACION = (
+    "SELECT CAST(c.fecha AS TEXT) AS fecha, s.simbolo AS simbolo, n.nombre AS nombre,\n"
+    f"       {', '.join(f'c.{col} AS {col}' for col in _COLUMNAS_VALORES)}"
+)
+_FROM_COTIZACION = ("FROM cotizaciones c\n"
+                    "JOIN simbolos s ON s.id = c.simbolo_id\n"
+                    "JOIN nombres n ON n.id = c.nombre_id")
+
+VISTAS_COTIZACIONES = f'''
+CREATE VIEW IF NOT EXISTS cotizaciones_efectivas AS
+{_SELECT_COTIZACION},
+       c.manual AS manual, c.fecha AS fecha_num
+{_FROM_COTIZACION}
+WHERE c.manual = 1
+   OR NOT EXISTS (SELECT 1 FROM cotizaciones m
+                  WHERE m.fecha = c.fecha AND m.simbolo_id = c.simbolo_id AND m.manual = 1);
+
+CREATE VIEW IF NOT EXISTS acciones AS
+{_SELECT_COTIZACION},
+       c.fecha AS fecha_num
+{_FROM_COTIZACION}
+WHERE c.manual = 0;
+
+CREATE VIEW IF NOT EXISTS datos_manuales AS
+{_SELECT_COTIZACION},
+       c.fecha AS fecha_num
+{_FROM_COTIZACION}
+WHERE c.manual = 1;
+'''
+
+# Los diccionarios se dan de alta con WHERE NOT EXISTS y no con OR IGNORE: el conflicto
+# de la sentencia que dispara el trigger (INSERT OR REPLACE INTO acciones) se impone a
+# todo su cuerpo.
+
+def _sql_registrar_diccionarios(fila):
+    """Sentencias de trigger que dan de alta el símbolo y el nombre de la fila."""
+    return (f"INSERT INTO simbolos (simbolo) SELECT {fila}.simbolo\n"
+            f"    WHERE NOT EXISTS (SELECT 1 FROM simbolos WHERE simbolo = {fila}.simbolo);\n"
+            f"    INSERT INTO nombres (nombre) SELECT {fila}.nombre\n"
+            f"    WHERE NOT EXISTS (SELECT 1 FROM nombres WHERE nombre = {fila}.nombre);")
+
+def _sql_triggers_vista(vista, manual):
+    """Triggers INSTEAD OF que llevan a cotizaciones las escrituras sobre acciones / datos_manuales."""
+    clave = (f"fecha = OLD.fecha_num\n"
+             f"      AND simbolo_id = (SELECT id FROM simbolos WHERE simbolo = OLD.simbolo)\n"
+             f"      AND manual = {manual}")
+    return f'''
+CREATE TRIGGER IF NOT EXISTS trg_{vista}_ii INSTEAD OF INSERT ON {vista}
+BEGIN
+    {_sql_registrar_diccionarios('NEW')}
+    INSERT INTO cotizaciones ({_LISTA_COTIZACION})
+    SELECT CAST(NEW.fecha AS INTEGER), s.id, {manual}, n.id, {', '.join(f'NEW.{c}' for c in _COLUMNAS_VALORES)}
+    FROM simbolos s, nombres n
+    WHERE s.simbolo = NEW.simbolo AND n.nombre = NEW.nombre;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{vista}_iu INSTEAD OF UPDATE ON {vista}
+BEGIN
+    {_sql_registrar_diccionarios('NEW')}
+    UPDATE cotizaciones SET
+        fecha = CAST(NEW.fecha AS INTEGER),
+        simbolo_id = (SELECT id FROM simbolos WHERE simbolo = NEW.simbolo),
+        nombre_id = (SELECT id FROM nombres WHERE nombre = NEW.nombre),
+        {', '.join(f'{c} = NEW.{c}' for c in _COLUMNAS_VALORES)}
+    WHERE {clave};
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{vista}_id INSTEAD OF DELETE ON {vista}
+BEGIN
+    DELETE FROM cotizaciones
+    WHERE {clave};
+END;
+'''
+
+TRIGGERS_COTIZACIONES = _sql_triggers_vista('acciones', 0) + _sql_triggers_vista('datos_manuales', 1)
+
+def _ejecutar_sentencias(conn, script):
+    """Ejecuta un script separado por líneas en blanco sin el COMMIT implícito de executescript."""
+    for sentencia in script.split(';\n\n'):
+        if sentencia.strip():
+            conn.execute(sentencia)
+
+def _tipo_objeto(conn, nombre):
+    """'table', 'view', ... del objeto de main con ese nombre (None si no existe)."""
+    fila = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (nombre,)).fetchone()
+    return fila[0] if fila else None
+
+def _mover_cotizaciones(conn):
+    """
+    Trabajo de escritura: pasa las filas de las tablas acciones y datos_manuales (fecha
+    TEXT, id AUTOINCREMENT, nombre repetido) a cotizaciones y las reemplaza por vistas.
+    Descarta la copia derivada que mantenía la v1 anterior. Retorna False si ya eran vistas.
+    """
+    if _tipo_objeto(conn, 'acciones') != 'table':
+        return False
+    conn.execute('DROP VIEW IF EXISTS cotizaciones_efectivas')
+    conn.execute('DROP TABLE IF EXISTS cotizaciones')
+    _ejecutar_sentencias(conn, ESQUEMA_COTIZACIONES)
+
+    # Diccionarios en orden alfabético: los ids siguen el orden de los símbolos
+    conn.execute('''
+        INSERT OR IGNORE INTO simbolos (simbolo)
+        SELECT simbolo FROM acciones UNION SELECT simbolo FROM datos_manuales
+        ORDER BY 1
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO nombres (nombre)
+        SELECT nombre FROM acciones UNION SELECT nombre FROM datos_manuales
+        ORDER BY 1
+    ''')
+    for tabla, manual in (('acciones', 0), ('datos_manuales', 1)):
+        conn.execute(f'''
+            INSERT OR IGNORE INTO cotizaciones ({_LISTA_COTIZACION})
+            SELECT CAST(t.fecha AS INTEGER), s.id, {manual}, n.id,
+                   {', '.join(f't.{c}' for c in _COLUMNAS_VALORES)}
+            FROM {tabla} t
+            JOIN simbolos s ON s.simbolo = t.simbolo
+            JOIN nombres n ON n.nombre = t.nombre
+            ORDER BY 1, 2
+        ''')
+        conn.execute(f'DROP TABLE {tabla}')  # Con sus índices y triggers
+    conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('acciones', 'datos_manuales')")
+
+    _ejecutar_sentencias(conn, VISTAS_COTIZACIONES)
+    _ejecutar_sentencias(conn, TRIGGERS_COTIZACIONES)
+    return True
+
+def _reconstruir_indices_efectivos(conn):
+    """Trabajo de escritura: recalcula desde cero indices_efectivos."""
+    conn.execute('DELETE FROM indices_efectivos')
+    conn.execute('''
+        INSERT INTO indices_efectivos (fecha, valor, variacion, fuente, manual)
+        SELECT fecha, valor, variacion, fuente, 1 FROM indices_manuales
+        UNION ALL
+        SELECT fecha, valor, variacion, fuente, 0 FROM indices i
+        WHERE NOT EXISTS (SELECT 1 FROM indices_manuales m WHERE m.fecha = i.fecha)
+    ''')
+
+def _migracion_1_cotizaciones_compactas(conn):
+    """v1: acciones y datos_manuales -> cotizaciones compacta + vistas compatibles."""
+    for tabla in ('acciones', 'datos_manuales', 'indices', 'indices_manuales'):
+        for evento in ('ai', 'au', 'ad'):
+            conn.execute(f'DROP TRIGGER IF EXISTS trg_{tabla}_{evento}')
+    if _tipo_objeto(conn, 'cotizaciones_efectivas') == 'table':
+        conn.execute('DROP TABLE cotizaciones_efectivas')
+    _ejecutar_sentencias(conn, ESQUEMA_EFECTIVAS)  # Triggers de índices sin OR REPLACE
+    _mover_cotizaciones(conn)
+    _reconstruir_indices_efectivos(conn)
+
+# ========== ESTADÍSTICAS MANTENIDAS POR TRIGGERS (migración v2) ==========
+# Filas y fechas distintas por tabla, y filas por (tabla, fecha): los endpoints de
+# estado leen estos contadores en vez de hacer COUNT(*) / COUNT(DISTINCT fecha).
+# Un INSERT OR REPLACE borra la fila vieja sin disparar el trigger DELETE salvo con
+# PRAGMA recursive_triggers=ON (lo aplica abrir_conexion); los scripts sueltos usan
+# UPSERT. Si otro proceso los desajusta, recalcular_estadisticas() los reconstruye.
+TABLAS_CON_ESTADISTICAS = (
+    'acciones', 'datos_manuales', 'indices', 'indices_manuales',
+    'cotizaciones', 'indices_efectivos',
+)
+
+# acciones y datos_manuales son vistas: sus contadores los llevan triggers de cotizaciones
+# según manual (que no cambia: una fila pasa a manual borrándola e insertando otra), con
+# la fecha en texto como la muestra la vista
+VISTAS_CON_ESTADISTICAS = {'acciones': 0, 'datos_manuales': 1}
+
+ESQUEMA_ESTADISTICAS = '''
+CREATE TABLE IF NOT EXISTS estadisticas_tablas (
+    tabla TEXT PRIMARY KEY,
+    filas INTEGER NOT NULL DEFAULT 0,
+    fechas INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS estadisticas_fechas (
+    tabla TEXT NOT NULL,
+    fecha NOT NULL,
+    filas INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tabla, fecha)
+) WITHOUT ROWID
+'''
+
+def _sql_sumar_fila(tabla, fecha):
+    """Sentencias de trigger: una fila más para la fecha (alta de la fecha si es nueva)."""
+    clave = f"tabla = '{tabla}' AND fecha = {fecha}"
+    return (f"INSERT INTO estadisticas_fechas (tabla, fecha, filas) SELECT '{tabla}', {fecha}, 0\n"
+            f"    WHERE NOT EXISTS (SELECT 1 FROM estadisticas_fechas WHERE {clave});\n"
+            f"    UPDATE estadisticas_tablas SET filas = filas + 1,\n"
+            f"        fechas = fechas + (SELECT filas = 0 FROM estadisticas_fechas WHERE {clave})\n"
+            f"    WHERE tabla = '{tabla}';\n"
+            f"    UPDATE estadisticas_fechas SET filas = filas + 1 WHERE {clave};")
+
+def _sql_restar_fila(tabla, fecha):
+    """Sentencias de trigger: una fila menos para la fecha (baja de la fecha si queda vacía)."""
+    clave = f"tabla = '{tabla}' AND fecha = {fecha}"
+    return (f"UPDATE estadisticas_fechas SET filas = filas - 1 WHERE {clave};\n"
+            f"    UPDATE estadisticas_tablas SET filas = filas - 1,\n"
+            f"        fechas = fechas - (SELECT filas = 0 FROM estadisticas_fechas WHERE {clave})\n"
+            f"    WHERE tabla = '{tabla}';\n"
+            f"    DELETE FROM estadisticas_fechas WHERE {clave} AND filas = 0;")
+
+def _sql_triggers_estadisticas(tabla):
+    origen, fecha, condicion = tabla, '{fila}.fecha', ''
+    if tabla in VISTAS_CON_ESTADISTICAS:
+        origen, fecha = 'cotizaciones', "CAST({fila}.fecha AS TEXT)"
+        condicion = f"{{fila}}.manual = {VISTAS_CON_ESTADISTICAS[tabla]}"
+    nueva, vieja = fecha.format(fila='NEW'), fecha.format(fila='OLD')
+    cuando = lambda fila: f"\nWHEN {condicion.format(fila=fila)}" if condicion else ''
+    return f'''
+CREATE TRIGGER IF NOT EXISTS trg_est_{tabla}_ai AFTER INSERT ON {origen}{cuando('NEW')}
+BEGIN
+    {_sql_sumar_fila(tabla, nueva)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_est_{tabla}_ad AFTER DELETE ON {origen}{cuando('OLD')}
+BEGIN
+    {_sql_restar_fila(tabla, vieja)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_est_{tabla}_au AFTER UPDATE OF fecha ON {origen}
+WHEN OLD.fecha IS NOT NEW.fecha{' AND ' + condicion.format(fila='NEW') if condicion else ''}
+BEGIN
+    {_sql_restar_fila(tabla, vieja)}
+    {_sql_sumar_fila(tabla, nueva)}
+END;
+'''
+
+def _recalcular_estadisticas(conn):
+    """Trabajo de escritura: recalcula desde cero los contadores de estadísticas."""
+    conn.execute('DELETE FROM estadisticas_fechas')
+    conn.execute('DELETE FROM estadisticas_tablas')
+    for tabla in TABLAS_CON_ESTADISTICAS:
+        conn.execute(f'''
+            INSERT INTO estadisticas_fechas (tabla, fecha, filas)
+            SELECT '{tabla}', fecha, COUNT(*) FROM {tabla} GROUP BY fecha
+        ''')
+        conn.execute('''
+            INSERT INTO estadisticas_tablas (tabla, filas, fechas)
+            SELECT ?, COALESCE(SUM(filas), 0), COUNT(*) FROM estadisticas_fechas WHERE tabla = ?
+        ''', (tabla, tabla))
+
+def _migracion_2_estadisticas(conn):
+    """v2: contadores de filas/fechas por tabla mantenidos por triggers."""
+    _ejecutar_sentencias(conn, ESQUEMA_ESTADISTICAS)
+    for tabla in TABLAS_CON_ESTADISTICAS:
+        _ejecutar_sentencias(conn, _sql_triggers_estadisticas(tabla))
+    _recalcular_estadisticas(conn)
+
+# Caché negativa persistente: fechas consultadas que no tienen cotizaciones (feriados,
+# días que la BVC no publicó). descargar_y_guardar las descarta sin consultar SQLite,
+# data_cache ni la BVC. expira es un epoch, o NULL si el registro es permanente.
+# Toda cotización nueva de la fecha (descarga, .dat o dato manual) borra el registro
+# desde el trigger, sea cual sea el proceso que escribe.
+TTL_SIN_DATOS_HOY = 30 * 60  # Hoy y fechas futuras: la BVC puede publicar más tarde
+
+ESQUEMA_SIN_DATOS = '''
+CREATE TABLE IF NOT EXISTS fechas_sin_datos (
+    fecha INTEGER PRIMARY KEY,
+    registrado TEXT NOT NULL,
+    expira REAL,
+    motivo TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_sin_datos_cotizaciones AFTER INSERT ON cotizaciones
+BEGIN
+    DELETE FROM fechas_sin_datos WHERE fecha = NEW.fecha;
+END;
+'''
+
+def _migracion_4_fechas_sin_datos(conn):
+    """v4: fechas_sin_datos, la caché negativa de fechas sin cotizaciones."""
+    _ejecutar_sentencias(conn, ESQUEMA_SIN_DATOS)
+
+# Índices que repetían datos: por fecha en cotizaciones (su clave ya empieza por fecha)
+# y los de acciones/datos_manuales que eran prefijos de UNIQUE(fecha, simbolo)
+INDICES_REDUNDANTES = (
+    'idx_cotizaciones_fecha', 'idx_acciones_fecha', 'idx_acciones_fecha_simbolo',
+    'idx_datos_manuales_fecha',
+)
+
+def _migracion_5_indices_compactos(conn):
+    """v5: quita los índices redundantes."""
+    for indice in INDICES_REDUNDANTES:
+        conn.execute(f'DROP INDEX IF EXISTS {indice}')
+
+def _migracion_6_cotizaciones_sin_copia(conn):
+    """
+    v6: bases migradas con la v1 anterior, que dejaba acciones y datos_manuales como
+    tablas y una tercera copia de cada cotización en cotizaciones: una sola copia.
+    """
+    if _mover_cotizaciones(conn):
+        _ejecutar_sentencias(conn, ESQUEMA_SIN_DATOS)
+        for tabla in ('acciones', 'datos_manuales', 'cotizaciones'):
+            _ejecutar_sentencias(conn, _sql_triggers_estadisticas(tabla))
+        _recalcular_estadisticas(conn)
+
+# Migraciones versionadas con PRAGMA user_version: (versión, función(conn))
+MIGRACIONES = [
+    (1, _migracion_1_cotizaciones_compactas),
+    (2, _migracion_2_estadisticas),
+    (3, _migracion_3_manifiesto_ingesta),
+    (4, _migracion_4_fechas_sin_datos),
+    (5, _migracion_5_indices_compactos),
+    (6, _migracion_6_cotizaciones_sin_copia),
+]
 
 class SQLiteManager:
     def __init__(self, db_path="database/bolsa_datos.db"):
@@ -16,38 +612,50 @@ class SQLiteManager:
         os.makedirs("database", exist_ok=True)
         os.makedirs(self.cache_dir, exist_ok=True)
         
-        # Caché en memoria
-        self.memory_cache = {}
-        self.query_cache = {}  # Caché específico para consultas históricas
-        self.cache_lock = threading.Lock()
+        # Caché en memoria (LRU con límite de entradas y de bytes)
+        self.memory_cache = CacheLRU('acciones_por_fecha', max_entradas=100, max_bytes=64 * 1024 * 1024)
+        self.query_cache = CacheLRU('historicos', max_entradas=50, max_bytes=64 * 1024 * 1024)  # Consultas históricas
+        
+        # Funciones f(cambios) avisadas tras cada escritura que cambia cotizaciones
+        self._suscriptores_invalidacion = []
+        
+        # Consultas a fechas_sin_datos y cuántas encontraron la fecha (estadísticas)
+        self.consultas_sin_datos = 0
+        self.aciertos_sin_datos = 0
+        self._lock_sin_datos = threading.Lock()
         
-        # Inicializar base de datos
+        # Escritor único: todas las escrituras pasan por su cola y se confirman en lotes
+        self.escritor = EscritorSQLite(self.db_path)
+        
+        # Inicializar base de datos (antes de abrir lectores: mode=ro exige que exista)
         self.init_database()
         
+        # Años cerrados en archivos de solo lectura, adjuntados a cada conexión de lectura
+        self.carpeta_particiones = particiones_sqlite.carpeta_particiones(self.db_path)
+        self.particiones = particiones_sqlite.listar_particiones(self.carpeta_particiones)
+        
+        # Pool de conexiones de SOLO LECTURA (PRAGMAs y particiones una vez por conexión)
+        self.pool = PoolConexiones(self.db_path, solo_lectura=True,
+                                   al_abrir=self._adjuntar_particiones)
+        
+        # Series de precios en memoria para históricos (requiere numpy)
+        self.almacen = None
+        if NUMPY_DISPONIBLE:
+            self.almacen = AlmacenPrecios()
+            with self.pool.conexion() as conn:
+                self.almacen.cargar(conn)
+        
     def init_database(self):
         """Inicializa la base de datos SQLite con tablas optimizadas"""
-        conn = self.get_connection()
+        self.escritor.ejecutar(self._crear_esquema)
+    
+    def _crear_esquema(self, conn):
+        """Trabajo de escritura: crea tablas e índices si no existen"""
         cursor = conn.cursor()
         
-        # Crear tablas si no existen (solo estructura básica)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS acciones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha TEXT NOT NULL,
-            simbolo TEXT NOT NULL,
-            nombre TEXT NOT NULL,
-            anterior REAL,
-            hoy REAL,
-            diferencia_bs REAL,
-            variacion REAL,
-            cantidad INTEGER,
-            monto REAL,
-            fuente TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(fecha, simbolo)
-        )
-        ''')
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
         
+        # Crear tablas si no existen (solo estructura básica)
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS indices (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -60,24 +668,6 @@ class SQLiteManager:
         )
         ''')
         
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS datos_manuales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha TEXT NOT NULL,
-            simbolo TEXT NOT NULL,
-            nombre TEXT NOT NULL,
-            anterior REAL,
-            hoy REAL,
-            diferencia_bs REAL,
-            variacion REAL,
-            cantidad INTEGER,
-            monto REAL,
-            fuente TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(fecha, simbolo)
-        )
-        ''')
-        
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS indices_manuales (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -90,19 +680,106 @@ class SQLiteManager:
         )
         ''')
         
-        # Crear índices para máxima velocidad
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_acciones_fecha ON acciones(fecha)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_acciones_simbolo ON acciones(simbolo)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_acciones_fecha_simbolo ON acciones(fecha, simbolo)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_datos_manuales_fecha ON datos_manuales(fecha)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_datos_manuales_simbolo ON datos_manuales(simbolo)')
+        # Bases nuevas o anteriores a la v1: acciones y datos_manuales como tablas, de
+        # donde la migración v1 pasa las filas a cotizaciones (después son vistas)
+        if version < 1:
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS acciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                simbolo TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                anterior REAL,
+                hoy REAL,
+                diferencia_bs REAL,
+                variacion REAL,
+                cantidad INTEGER,
+                monto REAL,
+                fuente TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(fecha, simbolo)
+            )
+            ''')
+        
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS datos_manuales (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                simbolo TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                anterior REAL,
+                hoy REAL,
+                diferencia_bs REAL,
+                variacion REAL,
+                cantidad INTEGER,
+                monto REAL,
+                fuente TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(fecha, simbolo)
+            )
+            ''')
+        
         
-        conn.commit()
-        conn.close()
+        # Índices efectivos (manual sobre automático) + triggers
+        _ejecutar_sentencias(conn, ESQUEMA_EFECTIVAS)
+        
+        # Migraciones pendientes según PRAGMA user_version
+        for numero, migracion in MIGRACIONES:
+            if version < numero:
+                migracion(conn)
+                cursor.execute(f'PRAGMA user_version = {numero}')
+                print(f"🔧 Migración de esquema v{numero} aplicada ({migracion.__name__})")
         
     def get_connection(self):
-        """Obtiene una conexión a la base de datos"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+        """
+        Obtiene una conexión NUEVA de lectura/escritura ya configurada (fuera del pool).
+        El llamador debe cerrarla. Las escrituras de la app deben usar ejecutar_escritura().
+        """
+        return abrir_conexion(self.db_path, PRAGMAS_POR_DEFECTO)
+    
+    def conexion_lectura(self):
+        """
+        Conexión de SOLO LECTURA del pool, con los años archivados ya adjuntados.
+        Se usa como sqlite3.connect(): conn.close() la devuelve al pool.
+        """
+        return self.pool.prestar()
+    
+    def _adjuntar_particiones(self, conn):
+        particiones_sqlite.adjuntar_particiones(conn, self.particiones)
+    
+    def ejecutar_escritura(self, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(conn, *args) en el hilo escritor y espera a que se confirme.
+        La función NO debe hacer commit: el escritor confirma el lote completo.
+        """
+        return self.escritor.ejecutar(funcion, *args, **kwargs)
+    
+    def suscribir_invalidacion(self, funcion):
+        """
+        Registra funcion(cambios) para que otras cachés se invaliden tras cada escritura.
+        cambios: {fecha YYYYMMDD o None (todas): {simbolos} o None (todos)}
+        """
+        self._suscriptores_invalidacion.append(funcion)
+    
+    def notificar_cambios(self, cambios):
+        """
+        Invalida exactamente las fotos diarias e históricos afectados por una escritura
+        y avisa a los suscriptores. Llamar DESPUÉS de confirmar la escritura.
+        """
+        if not cambios:
+            return
+        # Primero el almacén, para que nadie rellene las cachés con series viejas
+        if self.almacen is not None:
+            with self.pool.conexion() as conn:
+                self.almacen.actualizar(conn, cambios)
+        for fecha, simbolos in cambios.items():
+            self.memory_cache.invalidar(fecha, simbolos)
+            self.query_cache.invalidar(fecha, simbolos)
+        for funcion in self._suscriptores_invalidacion:
+            try:
+                funcion(cambios)
+            except Exception as e:
+                print(f"⚠️  Error invalidando caché externa: {e}")
     
     # ========== MÉTODOS PARA ACCIONES ==========
     
@@ -110,164 +787,114 @@ class SQLiteManager:
         """Obtiene acciones para una fecha específica (MUY RÁPIDO)"""
         # Verificar caché primero
         cache_key = f"acciones_{fecha_str}"
-        with self.cache_lock:
-            if cache_key in self.memory_cache:
-                return self.memory_cache[cache_key]
+        resultados = self.memory_cache.obtener(cache_key)
+        if resultados is not None:
+            return resultados
         
-        conn = self.get_connection()
+        conn = self.pool.obtener()
         cursor = conn.cursor()
         
         try:
-            # Consulta optimizada con SQLite
+            # Una fila por símbolo (manual sobre automático): índice por fecha
             cursor.execute('''
                 SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
                        variacion, cantidad, monto, fuente
-                FROM acciones 
-                WHERE fecha = ?
-                UNION
-                SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
-                       variacion, cantidad, monto, fuente
-                FROM datos_manuales 
-                WHERE fecha = ?
+                FROM cotizaciones_efectivas 
+                WHERE fecha_num = ?
                 ORDER BY simbolo
-            ''', (fecha_str, fecha_str))
-            
-            columnas = [desc[0] for desc in cursor.description]
-            resultados = []
+            ''', (fecha_str,))
             
-            for fila in cursor.fetchall():
-                resultado = dict(zip(columnas, fila))
-                resultados.append(resultado)
+            resultados = [Cotizacion(*fila) for fila in cursor.fetchall()]
             
-            # Guardar en caché
-            with self.cache_lock:
-                self.memory_cache[cache_key] = resultados
-                # Limitar tamaño del caché
-                if len(self.memory_cache) > 100:
-                    # Eliminar el más antiguo
-                    self.memory_cache.pop(next(iter(self.memory_cache)))
+            # Guardar en caché (la LRU expulsa la fecha menos consultada)
+            self.memory_cache.guardar(cache_key, resultados, desde=fecha_str, hasta=fecha_str)
             
             return resultados
             
         finally:
-            conn.close()
+            self.pool.liberar(conn)
     
     def obtener_historico_simbolo(self, simbolo, fecha_desde, fecha_hasta):
         """Obtiene histórico de un símbolo (EXTREMADAMENTE RÁPIDO)"""
         cache_key = f"historico_{simbolo}_{fecha_desde}_{fecha_hasta}"
         
-        with self.cache_lock:
-            if cache_key in self.query_cache:
-                return self.query_cache[cache_key]
+        resultados = self.query_cache.obtener(cache_key)
+        if resultados is not None:
+            return resultados
+        
+        # Almacén columnar en memoria: searchsorted + slice, sin SQLite
+        if self.almacen is not None:
+            resultados = self.almacen.historico(simbolo, fecha_desde, fecha_hasta)
+            self.query_cache.guardar(cache_key, resultados, simbolo=simbolo.upper(),
+                                     desde=fecha_desde, hasta=fecha_hasta)
+            return resultados
         
-        conn = self.get_connection()
+        conn = self.pool.obtener()
         cursor = conn.cursor()
         
         try:
-            # CONSULTA OPTIMIZADA CON SQLite - MODIFICADA: ORDER BY fecha DESC
+            # Rango del índice (simbolo, fecha) - MODIFICADO: ORDER BY fecha DESC
+            # precio/cambio_bs/fecha_formateada los deriva CotizacionHistorica
             cursor.execute('''
-                SELECT fecha, simbolo, nombre, hoy as precio, variacion, 
-                       diferencia_bs as cambio_bs, cantidad, monto, anterior, fuente
-                FROM (
-                    SELECT fecha, simbolo, nombre, hoy, variacion, diferencia_bs, 
-                           cantidad, monto, anterior, fuente, 1 as orden
-                    FROM acciones 
-                    WHERE simbolo = ? AND fecha BETWEEN ? AND ?
-                    UNION ALL
-                    SELECT fecha, simbolo, nombre, hoy, variacion, diferencia_bs, 
-                           cantidad, monto, anterior, fuente, 2 as orden
-                    FROM datos_manuales 
-                    WHERE simbolo = ? AND fecha BETWEEN ? AND ?
-                )
-                ORDER BY fecha DESC, orden  -- MODIFICADO: DESC para fechas más recientes primero
-            ''', (simbolo.upper(), fecha_desde, fecha_hasta, 
-                  simbolo.upper(), fecha_desde, fecha_hasta))
-            
-            columnas = [desc[0] for desc in cursor.description]
-            resultados = []
+                SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
+                       variacion, cantidad, monto, fuente
+                FROM cotizaciones_efectivas 
+                WHERE simbolo = ? AND fecha_num BETWEEN ? AND ?
+                ORDER BY fecha_num DESC  -- MODIFICADO: DESC para fechas más recientes primero
+            ''', (simbolo.upper(), fecha_desde, fecha_hasta))
             
-            for fila in cursor.fetchall():
-                resultado = dict(zip(columnas, fila))
-                # Formatear fecha
-                if resultado['fecha'] and len(resultado['fecha']) == 8:
-                    fecha_dt = datetime.strptime(resultado['fecha'], '%Y%m%d')
-                    resultado['fecha_formateada'] = fecha_dt.strftime('%d/%m/%Y')
-                resultados.append(resultado)
+            resultados = [CotizacionHistorica(*fila) for fila in cursor.fetchall()]
             
             # Guardar en caché de consultas
-            with self.cache_lock:
-                self.query_cache[cache_key] = resultados
-                # Limitar tamaño
-                if len(self.query_cache) > 50:
-                    self.query_cache.pop(next(iter(self.query_cache)))
+            self.query_cache.guardar(cache_key, resultados, simbolo=simbolo.upper(),
+                                     desde=fecha_desde, hasta=fecha_hasta)
             
             return resultados
             
         finally:
-            conn.close()
+            self.pool.liberar(conn)
     
     def insertar_acciones(self, fecha_str, acciones_data):
-        """Inserta múltiples acciones en la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Inserta múltiples acciones en la base de datos (UPSERT masivo)"""
+        resultado = self.ingestar_cotizaciones(
+            [_tupla_cotizacion(accion, fecha_str) for accion in acciones_data]
+        )
+        return resultado['insertados'] + resultado['actualizados'] + resultado['sin_cambios']
+    
+    def ingestar_cotizaciones(self, filas, tabla='acciones'):
+        """
+        Carga masiva de cotizaciones en UNA transacción (executemany + UPSERT).
+        filas: tuplas en el orden de COLUMNAS_COTIZACION o diccionarios con 'fecha'.
+        Retorna {'insertados', 'actualizados', 'sin_cambios', 'fechas'}.
+        """
+        if tabla not in ('acciones', 'datos_manuales'):
+            raise ValueError(f"Tabla de cotizaciones no válida: {tabla}")
         
-        try:
-            insertados = 0
-            for accion in acciones_data:
-                try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO acciones 
-                        (fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
-                         variacion, cantidad, monto, fuente)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        fecha_str,
-                        accion.get('simbolo', ''),
-                        accion.get('nombre', ''),
-                        accion.get('anterior', 0),
-                        accion.get('hoy', 0),
-                        accion.get('diferencia_bs', 0),
-                        accion.get('variacion', 0),
-                        accion.get('cantidad', 0),
-                        accion.get('monto', 0),
-                        accion.get('fuente', 'automatico')
-                    ))
-                    insertados += 1
-                except Exception as e:
-                    print(f"Error insertando acción {accion.get('simbolo', '')}: {e}")
-            
-            conn.commit()
-            
-            # Limpiar caché para esta fecha
-            cache_key = f"acciones_{fecha_str}"
-            with self.cache_lock:
-                if cache_key in self.memory_cache:
-                    del self.memory_cache[cache_key]
-            
-            return insertados
-            
-        finally:
-            conn.close()
+        tuplas = [f if isinstance(f, tuple) else _tupla_cotizacion(f) for f in filas]
+        if not tuplas:
+            return {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'fechas': [], 'cambios': {}}
+        
+        resultado = self.escritor.ejecutar(_upsert_cotizaciones, tabla, tuplas)
+        
+        # Invalidar solo lo que cubre las filas nuevas o modificadas
+        self.notificar_cambios(resultado['cambios'])
+        
+        return resultado
     
     # ========== MÉTODOS PARA ÍNDICES ==========
     
     def obtener_indice_por_fecha(self, fecha_str):
         """Obtiene el índice para una fecha específica"""
-        conn = self.get_connection()
+        conn = self.pool.obtener()
         cursor = conn.cursor()
         
         try:
-            # Intentar primero con datos manuales
+            # indices_efectivos ya tiene el manual por encima del automático
             cursor.execute('''
                 SELECT fecha, valor, variacion, fuente
-                FROM indices_manuales 
+                FROM indices_efectivos
                 WHERE fecha = ?
-                UNION
-                SELECT fecha, valor, variacion, fuente
-                FROM indices 
-                WHERE fecha = ?
-                LIMIT 1
-            ''', (fecha_str, fecha_str))
+            ''', (fecha_str,))
             
             fila = cursor.fetchone()
             if fila:
@@ -277,97 +904,148 @@ class SQLiteManager:
             return None
             
         finally:
-            conn.close()
+            self.pool.liberar(conn)
     
     def insertar_indice(self, fecha_str, indice_data):
         """Inserta un índice en la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        self.ingestar_indices([(
+            fecha_str,
+            indice_data.get('valor', 0),
+            indice_data.get('variacion', 0),
+            indice_data.get('fuente', 'automatico')
+        )])
+        return True
+    
+    def ingestar_indices(self, filas, tabla='indices'):
+        """Carga masiva de índices (tuplas fecha, valor, variacion, fuente) con UPSERT."""
+        if tabla not in ('indices', 'indices_manuales'):
+            raise ValueError(f"Tabla de índices no válida: {tabla}")
         
+        tuplas = list(filas)
+        if tuplas:
+            self.escritor.ejecutar(_upsert_indices, tabla, tuplas)
+        return len(tuplas)
+    
+    def enviar_ingesta(self, filas, indices=(), manifiesto=(), republicados=()):
+        """
+        Encola sin esperar un lote de ingesta masiva: filas de acciones (tuplas de
+        COLUMNAS_COTIZACION), índices (tuplas de COLUMNAS_INDICE) y los archivos de
+        origen (tuplas de COLUMNAS_MANIFIESTO) en un solo trabajo. De las fechas
+        `republicados` se borran los símbolos que el archivo nuevo ya no trae.
+        Retorna un Future con el resultado de _upsert_cotizaciones: quien lo espera
+        llama a notificar_cambios(resultado['cambios']) (fuera del hilo escritor).
+        """
+        return self.escritor.enviar(_ingestar_lote, list(filas), list(indices),
+                                    list(manifiesto), list(republicados))
+    
+    def obtener_manifiesto_ingesta(self):
+        """{archivo: fila de COLUMNAS_MANIFIESTO} de los .dat ya cargados, en una consulta."""
+        conn = self.pool.obtener()
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO indices 
-                (fecha, valor, variacion, fuente)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                fecha_str,
-                indice_data.get('valor', 0),
-                indice_data.get('variacion', 0),
-                indice_data.get('fuente', 'automatico')
-            ))
-            
-            conn.commit()
-            return True
-            
+            return {fila[0]: fila for fila in conn.execute(
+                f"SELECT {', '.join(COLUMNAS_MANIFIESTO)} FROM ingest_manifest")}
+        finally:
+            self.pool.liberar(conn)
+    
+    # ========== FECHAS SIN DATOS (CACHÉ NEGATIVA) ==========
+    
+    def fecha_sin_datos(self, fecha_str):
+        """True si la fecha YYYYMMDD está registrada sin datos y el registro sigue vigente."""
+        if not str(fecha_str).isdigit():
+            return False
+        conn = self.pool.obtener()
+        try:
+            fila = conn.execute('''
+                SELECT 1 FROM fechas_sin_datos
+                WHERE fecha = ? AND (expira IS NULL OR expira > ?)
+            ''', (int(fecha_str), time.time())).fetchone()
         finally:
-            conn.close()
+            self.pool.liberar(conn)
+        with self._lock_sin_datos:
+            self.consultas_sin_datos += 1
+            if fila is not None:
+                self.aciertos_sin_datos += 1
+        return fila is not None
+    
+    def registrar_fecha_sin_datos(self, fecha_str, motivo=None):
+        """
+        Registra una fecha confirmada sin datos (sin esperar a la escritura). Hoy y las
+        fechas futuras expiran a los TTL_SIN_DATOS_HOY segundos; las pasadas no expiran.
+        Si mientras tanto llegaron cotizaciones de la fecha, no se registra.
+        """
+        fecha_str = str(fecha_str)
+        if not fecha_str.isdigit():
+            return None
+        ahora = time.time()
+        hoy = datetime.now().strftime('%Y%m%d')
+        expira = ahora + TTL_SIN_DATOS_HOY if fecha_str >= hoy else None
+        
+        def _escribir(conn):
+            # De paso se quitan los registros vencidos
+            conn.execute('DELETE FROM fechas_sin_datos WHERE expira <= ?', (ahora,))
+            conn.execute('''
+                INSERT OR REPLACE INTO fechas_sin_datos (fecha, registrado, expira, motivo)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM cotizaciones WHERE fecha = ?)
+            ''', (int(fecha_str), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), expira, motivo,
+                  int(fecha_str)))
+        
+        return self.escritor.enviar(_escribir)
+    
+    def olvidar_fechas_sin_datos(self):
+        """Borra toda la caché negativa: las fechas se vuelven a buscar. Retorna cuántas había."""
+        return self.escritor.ejecutar(
+            lambda conn: conn.execute('DELETE FROM fechas_sin_datos').rowcount)
+    
+    def estadisticas_fechas_sin_datos(self):
+        conn = self.pool.obtener()
+        try:
+            vigentes, permanentes = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(expira IS NULL), 0) FROM fechas_sin_datos
+                WHERE expira IS NULL OR expira > ?
+            ''', (time.time(),)).fetchone()
+        finally:
+            self.pool.liberar(conn)
+        with self._lock_sin_datos:
+            consultas, aciertos = self.consultas_sin_datos, self.aciertos_sin_datos
+        return {
+            'vigentes': vigentes,
+            'permanentes': permanentes,
+            'consultas': consultas,
+            'aciertos': aciertos,
+            'ttl_hoy_s': TTL_SIN_DATOS_HOY
+        }
     
     # ========== MÉTODOS PARA DATOS MANUALES ==========
     
     def insertar_datos_manuales(self, fecha_str, acciones_data, indice_data=None):
-        """Inserta datos manuales en la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Inserta datos manuales en la base de datos (UPSERT masivo)"""
+        tuplas = [_tupla_cotizacion(accion, fecha_str, fuente='manual') for accion in acciones_data]
         
-        try:
+        def _escribir(conn):
             # Insertar acciones manuales
-            insertados = 0
-            for accion in acciones_data:
-                try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO datos_manuales 
-                        (fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
-                         variacion, cantidad, monto, fuente)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        fecha_str,
-                        accion.get('simbolo', ''),
-                        accion.get('nombre', ''),
-                        accion.get('anterior', 0),
-                        accion.get('hoy', 0),
-                        accion.get('diferencia_bs', 0),
-                        accion.get('variacion', 0),
-                        accion.get('cantidad', 0),
-                        accion.get('monto', 0),
-                        'manual'
-                    ))
-                    insertados += 1
-                except Exception as e:
-                    print(f"Error insertando acción manual {accion.get('simbolo', '')}: {e}")
+            resultado = _upsert_cotizaciones(conn, 'datos_manuales', tuplas)
             
             # Insertar índice manual
             if indice_data:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO indices_manuales 
-                    (fecha, valor, variacion, fuente)
-                    VALUES (?, ?, ?, ?)
-                ''', (
+                _upsert_indices(conn, 'indices_manuales', [(
                     fecha_str,
                     indice_data.get('valor', 0),
                     indice_data.get('variacion', 0),
                     'manual'
-                ))
-            
-            conn.commit()
-            
-            # Limpiar cachés
-            with self.cache_lock:
-                cache_key = f"acciones_{fecha_str}"
-                if cache_key in self.memory_cache:
-                    del self.memory_cache[cache_key]
-                # Limpiar caché de consultas que puedan incluir esta fecha
-                keys_to_remove = [k for k in self.query_cache.keys() if fecha_str in k]
-                for k in keys_to_remove:
-                    del self.query_cache[k]
-            
-            return insertados
-            
-        finally:
-            conn.close()
+                )])
+            return resultado
+        
+        resultado = self.escritor.ejecutar(_escribir)
+        
+        # Limpiar cachés
+        self.notificar_cambios(resultado['cambios'])
+        
+        return resultado['insertados'] + resultado['actualizados'] + resultado['sin_cambios']
     
     def obtener_datos_manuales(self, fecha_str):
         """Obtiene datos manuales para una fecha"""
-        conn = self.get_connection()
+        conn = self.pool.obtener()
         cursor = conn.cursor()
         
         try:
@@ -376,9 +1054,9 @@ class SQLiteManager:
                 SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
                        variacion, cantidad, monto, fuente
                 FROM datos_manuales 
-                WHERE fecha = ?
+                WHERE fecha_num = ?
                 ORDER BY simbolo
-            ''', (fecha_str,))
+            ''', (int(fecha_str),))
             
             columnas = [desc[0] for desc in cursor.description]
             acciones = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
@@ -396,109 +1074,178 @@ class SQLiteManager:
             return acciones, indice
             
         finally:
-            conn.close()
+            self.pool.liberar(conn)
     
     def eliminar_datos_manuales(self, fecha_str):
         """Elimina datos manuales para una fecha"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        def _escribir(conn):
+            simbolos = {s for (s,) in conn.execute(
+                'SELECT simbolo FROM datos_manuales WHERE fecha_num = ?', (int(fecha_str),))}
+            conn.execute('DELETE FROM cotizaciones WHERE fecha = ? AND manual = 1', (int(fecha_str),))
+            conn.execute('DELETE FROM indices_manuales WHERE fecha = ?', (fecha_str,))
+            return simbolos
         
-        try:
-            cursor.execute('DELETE FROM datos_manuales WHERE fecha = ?', (fecha_str,))
-            cursor.execute('DELETE FROM indices_manuales WHERE fecha = ?', (fecha_str,))
-            
-            conn.commit()
-            
-            # Limpiar cachés
-            with self.cache_lock:
-                cache_key = f"acciones_{fecha_str}"
-                if cache_key in self.memory_cache:
-                    del self.memory_cache[cache_key]
-            
-            return True
-            
-        finally:
-            conn.close()
+        simbolos = self.escritor.ejecutar(_escribir)
+        
+        # Limpiar cachés de los símbolos eliminados
+        if simbolos:
+            self.notificar_cambios({fecha_str: simbolos})
+        
+        return True
     
     # ========== MÉTODOS DE CACHÉ Y OPTIMIZACIÓN ==========
     
     def precargar_cache(self, dias=30):
-        """Precarga datos recientes en caché"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """
+        Precarga en caché las acciones de las últimas `dias` fechas con UNA sola
+        consulta sobre los datos efectivos (el manual por encima del automático),
+        así lo precargado es idéntico a una lectura en frío. Retorna las fechas cargadas.
+        """
+        conn = self.pool.obtener()
         
         try:
-            # Obtener las fechas más recientes
-            cursor.execute('''
-                SELECT DISTINCT fecha 
-                FROM acciones 
-                ORDER BY fecha DESC 
-                LIMIT ?
+            # Fechas desde los contadores por fecha (PK tabla, fecha): no recorre cotizaciones
+            cursor = conn.execute('''
+                SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
+                       variacion, cantidad, monto, fuente
+                FROM cotizaciones_efectivas 
+                WHERE fecha_num IN (SELECT fecha FROM estadisticas_fechas
+                                    WHERE tabla = 'cotizaciones'
+                                    ORDER BY fecha DESC LIMIT ?)
+                ORDER BY fecha_num, simbolo
             ''', (dias,))
             
-            fechas = [fila[0] for fila in cursor.fetchall()]
-            
-            with self.cache_lock:
-                for fecha in fechas:
-                    cache_key = f"acciones_{fecha}"
-                    if cache_key not in self.memory_cache:
-                        # Cargar datos
-                        cursor.execute('''
-                            SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs, 
-                                   variacion, cantidad, monto, fuente
-                            FROM acciones 
-                            WHERE fecha = ?
-                            ORDER BY simbolo
-                        ''', (fecha,))
-                        
-                        columnas = [desc[0] for desc in cursor.description]
-                        resultados = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
-                        
-                        self.memory_cache[cache_key] = resultados
-            
-            print(f"✅ Precargadas {len(fechas)} fechas en caché")
+            por_fecha = {}
+            for fila in cursor:
+                por_fecha.setdefault(fila[0], []).append(Cotizacion(*fila))
             
         finally:
-            conn.close()
+            self.pool.liberar(conn)
+        
+        nuevas = 0
+        for fecha, resultados in por_fecha.items():
+            cache_key = f"acciones_{fecha}"
+            if cache_key not in self.memory_cache:
+                self.memory_cache.guardar(cache_key, resultados, desde=fecha, hasta=fecha)
+                nuevas += 1
+        
+        print(f"✅ Precargadas {len(por_fecha)} fechas en caché ({nuevas} nuevas)")
+        return len(por_fecha)
+    
+    def obtener_fechas_con_datos(self):
+        """Conjunto de fechas YYYYMMDD con cotizaciones (automáticas o manuales)."""
+        conn = self.pool.obtener()
+        try:
+            return {f"{fecha:08d}" for (fecha,) in conn.execute(
+                "SELECT fecha FROM estadisticas_fechas WHERE tabla = 'cotizaciones'")}
+        finally:
+            self.pool.liberar(conn)
     
     def limpiar_cache(self):
         """Limpia el caché en memoria"""
-        with self.cache_lock:
-            self.memory_cache.clear()
-            self.query_cache.clear()
+        self.memory_cache.limpiar()
+        self.query_cache.limpiar()
         print("🧹 Caché limpiado")
     
-    def estadisticas(self):
-        """Muestra estadísticas de la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    # ========== PARTICIONES POR AÑO ==========
+    
+    def archivar_anio(self, anio):
+        """
+        Mueve un año cerrado a su partición de solo lectura. Las lecturas no cambian:
+        las conexiones nuevas ya adjuntan la partición antes de que se borre el año.
+        """
+        anio = int(anio)
+        if anio >= datetime.now().year:
+            raise ValueError(f"Solo se archivan años cerrados (año en curso: {datetime.now().year})")
+        if anio not in dict(self.particiones) and len(self.particiones) >= particiones_sqlite.LIMITE_ADJUNTOS:
+            raise ValueError(f"Límite de {particiones_sqlite.LIMITE_ADJUNTOS} particiones adjuntas alcanzado")
         
+        def _archivar(conn):
+            # En el hilo escritor: nadie escribe el año mientras se copia y se borra
+            ruta, filas = particiones_sqlite.construir_particion(
+                conn, anio, self.carpeta_particiones, self._crear_esquema)
+            self.particiones = particiones_sqlite.listar_particiones(self.carpeta_particiones)
+            # Antes del borrado: mientras siga en la base principal, gana la principal
+            self.pool.renovar()
+            return ruta, filas, particiones_sqlite.borrar_anio(conn, anio)
+        
+        ruta, filas, borradas = self.escritor.ejecutar(_archivar)
+        print(f"📦 Año {anio} archivado en {ruta} ({sum(filas.values())} filas, {borradas} quitadas de la base principal)")
+        return {'anio': anio, 'archivo': ruta, 'filas': filas, 'borradas': borradas}
+    
+    def desarchivar_anio(self, anio):
+        """Devuelve un año archivado a la base principal y elimina su partición."""
+        anio = int(anio)
+        ruta = dict(self.particiones).get(anio)
+        if ruta is None:
+            raise ValueError(f"El año {anio} no está archivado")
+        
+        restauradas = self.escritor.ejecutar(particiones_sqlite.restaurar_particion, ruta)
+        self.particiones = [p for p in self.particiones if p[0] != anio]
+        self.pool.renovar()
+        os.remove(ruta)
+        print(f"📂 Año {anio} restaurado a la base principal ({restauradas} filas)")
+        return {'anio': anio, 'restauradas': restauradas}
+    
+    def obtener_estadisticas_tablas(self):
+        """
+        Contadores por tabla mantenidos por triggers (sin recorrer las tablas):
+        {tabla: {'filas', 'fechas', 'fecha_min', 'fecha_max'}}.
+        """
+        conn = self.pool.obtener()
         try:
-            cursor.execute("SELECT COUNT(*) FROM acciones")
-            total_acciones = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM indices")
-            total_indices = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM datos_manuales")
-            total_manuales = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT fecha) FROM acciones")
-            fechas_unicas = cursor.fetchone()[0]
-            
-            with self.cache_lock:
-                return {
-                    'total_acciones': total_acciones,
-                    'total_indices': total_indices,
-                    'total_manuales': total_manuales,
-                    'fechas_unicas': fechas_unicas,
-                    'fechas_en_cache': len(self.memory_cache),
-                    'consultas_en_cache': len(self.query_cache),
-                    'db_size_mb': os.path.getsize(self.db_path) / 1024 / 1024 if os.path.exists(self.db_path) else 0
-                }
-                
+            cursor = conn.execute('''
+                SELECT t.tabla, t.filas, t.fechas,
+                       (SELECT fecha FROM estadisticas_fechas f
+                        WHERE f.tabla = t.tabla ORDER BY fecha LIMIT 1),
+                       (SELECT fecha FROM estadisticas_fechas f
+                        WHERE f.tabla = t.tabla ORDER BY fecha DESC LIMIT 1)
+                FROM estadisticas_tablas t
+            ''')
+            return {
+                tabla: {'filas': filas, 'fechas': fechas, 'fecha_min': fecha_min, 'fecha_max': fecha_max}
+                for tabla, filas, fechas, fecha_min, fecha_max in cursor
+            }
         finally:
-            conn.close()
+            self.pool.liberar(conn)
+    
+    def recalcular_estadisticas(self):
+        """
+        Reconstruye los contadores de estadísticas contando cada tabla (reparación, por
+        si otro proceso escribió con INSERT OR REPLACE sin recursive_triggers).
+        """
+        self.ejecutar_escritura(_recalcular_estadisticas)
+        self.notificar_cambios({None: None})  # El calendario lee estadisticas_fechas
+        return self.obtener_estadisticas_tablas()
+    
+    def estadisticas(self):
+        """Muestra estadísticas de la base de datos (contadores en tiempo constante)"""
+        tablas = self.obtener_estadisticas_tablas()
+        vacia = {'filas': 0, 'fechas': 0, 'fecha_min': None, 'fecha_max': None}
+        acciones = tablas.get('acciones', vacia)
+        
+        return {
+            'total_acciones': acciones['filas'],
+            'total_indices': tablas.get('indices', vacia)['filas'],
+            'total_manuales': tablas.get('datos_manuales', vacia)['filas'],
+            'fechas_unicas': acciones['fechas'],
+            'fecha_min': acciones['fecha_min'],
+            'fecha_max': acciones['fecha_max'],
+            'tablas': tablas,
+            'fechas_en_cache': len(self.memory_cache),
+            'consultas_en_cache': len(self.query_cache),
+            'cache_acciones': self.memory_cache.estadisticas(),
+            'cache_historicos': self.query_cache.estadisticas(),
+            'pool_conexiones': self.pool.estadisticas(),
+            'escritor': self.escritor.estadisticas(),
+            'almacen_columnar': self.almacen.estadisticas() if self.almacen is not None else None,
+            'fechas_sin_datos': self.estadisticas_fechas_sin_datos(),
+            'particiones': [
+                {'anio': anio, 'archivo': ruta, 'mb': os.path.getsize(ruta) / 1024 / 1024}
+                for anio, ruta in self.particiones if os.path.exists(ruta)
+            ],
+            'db_size_mb': os.path.getsize(self.db_path) / 1024 / 1024 if os.path.exists(self.db_path) else 0
+        }
 
 # Instancia global
 sqlite_manager = SQLiteManager()
\ No newline at end of file
@@ -0,0 +1,346 @@
+# sqlite_pool.py - Pool de conexiones SQLite reutilizables con PRAGMAs optimizados
+# y escritor único con cola de trabajos (evita "database is locked")
+
+import atexit
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# PRAGMAs que se aplican UNA sola vez por conexión (no en cada consulta)
+PRAGMAS_POR_DEFECTO = {
+    'journal_mode': 'WAL',        # Lectores y escritor no se bloquean entre sí
+    'synchronous': 'NORMAL',      # Seguro con WAL y mucho más rápido que FULL
+    'mmap_size': 268435456,       # 256 MB mapeados en memoria
+    'cache_size': -65536,         # 64 MB de caché de páginas (valor negativo = KiB)
+    'temp_store': 'MEMORY',       # Tablas temporales y ordenamientos en RAM
+    'busy_timeout': 5000,         # Esperar hasta 5 s si la base está ocupada
+    'recursive_triggers': 'ON',   # INSERT OR REPLACE dispara los triggers DELETE (contadores)
+}
+
+# Las conexiones de solo lectura no pueden cambiar el modo de journal
+PRAGMAS_LECTURA = {
+    nombre: valor for nombre, valor in PRAGMAS_POR_DEFECTO.items()
+    if nombre != 'journal_mode'
+}
+PRAGMAS_LECTURA['query_only'] = 1
+
+def abrir_conexion(db_path, pragmas, solo_lectura=False, **kwargs):
+    """
+    Abre una conexión SQLite y aplica los PRAGMAs indicados.
+    Con solo_lectura=True se abre en modo URI 'mode=ro'.
+    """
+    if solo_lectura:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True,
+                               check_same_thread=False, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False, **kwargs)
+    for nombre, valor in pragmas.items():
+        conn.execute(f"PRAGMA {nombre}={valor}")
+    return conn
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite reutilizables entre hilos.
+    Cada conexión se crea y configura una sola vez; luego se presta con
+    obtener()/liberar() o con el bloque with conexion().
+    Con solo_lectura=True las conexiones se abren con mode=ro y query_only.
+    al_abrir(conn) se llama una vez por conexión nueva (p. ej. para ATTACH).
+    """
+
+    def __init__(self, db_path, max_conexiones=8, pragmas=None, solo_lectura=False, al_abrir=None):
+        self.db_path = db_path
+        self.max_conexiones = max_conexiones
+        self.solo_lectura = solo_lectura
+        self.al_abrir = al_abrir
+        if pragmas is None:
+            pragmas = PRAGMAS_LECTURA if solo_lectura else PRAGMAS_POR_DEFECTO
+        self.pragmas = dict(pragmas)
+
+        self._libres = []  # Conexiones disponibles (LIFO: la más reciente está "caliente")
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self._traza = None          # Trace callback de sqlite3 (auditoría de sentencias)
+        self._traza_usada = False   # Una vez usada, cada préstamo re-aplica la vigente
+        self._generacion = 0        # renovar() la incrementa: las conexiones viejas se cierran
+        self._generaciones = {}     # id(conn) -> generación en que se abrió
+
+        # Estadísticas
+        self.conexiones_creadas = 0
+        self.prestamos = 0
+        self.reutilizadas = 0
+
+    def _crear_conexion(self):
+        """Abre una conexión nueva y aplica los PRAGMAs (y al_abrir) una sola vez."""
+        with self._lock:
+            generacion = self._generacion
+        conn = abrir_conexion(self.db_path, self.pragmas, self.solo_lectura)
+        if self.al_abrir is not None:
+            try:
+                self.al_abrir(conn)
+            except Exception:
+                conn.close()
+                raise
+        with self._lock:
+            self.conexiones_creadas += 1
+            self._generaciones[id(conn)] = generacion
+        return conn
+
+    def obtener(self):
+        """Toma una conexión del pool (o crea una nueva si no hay libres)."""
+        with self._lock:
+            self.prestamos += 1
+            conn = self._libres.pop() if self._libres else None
+            if conn is not None:
+                self.reutilizadas += 1
+
+        if conn is None:
+            conn = self._crear_conexion()
+        if self._traza_usada:
+            conn.set_trace_callback(self._traza)
+        return conn
+
+    def liberar(self, conn):
+        """
+        Devuelve la conexión al pool. Si quedó una transacción abierta
+        (por ejemplo tras una excepción) se descarta con rollback.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._lock:
+            vigente = self._generaciones.get(id(conn)) == self._generacion
+            if vigente and not self._cerrado and len(self._libres) < self.max_conexiones:
+                self._libres.append(conn)
+                return
+            self._generaciones.pop(id(conn), None)
+        conn.close()
+
+    def prestar(self):
+        """
+        Conexión del pool para código escrito como conn = ...; ...; conn.close():
+        close() la devuelve al pool en lugar de cerrarla.
+        """
+        return ConexionPrestada(self, self.obtener())
+
+    def renovar(self):
+        """
+        Cierra las conexiones libres y marca como viejas las prestadas (se cierran al
+        liberarse): las siguientes se abren de nuevo y vuelven a pasar por al_abrir.
+        """
+        with self._lock:
+            self._generacion += 1
+            libres, self._libres = self._libres, []
+            for conn in libres:
+                self._generaciones.pop(id(conn), None)
+        for conn in libres:
+            conn.close()
+
+    def trazar(self, funcion):
+        """
+        Llama a funcion(sql) con cada sentencia que ejecuten las conexiones del
+        pool (sqlite3 set_trace_callback). Con None se deja de trazar.
+        """
+        with self._lock:
+            self._traza = funcion
+            self._traza_usada = True
+            for conn in self._libres:
+                conn.set_trace_callback(funcion)
+
+    @contextmanager
+    def conexion(self):
+        """
+        Presta una conexión dentro de un bloque with. Al salir sin errores se
+        hace commit de la transacción pendiente.
+        """
+        conn = self.obtener()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        finally:
+            self.liberar(conn)
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres del pool."""
+        with self._lock:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.close()
+
+    def estadisticas(self):
+        """Estadísticas de uso del pool."""
+        with self._lock:
+            return {
+                'conexiones_creadas': self.conexiones_creadas,
+                'conexiones_libres': len(self._libres),
+                'prestamos': self.prestamos,
+                'reutilizadas': self.reutilizadas,
+                'max_conexiones': self.max_conexiones,
+                'solo_lectura': self.solo_lectura,
+                'generacion': self._generacion
+            }
+
+
+class ConexionPrestada:
+    """Envoltura de una conexión prestada: todo se delega salvo close()."""
+
+    __slots__ = ('_pool', '_conn')
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexión ya devuelta al pool")
+        return getattr(self._conn, nombre)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.liberar(conn)
+
+    def __del__(self):
+        self.close()
+
+
+class EscritorSQLite:
+    """
+    Escritor único: un hilo dedicado con su propia conexión toma trabajos de
+    una cola y los confirma en lotes (una sola transacción por lote).
+
+    Cada trabajo es una función f(conn) que NO debe hacer commit. Dentro del
+    lote cada trabajo corre en su propio SAVEPOINT, así un error solo deshace
+    ese trabajo y se reporta a quien lo envió.
+    """
+
+    _FIN = object()
+
+    def __init__(self, db_path, tamano_lote=200, pragmas=None):
+        self.db_path = db_path
+        self.tamano_lote = tamano_lote
+        self.pragmas = dict(PRAGMAS_POR_DEFECTO if pragmas is None else pragmas)
+
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="EscritorSQLite", daemon=True)
+        self._iniciado = threading.Event()
+        self._error_inicio = None
+
+        # Estadísticas
+        self._lock = threading.Lock()
+        self.trabajos = 0
+        self.trabajos_fallidos = 0
+        self.lotes = 0
+
+        self._hilo.start()
+        self._iniciado.wait()
+        if self._error_inicio is not None:
+            raise self._error_inicio
+        atexit.register(self.cerrar)
+
+    def enviar(self, funcion, *args, **kwargs):
+        """Encola un trabajo de escritura y devuelve un Future con su resultado."""
+        futuro = Future()
+        if threading.current_thread() is self._hilo:
+            # Llamada anidada desde otro trabajo: ejecutar en la misma transacción
+            futuro.set_result(funcion(self._conn, *args, **kwargs))
+            return futuro
+        if not self._hilo.is_alive():
+            raise RuntimeError("El escritor SQLite está cerrado")
+        self._cola.put((funcion, args, kwargs, futuro))
+        return futuro
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """Encola un trabajo y espera a que su lote se confirme. Devuelve el resultado."""
+        return self.enviar(funcion, *args, **kwargs).result()
+
+    def _bucle(self):
+        try:
+            # isolation_level=None: las transacciones se controlan explícitamente
+            self._conn = abrir_conexion(self.db_path, self.pragmas, isolation_level=None)
+        except Exception as e:
+            self._error_inicio = e
+            self._iniciado.set()
+            return
+        self._iniciado.set()
+
+        activo = True
+        while activo:
+            lote = [self._cola.get()]
+            # Agrupar todo lo que ya esté esperando (sin bloquear)
+            while len(lote) < self.tamano_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            if any(t is self._FIN for t in lote):
+                activo = False
+            trabajos = [t for t in lote if t is not self._FIN]
+            if trabajos:
+                self._procesar_lote(trabajos)
+
+        self._conn.close()
+
+        # Trabajos que llegaron después de cerrar
+        while True:
+            try:
+                trabajo = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if trabajo is not self._FIN:
+                trabajo[3].set_exception(RuntimeError("El escritor SQLite está cerrado"))
+
+    def _procesar_lote(self, trabajos):
+        conn = self._conn
+        completados = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for funcion, args, kwargs, futuro in trabajos:
+                conn.execute("SAVEPOINT trabajo")
+                try:
+                    resultado = funcion(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO trabajo")
+                    conn.execute("RELEASE trabajo")
+                    futuro.set_exception(e)
+                    with self._lock:
+                        self.trabajos_fallidos += 1
+                    continue
+                conn.execute("RELEASE trabajo")
+                completados.append((futuro, resultado))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for funcion, args, kwargs, futuro in trabajos:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        # Los resultados se publican solo después del COMMIT
+        for futuro, resultado in completados:
+            futuro.set_result(resultado)
+        with self._lock:
+            self.trabajos += len(trabajos)
+            self.lotes += 1
+
+    def cerrar(self):
+        """Procesa lo pendiente y detiene el hilo escritor."""
+        if self._hilo.is_alive():
+            self._cola.put(self._FIN)
+            self._hilo.join(timeout=10)
+
+    def estadisticas(self):
+        """Estadísticas del escritor."""
+        with self._lock:
+            return {
+                'trabajos': self.trabajos,
+                'trabajos_fallidos': self.trabajos_fallidos,
+                'lotes': self.lotes,
+                'pendientes': self._cola.qsize(),
+                'activo': self._hilo.is_alive()
+            }
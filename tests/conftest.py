@@ -0,0 +1,16 @@
+# tests/conftest.py - Las pruebas corren en una carpeta temporal
+#
+# sqlite_manager abre database/bolsa_datos.db relativo al directorio actual al
+# importarse: antes de que cualquier prueba importe un módulo del repositorio se
+# cambia a una carpeta vacía, así la base del repositorio no se toca y cada corrida
+# empieza con una base nueva.
+
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+os.chdir(tempfile.mkdtemp(prefix='bolsadc_pruebas_'))
+os.makedirs('database', exist_ok=True)
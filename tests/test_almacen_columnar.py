@@ -0,0 +1,84 @@
+# tests/test_almacen_columnar.py - El almacén en memoria responde igual que SQLite
+
+import pytest
+
+from almacen_columnar import NUMPY_DISPONIBLE, AlmacenPrecios
+from cotizacion import CotizacionHistorica
+from sqlite_manager import sqlite_manager
+
+pytestmark = pytest.mark.skipif(not NUMPY_DISPONIBLE, reason="requiere numpy")
+
+def _accion(simbolo, hoy, cantidad=100):
+    return {'simbolo': simbolo, 'nombre': f"{simbolo} C.A.", 'anterior': 1.0, 'hoy': hoy,
+            'diferencia_bs': 0.0, 'variacion': 0.0, 'cantidad': cantidad,
+            'monto': None if hoy is None else hoy * 10}
+
+def _historico_sql(simbolo, desde, hasta):
+    """La misma consulta que obtener_historico_simbolo sin almacén."""
+    with sqlite_manager.pool.conexion() as conn:
+        return [dict(CotizacionHistorica(*fila)) for fila in conn.execute('''
+            SELECT fecha, simbolo, nombre, anterior, hoy, diferencia_bs,
+                   variacion, cantidad, monto, fuente
+            FROM cotizaciones_efectivas
+            WHERE simbolo = ? AND fecha_num BETWEEN ? AND ?
+            ORDER BY fecha_num DESC''', (simbolo, desde, hasta))]
+
+def _historico_almacen(almacen, simbolo, desde, hasta):
+    return [dict(c) for c in almacen.historico(simbolo, desde, hasta)]
+
+def test_nulos_iguales_en_ambos_caminos():
+    sqlite_manager.insertar_acciones('20240102', [_accion('ALNUL', None, None)])
+    sqlite_manager.insertar_acciones('20240103', [_accion('ALNUL', 5.0)])
+
+    sql = _historico_sql('ALNUL', '20240101', '20240131')
+    assert sql[1]['precio'] is None and sql[1]['cantidad'] is None
+    assert _historico_almacen(sqlite_manager.almacen, 'ALNUL', '20240101', '20240131') == sql
+
+def test_actualizar_fusiona_sin_recargar(monkeypatch):
+    almacen = sqlite_manager.almacen
+    monkeypatch.setattr(almacen, 'cargar', lambda conn: pytest.fail("recarga completa"))
+
+    for fecha, precio in (('20240205', 1.0), ('20240207', 2.0), ('20240209', 3.0)):
+        sqlite_manager.insertar_acciones(fecha, [_accion('ALINC', precio), _accion('ALOTR', precio)])
+    sqlite_manager.insertar_acciones('20240207', [_accion('ALINC', 20.0)])          # modifica el medio
+    sqlite_manager.insertar_acciones('20240201', [_accion('ALINC', 0.5)])           # antes del primero
+    sqlite_manager.insertar_datos_manuales('20240209', [_accion('ALINC', 30.0)])    # manual por encima
+    sqlite_manager.insertar_acciones('20240212', [_accion('ALINC', None, None)])    # al final, con NULL
+
+    esperado = _historico_sql('ALINC', '20240101', '20240229')
+    assert [c['precio'] for c in esperado] == [None, 30.0, 20.0, 1.0, 0.5]
+    assert _historico_almacen(almacen, 'ALINC', '20240101', '20240229') == esperado
+    assert _historico_almacen(almacen, 'ALOTR', '20240101', '20240229') == \
+        _historico_sql('ALOTR', '20240101', '20240229')
+
+    sqlite_manager.eliminar_datos_manuales('20240209')
+    assert _historico_almacen(almacen, 'ALINC', '20240101', '20240229') == \
+        _historico_sql('ALINC', '20240101', '20240229')
+
+    # Lo fusionado coincide con una carga desde cero
+    nuevo = AlmacenPrecios()
+    with sqlite_manager.pool.conexion() as conn:
+        nuevo.cargar(conn)
+    for simbolo in ('ALINC', 'ALOTR', 'ALNUL'):
+        assert _historico_almacen(almacen, simbolo, '20240101', '20241231') == \
+            _historico_almacen(nuevo, simbolo, '20240101', '20241231')
+
+def test_historico_es_vista_perezosa_de_las_columnas():
+    for dia, precio in enumerate((1.0, 2.0, None, 4.0, 5.0), start=1):
+        sqlite_manager.insertar_acciones(f"202403{dia:02d}", [_accion('ALVIS', precio, None if precio is None else dia)])
+
+    historico = sqlite_manager.almacen.historico('ALVIS', '20240301', '20240331')
+    esperado = _historico_sql('ALVIS', '20240301', '20240331')
+    assert len(historico) == 5
+    assert dict(historico[0]) == esperado[0] and dict(historico[-1]) == esperado[-1]
+
+    # Slices (página, orden cronológico, paso del gráfico) sin copiar las columnas
+    assert [dict(c) for c in historico[1:3]] == esperado[1:3]
+    assert [dict(c) for c in historico[::-1]] == esperado[::-1]
+    assert [dict(c) for c in historico[::-1][::2]] == esperado[::-1][::2]
+    assert list(historico[10:]) == []
+
+    # JSON y estadísticas directamente desde los arrays
+    assert historico.registros() == esperado
+    assert historico[::-1].columna('fecha').tolist() == [20240301, 20240302, 20240303, 20240304, 20240305]
+    assert historico[:2].columna('precio').tolist() == [5.0, 4.0]
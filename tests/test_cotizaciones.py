@@ -0,0 +1,69 @@
+# tests/test_cotizaciones.py - Una sola copia de cada cotización detrás de las vistas
+
+import sqlite3
+
+from sqlite_manager import COLUMNAS_COTIZACION, sqlite_manager
+
+TABLA_ANTERIOR = '''
+CREATE TABLE {tabla} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL, simbolo TEXT NOT NULL, nombre TEXT NOT NULL,
+    anterior REAL, hoy REAL, diferencia_bs REAL, variacion REAL,
+    cantidad INTEGER, monto REAL, fuente TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(fecha, simbolo)
+)
+'''
+
+def _fila(fecha, simbolo, hoy, fuente='automatico'):
+    return (fecha, simbolo, f"{simbolo} C.A.", 1.0, hoy, 0.0, 0.0, 10, hoy * 10, fuente)
+
+def _insertar(conn, tabla, filas):
+    conn.executemany(f"INSERT INTO {tabla} ({', '.join(COLUMNAS_COTIZACION)}) "
+                     f"VALUES ({', '.join('?' * len(COLUMNAS_COTIZACION))})", filas)
+
+def test_migracion_deja_vistas_sobre_una_sola_copia(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'anterior.db')
+    for tabla in ('acciones', 'datos_manuales'):
+        conn.execute(TABLA_ANTERIOR.format(tabla=tabla))
+    _insertar(conn, 'acciones', [_fila('20240102', 'AAA', 5.0), _fila('20240102', 'BBB', 7.0)])
+    _insertar(conn, 'datos_manuales', [_fila('20240102', 'AAA', 50.0, 'manual')])
+    conn.commit()
+
+    sqlite_manager._crear_esquema(conn)
+    conn.commit()
+
+    tipos = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name IN "
+                              "('acciones', 'datos_manuales', 'cotizaciones', 'cotizaciones_efectivas')"))
+    assert tipos == {'acciones': 'view', 'datos_manuales': 'view',
+                     'cotizaciones': 'table', 'cotizaciones_efectivas': 'view'}
+    assert conn.execute("SELECT COUNT(*) FROM cotizaciones").fetchone()[0] == 3
+    assert conn.execute("SELECT fecha, simbolo, hoy FROM acciones ORDER BY simbolo").fetchall() == [
+        ('20240102', 'AAA', 5.0), ('20240102', 'BBB', 7.0)]
+    assert conn.execute("SELECT simbolo, hoy, manual FROM cotizaciones_efectivas "
+                        "WHERE fecha_num = 20240102 ORDER BY simbolo").fetchall() == [
+        ('AAA', 50.0, 1), ('BBB', 7.0, 0)]
+    # Contadores de las vistas desde los triggers de cotizaciones
+    assert dict(conn.execute("SELECT tabla, filas FROM estadisticas_tablas WHERE tabla IN "
+                             "('acciones', 'datos_manuales', 'cotizaciones')")) == {
+        'acciones': 2, 'datos_manuales': 1, 'cotizaciones': 3}
+    conn.close()
+
+def _escribir_en_vistas(conn):
+    _insertar(conn, 'acciones', [_fila('20170510', 'VISTA', 3.0)])
+    _insertar(conn, 'datos_manuales', [_fila('20170510', 'VISTA', 30.0, 'manual')])
+    conn.execute("UPDATE acciones SET hoy = 4.0, nombre = 'VISTA S.A.' "
+                 "WHERE fecha = '20170510' AND simbolo = 'VISTA'")
+    conn.execute("DELETE FROM datos_manuales WHERE fecha = '20170510' AND simbolo = 'VISTA'")
+
+def test_triggers_de_las_vistas_escriben_en_cotizaciones():
+    sqlite_manager.ejecutar_escritura(_escribir_en_vistas)
+
+    with sqlite_manager.pool.conexion() as conn:
+        assert conn.execute(
+            "SELECT s.simbolo, n.nombre, c.manual, c.hoy FROM cotizaciones c "
+            "JOIN simbolos s ON s.id = c.simbolo_id JOIN nombres n ON n.id = c.nombre_id "
+            "WHERE c.fecha = 20170510").fetchall() == [('VISTA', 'VISTA S.A.', 0, 4.0)]
+        contadores = dict(conn.execute(
+            "SELECT tabla, filas FROM estadisticas_fechas WHERE fecha IN ('20170510', 20170510)"))
+    assert contadores == {'acciones': 1, 'cotizaciones': 1}
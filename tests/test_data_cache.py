@@ -0,0 +1,27 @@
+# tests/test_data_cache.py - data_cache comprimido se carga igual que los .dat sueltos
+
+import os
+
+from benchmarks.generador_dat import escribir_dat
+from dat_parser import cargar_desde_data_cache_sqlite, cargar_solo_recientes_sqlite
+from sqlite_manager import sqlite_manager
+
+def _escribir(carpeta, fecha, simbolo, hoy):
+    escribir_dat(os.path.join(carpeta, f"{fecha}.dat"),
+                 [(simbolo, f"{simbolo} C.A.", 1.0, hoy, 0.0, 10, hoy * 10)], None, comprimir=True)
+
+def _precio(fecha, simbolo):
+    return {c['simbolo']: c['hoy'] for c in sqlite_manager.obtener_acciones_por_fecha(fecha)}.get(simbolo)
+
+def test_dat_gz_en_las_dos_cargas(tmp_path):
+    completa, recientes = str(tmp_path / 'completa'), str(tmp_path / 'recientes')
+    os.makedirs(completa)
+    os.makedirs(recientes)
+    _escribir(completa, '20130104', 'GZCOM', 2.0)
+    _escribir(recientes, '20130107', 'GZREC', 3.0)
+
+    assert cargar_desde_data_cache_sqlite(completa, trabajadores=0)
+    assert cargar_solo_recientes_sqlite(30, recientes)
+
+    assert _precio('20130104', 'GZCOM') == 2.0
+    assert _precio('20130107', 'GZREC') == 3.0
@@ -0,0 +1,41 @@
+# tests/test_estadisticas.py - Los contadores de los triggers coinciden con las tablas
+
+import sqlite3
+
+from sqlite_manager import TABLAS_CON_ESTADISTICAS, sqlite_manager
+
+def _reemplazar_indice(conn, fecha, valor):
+    conn.execute("INSERT OR REPLACE INTO indices (fecha, valor, variacion, fuente) "
+                 "VALUES (?, ?, 0.0, 'prueba')", (fecha, valor))
+
+def _desajustes():
+    """{tabla: (filas según contadores, filas reales)} de las tablas que no cuadran."""
+    contadores = sqlite_manager.obtener_estadisticas_tablas()
+    with sqlite_manager.pool.conexion() as conn:
+        reales = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                  for tabla in TABLAS_CON_ESTADISTICAS}
+    return {tabla: (contadores.get(tabla, {}).get('filas', 0), filas)
+            for tabla, filas in reales.items() if contadores.get(tabla, {}).get('filas', 0) != filas}
+
+def test_replace_no_desajusta_contadores():
+    sqlite_manager.ejecutar_escritura(_reemplazar_indice, '20230301', 100.0)
+    sqlite_manager.ejecutar_escritura(_reemplazar_indice, '20230301', 101.0)
+
+    assert _desajustes() == {}
+    fechas = sqlite_manager.obtener_estadisticas_tablas()['indices']
+    assert fechas['filas'] == fechas['fechas']  # Una fila por fecha en indices
+
+def test_recalcular_estadisticas_repara_contadores():
+    # Otro proceso sin recursive_triggers: el REPLACE no resta la fila borrada
+    conn = sqlite3.connect(sqlite_manager.db_path, timeout=5)
+    try:
+        _reemplazar_indice(conn, '20230302', 200.0)
+        _reemplazar_indice(conn, '20230302', 201.0)
+        conn.commit()
+    finally:
+        conn.close()
+    assert 'indices' in _desajustes()
+
+    tablas = sqlite_manager.recalcular_estadisticas()
+    assert _desajustes() == {}
+    assert tablas['indices']['fecha_max'] == '20230302'
@@ -0,0 +1,44 @@
+# tests/test_exportador_columnar.py - La exportación columnar conserva los NULL
+
+import json
+import math
+import os
+
+import pytest
+
+from exportador_columnar import exportar_historico
+from lector_columnar import NUMPY_DISPONIBLE, TablaColumnar
+from sqlite_manager import sqlite_manager
+
+pytestmark = pytest.mark.skipif(not NUMPY_DISPONIBLE, reason="requiere numpy")
+
+def _cantidad(carpeta, simbolo):
+    tabla = TablaColumnar(os.path.join(carpeta, 'acciones'))
+    (posicion,) = (tabla['simbolo'] == tabla.codigo('simbolo', simbolo)).nonzero()[0]
+    return tabla['cantidad'].dtype.str, float(tabla['cantidad'][posicion])
+
+def test_cantidad_nula_se_exporta_como_nan(tmp_path):
+    sqlite_manager.insertar_acciones('20160801', [{
+        'simbolo': 'EXNUL', 'nombre': 'EXNUL C.A.', 'anterior': 1.0, 'hoy': 1.0,
+        'diferencia_bs': 0.0, 'variacion': 0.0, 'cantidad': None, 'monto': 1.0}])
+    carpeta = str(tmp_path / 'columnar')
+    with sqlite_manager.pool.conexion() as conn:
+        exportar_historico(conn, carpeta)
+
+    dtype, cantidad = _cantidad(carpeta, 'EXNUL')
+    assert dtype == '<f8' and math.isnan(cantidad)
+
+    # Una exportación anterior con cantidad entera se reescribe en vez de mezclar tipos
+    ruta = os.path.join(carpeta, 'acciones', 'manifiesto.json')
+    with open(ruta, encoding='utf-8') as archivo:
+        manifiesto = json.load(archivo)
+    for columna in manifiesto['columnas']:
+        if columna['nombre'] == 'cantidad':
+            columna['dtype'] = '<i8'
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo)
+
+    with sqlite_manager.pool.conexion() as conn:
+        assert exportar_historico(conn, carpeta)['acciones'] == manifiesto['filas']
+    dtype, cantidad = _cantidad(carpeta, 'EXNUL')
+    assert dtype == '<f8' and math.isnan(cantidad)
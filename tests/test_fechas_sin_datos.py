@@ -0,0 +1,24 @@
+# tests/test_fechas_sin_datos.py - Caché negativa de fechas sin cotizaciones
+
+from datetime import datetime, timedelta
+
+from sqlite_manager import sqlite_manager
+
+def _expira(fecha):
+    with sqlite_manager.pool.conexion() as conn:
+        return conn.execute("SELECT expira FROM fechas_sin_datos WHERE fecha = ?", (fecha,)).fetchone()
+
+def test_registrar_fecha_entera():
+    manana = int((datetime.now() + timedelta(days=1)).strftime('%Y%m%d'))
+    sqlite_manager.registrar_fecha_sin_datos(20180704, motivo='prueba').result()
+    sqlite_manager.registrar_fecha_sin_datos(manana, motivo='prueba').result()
+
+    assert sqlite_manager.fecha_sin_datos(20180704)
+    assert _expira(20180704) == (None,)      # Fecha pasada: permanente
+    assert _expira(manana)[0] is not None    # Fecha futura: con TTL
+
+    # Una cotización nueva de la fecha la saca de la caché negativa
+    sqlite_manager.insertar_acciones('20180704', [{
+        'simbolo': 'SDENT', 'nombre': 'SDENT C.A.', 'anterior': 1.0, 'hoy': 1.0,
+        'diferencia_bs': 0.0, 'variacion': 0.0, 'cantidad': 1, 'monto': 1.0}])
+    assert not sqlite_manager.fecha_sin_datos('20180704')
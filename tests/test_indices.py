@@ -0,0 +1,17 @@
+# tests/test_indices.py - El índice de una fecha es el manual cuando lo hay
+
+from sqlite_manager import sqlite_manager
+
+FECHA = '20260115'
+
+def test_indice_manual_gana_al_automatico():
+    sqlite_manager.insertar_indice(FECHA, {'valor': 100.0, 'variacion': 0.5})
+    assert sqlite_manager.obtener_indice_por_fecha(FECHA)['valor'] == 100.0
+
+    sqlite_manager.insertar_datos_manuales(FECHA, [], {'valor': 5242.02, 'variacion': 1.25})
+    indice = sqlite_manager.obtener_indice_por_fecha(FECHA)
+    assert (indice['valor'], indice['variacion']) == (5242.02, 1.25)
+
+    # Un automático posterior no lo reemplaza
+    sqlite_manager.insertar_indice(FECHA, {'valor': 101.0, 'variacion': 0.6})
+    assert sqlite_manager.obtener_indice_por_fecha(FECHA)['valor'] == 5242.02
@@ -0,0 +1,13 @@
+# tests/test_parser_bvc.py - Tokens que no son números: 0.0 y el texto original en las estadísticas
+
+import parser_bvc
+
+def test_token_invalido_conserva_el_texto_original(capsys):
+    parser_bvc.limpiar_cache()
+    assert parser_bvc.limpiar_numero(' Bs. 1.2.3,4,5 ') == 0.0
+    assert parser_bvc.limpiar_numero('Bs. 1.250,50') == 1250.5
+
+    estadisticas = parser_bvc.estadisticas_cache()
+    assert estadisticas['invalidos'] == 1
+    assert "' Bs. 1.2.3,4,5 '" in estadisticas['ultimo_invalido']
+    assert capsys.readouterr().out == ''
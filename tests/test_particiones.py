@@ -0,0 +1,37 @@
+# tests/test_particiones.py - Un año archivado se lee igual que la base principal
+
+from sqlite_manager import sqlite_manager
+
+FECHA = '20190315'
+
+def _accion(simbolo, hoy):
+    return {'simbolo': simbolo, 'nombre': f"{simbolo} C.A.", 'anterior': 1.0, 'hoy': hoy,
+            'diferencia_bs': 0.0, 'variacion': 0.0, 'cantidad': 100, 'monto': hoy * 10}
+
+def _precios(fecha):
+    return {c['simbolo']: (c['hoy'], c['fuente'])
+            for c in map(dict, sqlite_manager.obtener_acciones_por_fecha(fecha))}
+
+def test_manual_archivado_gana_a_automatico_posterior():
+    sqlite_manager.insertar_datos_manuales(FECHA, [_accion('PTMAN', 50.0)],
+                                           {'valor': 900.0, 'variacion': 1.0})
+    sqlite_manager.insertar_acciones(FECHA, [_accion('PTAUT', 7.0)])
+    sqlite_manager.archivar_anio(2019)
+    try:
+        # Automáticos escritos en la base principal después de archivar el año
+        sqlite_manager.insertar_acciones(FECHA, [_accion('PTMAN', 10.0), _accion('PTAUT', 8.0)])
+        sqlite_manager.insertar_indice(FECHA, {'valor': 100.0, 'variacion': 0.0})
+
+        # El manual archivado sigue valiendo; entre automáticos gana el de la principal
+        assert _precios(FECHA) == {'PTMAN': (50.0, 'manual'), 'PTAUT': (8.0, 'automatico')}
+        with sqlite_manager.pool.conexion() as conn:
+            assert conn.execute(
+                "SELECT valor, manual FROM indices_efectivos WHERE fecha = ?", (FECHA,)
+            ).fetchall() == [(900.0, 1)]
+            assert conn.execute(
+                "SELECT COUNT(*) FROM cotizaciones_efectivas WHERE fecha_num = ?", (int(FECHA),)
+            ).fetchone()[0] == 2
+    finally:
+        sqlite_manager.desarchivar_anio(2019)
+
+    assert _precios(FECHA) == {'PTMAN': (50.0, 'manual'), 'PTAUT': (8.0, 'automatico')}
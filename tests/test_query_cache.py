@@ -0,0 +1,35 @@
+# tests/test_query_cache.py - Invalidación de la caché de consultas por fecha y símbolo
+
+from sqlite_manager import sqlite_manager
+
+def _accion(simbolo, hoy):
+    return {'simbolo': simbolo, 'nombre': f"{simbolo} C.A.", 'anterior': hoy, 'hoy': hoy,
+            'diferencia_bs': 0.0, 'variacion': 0.0, 'cantidad': 100, 'monto': hoy * 100}
+
+def test_rango_invertido_se_invalida_tras_escribir():
+    from app import app
+
+    sqlite_manager.insertar_acciones('20250110', [_accion('QCINV', 10.0)])
+    cliente = app.test_client()
+    url = '/api/historico?simbolo=QCINV&fecha_desde=2025-01-31&fecha_hasta=2025-01-01'
+
+    primera = cliente.get(url).get_json()
+    assert primera['datos'][0]['precio'] == 10.0
+    assert cliente.get(url).get_json()['from_cache'] is True
+
+    sqlite_manager.insertar_acciones('20250110', [_accion('QCINV', 20.0)])
+
+    invertido = cliente.get(url).get_json()
+    directo = cliente.get('/api/historico?simbolo=QCINV&fecha_desde=2025-01-01&fecha_hasta=2025-01-31').get_json()
+    assert invertido['from_cache'] is False
+    assert invertido['datos'][0]['precio'] == 20.0
+    assert directo['datos'][0]['precio'] == 20.0
+
+def test_rango_invertido_comparte_entrada():
+    from query_cache import QueryCache
+
+    cache = QueryCache()
+    cache.cache_query('ABC', '2025-01-31', '2025-01-01', [{'precio': 1.0}])
+    assert cache.get_cached_query('ABC', '2025-01-01', '2025-01-31') == [{'precio': 1.0}]
+    cache.invalidar_cambios({'20250115': {'ABC'}})
+    assert cache.get_cached_query('ABC', '2025-01-31', '2025-01-01') is None
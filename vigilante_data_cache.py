@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# vigilante_data_cache.py - Carga automática de los .dat que aparecen en data_cache
+#
+# Un hilo daemon vigila la carpeta: con inotify (Linux, vía ctypes) recibe los archivos
+# cerrados tras escribirse, movidos o borrados; sin inotify compara cada `intervalo`
+# segundos el nombre, tamaño y mtime de los .dat. Tras `espera` segundos sin cambios
+# (una copia de muchos archivos es una sola carga, y un archivo a medio escribir no se
+# lee) carga lo nuevo o modificado según ingest_manifest, con ingesta_paralela.
+# Las escrituras invalidan las cachés afectadas (notificar_cambios); después se
+# reconstruye el índice de la carpeta y se vuelven a precargar las fechas recientes.
+# Al arrancar carga lo que se haya copiado mientras no corría.
+#
+# En la aplicación: VIGILAR_DATA_CACHE=1 lo arranca dentro del proceso (ver app.py).
+# Como proceso aparte las cachés en memoria de la aplicación no se enteran de la carga
+# (no comparten proceso); las fechas que no estaban en caché se leen ya de SQLite.
+#
+# Uso: python vigilante_data_cache.py [carpeta] [--espera=S] [--intervalo=S] [--sondeo] [--trabajadores=N]
+#   --sondeo usa la comparación periódica aunque haya inotify
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+from indice_data_cache import obtener_indice
+from ingesta_paralela import archivos_pendientes, es_archivo_dat, imprimir_resumen, ingestar_archivos
+
+try:
+    import ctypes
+    import ctypes.util
+
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    INOTIFY_DISPONIBLE = sys.platform.startswith('linux')
+except (ImportError, OSError, AttributeError):
+    INOTIFY_DISPONIBLE = False
+
+ESPERA = 2.0  # Segundos sin cambios antes de cargar
+INTERVALO_SONDEO = 5.0
+DIAS_PRECARGA = 30  # Fechas recientes que se vuelven a precargar tras una carga
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENTO = struct.Struct('iIII')  # wd, mask, cookie, len (+ nombre de len bytes)
+_MASCARA = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+            IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+class _Inotify:
+    """Descriptor inotify sobre una carpeta: leer(timeout) -> nombres cambiados o None si se perdió."""
+
+    def __init__(self, carpeta):
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if _libc.inotify_add_watch(self.fd, os.fsencode(carpeta), _MASCARA) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch {carpeta}")
+
+    def leer(self, timeout):
+        listos, _, _ = select.select([self.fd], [], [], timeout)
+        if not listos:
+            return set()
+        try:
+            datos = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        nombres = set()
+        posicion = 0
+        while posicion < len(datos):
+            _, mascara, _, largo = _EVENTO.unpack_from(datos, posicion)
+            posicion += _EVENTO.size
+            nombre = datos[posicion:posicion + largo].rstrip(b'\0')
+            posicion += largo
+            if mascara & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                return None  # La carpeta se borró o se movió
+            if mascara & IN_Q_OVERFLOW:
+                nombres.add('')  # Se perdieron eventos: revisar toda la carpeta
+            elif nombre:
+                nombres.add(os.fsdecode(nombre))
+        return nombres
+
+    def cerrar(self):
+        os.close(self.fd)
+
+class VigilanteDataCache:
+    """
+    Hilo que mantiene SQLite al día con los .dat de una carpeta.
+    - iniciar() / detener()
+    - cargar_ahora(): carga lo pendiente sin esperar eventos
+    - estadisticas() para /admin/cache-status
+    """
+
+    def __init__(self, carpeta="data_cache", espera=ESPERA, intervalo=INTERVALO_SONDEO,
+                 usar_inotify=True, trabajadores=0, manager=None):
+        self.carpeta = carpeta
+        self.espera = espera
+        self.intervalo = intervalo
+        self.usar_inotify = usar_inotify and INOTIFY_DISPONIBLE
+        self.trabajadores = trabajadores  # 0: parsea en el hilo del vigilante, sin pool de procesos
+        self.manager = manager
+        self.modo = None
+        self._hilo = None
+        self._parar = threading.Event()
+        self._lock_carga = threading.Lock()
+
+        # Estadísticas
+        self.eventos = 0
+        self.cargas = 0
+        self.archivos = 0
+        self.filas = 0
+        self.errores = 0
+        self.ultima_carga = None
+        self.ultimo_error = None
+
+    def _manager(self):
+        if self.manager is None:
+            from sqlite_manager import sqlite_manager
+            self.manager = sqlite_manager
+        return self.manager
+
+    def _foto(self):
+        """{nombre: (tamaño, mtime_ns)} de los .dat de la carpeta ({} si no existe)."""
+        foto = {}
+        try:
+            with os.scandir(self.carpeta) as entradas:
+                for entrada in entradas:
+                    if es_archivo_dat(entrada.name) and entrada.is_file():
+                        estado = entrada.stat()
+                        foto[entrada.name] = (estado.st_size, estado.st_mtime_ns)
+        except OSError:
+            pass
+        return foto
+
+    def cargar_ahora(self):
+        """Carga los .dat nuevos o modificados. Retorna el resultado de ingestar_archivos o None."""
+        with self._lock_carga:
+            if not os.path.isdir(self.carpeta):
+                return None
+            manager = self._manager()
+            try:
+                entradas, _ = archivos_pendientes(self.carpeta, manager.obtener_manifiesto_ingesta())
+                if not entradas:
+                    return None
+                print(f"👀 {len(entradas)} archivos .dat nuevos o modificados en {self.carpeta}")
+                resultado = ingestar_archivos(entradas, self.trabajadores, manager=manager)
+            except Exception as e:
+                self.errores += 1
+                self.ultimo_error = str(e)
+                print(f"❌ Error cargando {self.carpeta}: {e}")
+                return None
+
+            imprimir_resumen(resultado)
+            self.cargas += 1
+            self.archivos += resultado['archivos']
+            self.filas += resultado['filas']
+            self.errores += resultado['errores']
+            self.ultima_carga = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            obtener_indice(self.carpeta).invalidar()
+            if resultado['insertados'] or resultado['actualizados']:
+                # Las fechas recientes invalidadas vuelven a la caché con los datos nuevos
+                manager.precargar_cache(DIAS_PRECARGA)
+            return resultado
+
+    def _bucle(self):
+        inotify = None
+        foto = None
+        pendiente_desde = time.monotonic() - self.espera  # Al arrancar: lo copiado mientras no corría
+        while not self._parar.is_set():
+            try:
+                if self.usar_inotify and inotify is None and os.path.isdir(self.carpeta):
+                    inotify = _Inotify(self.carpeta)
+                    pendiente_desde = time.monotonic() - self.espera  # Lo que cambió sin vigilancia
+                self.modo = 'inotify' if inotify is not None else 'sondeo'
+
+                if inotify is not None:
+                    timeout = 1.0  # Sin cambios pendientes: solo para ver si hay que detenerse
+                    if pendiente_desde is not None:
+                        timeout = max(0.0, pendiente_desde + self.espera - time.monotonic())
+                    nombres = inotify.leer(timeout)
+                    if nombres is None:
+                        inotify.cerrar()
+                        inotify = None
+                        continue
+                    cambio = any(not n or es_archivo_dat(n) for n in nombres)
+                else:
+                    self._parar.wait(self.intervalo if foto is not None else 0)
+                    anterior, foto = foto, self._foto()
+                    cambio = anterior is not None and foto != anterior
+
+                ahora = time.monotonic()
+                if cambio:
+                    self.eventos += 1
+                    pendiente_desde = ahora
+                elif pendiente_desde is not None and ahora - pendiente_desde >= self.espera:
+                    pendiente_desde = None
+                    self.cargar_ahora()
+            except Exception as e:
+                self.errores += 1
+                self.ultimo_error = str(e)
+                print(f"⚠️  Vigilante de {self.carpeta}: {e}")
+                if inotify is not None:
+                    inotify.cerrar()
+                    inotify = None
+                self._parar.wait(self.intervalo)
+        if inotify is not None:
+            inotify.cerrar()
+
+    def iniciar(self):
+        """Arranca el hilo (una sola vez). Retorna False si ya estaba corriendo."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return False
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="VigilanteDataCache", daemon=True)
+        self._hilo.start()
+        return True
+
+    def detener(self, timeout=None):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def estadisticas(self):
+        return {
+            'carpeta': self.carpeta,
+            'activo': self._hilo is not None and self._hilo.is_alive(),
+            'modo': self.modo,
+            'espera_s': self.espera,
+            'eventos': self.eventos,
+            'cargas': self.cargas,
+            'archivos': self.archivos,
+            'filas': self.filas,
+            'errores': self.errores,
+            'ultima_carga': self.ultima_carga,
+            'ultimo_error': self.ultimo_error
+        }
+
+# Instancia global (la aplicación la arranca con VIGILAR_DATA_CACHE=1)
+vigilante_data_cache = VigilanteDataCache()
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    vigilante = VigilanteDataCache(
+        argumentos[0] if argumentos else "data_cache",
+        espera=float(opciones.get('espera', ESPERA)),
+        intervalo=float(opciones.get('intervalo', INTERVALO_SONDEO)),
+        usar_inotify='--sondeo' not in sys.argv,
+        trabajadores=int(opciones.get('trabajadores', 0)))
+
+    vigilante.iniciar()
+    time.sleep(0.1)
+    print(f"👀 Vigilando {vigilante.carpeta} ({vigilante.modo or 'iniciando'}, "
+          f"espera {vigilante.espera:g}s). Ctrl+C para salir.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        vigilante.detener()
+        print(f"🛑 Vigilante detenido: {vigilante.estadisticas()}")
+
+if __name__ == "__main__":
+    main()